@@ -14,6 +14,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 import uuid
+import base64
 import threading
 import time
 import httpx
@@ -25,6 +26,10 @@ from src.core.metadata import MetadataParser
 from src.core.ai_prompt_optimizer import AIPromptOptimizer
 from src.assets.default_workflows import DEFAULT_T2I_WORKFLOW
 from src.core.scanner import ImageScanner
+from src.core.cache import ThumbnailCache
+from src.core.cache_manager import ThumbnailCacheManager
+from src.core.prewarmer import ThumbnailPrewarmer
+from src.core.preview_stream import FEATURE_FLAGS_MESSAGE, parse_preview_frame
 
 # Default; will be overwritten by main args
 COMFY_ADDRESS = "127.0.0.1:8189"
@@ -34,6 +39,12 @@ REMOTE_ACCESS_AUTH_ENABLED = False
 REMOTE_ACCESS_CODE = ""
 AUTH_SESSION_TTL_SECONDS = 12 * 60 * 60
 AUTH_PUBLIC_PATHS = {"/api/auth/status", "/api/auth/login", "/api/auth/logout"}
+THUMB_CACHE_MAX_MB = 1024
+WEB_THUMB_SIZES = (512,) # 与 web ImageList 请求的尺寸保持一致
+PREWARM_IDLE_SECONDS = 10.0
+PREVIEW_MIN_INTERVAL = 1 / 30 # 预览推送上限 30 fps
+PREVIEW_KEEPALIVE_SECONDS = 15.0
+_last_api_activity = 0.0
 _auth_sessions: Dict[str, float] = {}
 
 # --- Global Progress Tracker ---
@@ -44,6 +55,25 @@ class ProgressTracker:
         self.max = 0
         self.node_id = None
         self.is_connected = False
+        # 预览订阅者：每个连接一个容量为 1 的队列，只保留最新一帧，慢客户端不会拖累接收循环
+        self.preview_subscribers = set()
+
+    def subscribe_previews(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=1)
+        self.preview_subscribers.add(queue)
+        return queue
+
+    def unsubscribe_previews(self, queue: asyncio.Queue):
+        self.preview_subscribers.discard(queue)
+
+    def publish_preview(self, event: Dict[str, Any]):
+        for queue in self.preview_subscribers:
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
 
     def reset(self):
         self.current_task_id = None
@@ -65,8 +95,20 @@ class ProgressTracker:
                 async with websockets.connect(uri) as websocket:
                     self.is_connected = True
                     print(f"[WS] 已连接到 ComfyUI (ID: {CLIENT_ID})")
+                    await websocket.send(FEATURE_FLAGS_MESSAGE)
                     while True:
                         message = await websocket.recv()
+                        if isinstance(message, bytes):
+                            # 二进制帧为采样预览，原样转发给 Web 端 (不在服务端解码)
+                            frame = parse_preview_frame(message)
+                            if frame and self.preview_subscribers:
+                                meta, payload, mime = frame
+                                self.publish_preview({
+                                    "prompt_id": meta.get("prompt_id") or self.current_task_id,
+                                    "mime": mime,
+                                    "image": base64.b64encode(payload).decode("ascii"),
+                                })
+                            continue
                         data = json.loads(message)
                         
                         msg_type = data.get('type')
@@ -75,6 +117,7 @@ class ProgressTracker:
                             self.current_task_id = data['data'].get('prompt_id')
                             if self.node_id is None: # Execution done
                                 print(f"[WS] 任务执行完毕: {self.current_task_id}")
+                                self.publish_preview({"prompt_id": self.current_task_id, "done": True})
                                 self.reset()
                                 # 触发自动扫描，让新图立即出现
                                 threading.Thread(target=scanner.scan_folders, daemon=True).start()
@@ -86,6 +129,7 @@ class ProgressTracker:
                             
                         elif msg_type == 'execution_error':
                             print("[WS] 采样报错，重置进度")
+                            self.publish_preview({"prompt_id": self.current_task_id, "done": True})
                             self.reset()
             except Exception as e:
                 self.is_connected = False
@@ -114,7 +158,12 @@ class GenerateRequest(BaseModel):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     task = asyncio.create_task(progress_tracker.connect_ws())
+    thumb_cache_manager.set_budget_mb(THUMB_CACHE_MAX_MB)
+    thumb_cache_manager.start_background_sweep()
+    thumb_prewarmer.start()
     yield
+    thumb_prewarmer.cancel()
+    thumb_cache_manager.stop()
     task.cancel()
 
 app = FastAPI(title="AI Image Viewer Mobile API", lifespan=lifespan)
@@ -172,7 +221,10 @@ def _requires_remote_auth() -> bool:
 # 强制不缓存静态文件和 API
 @app.middleware("http")
 async def add_no_cache_headers(request: Request, call_next):
+    global _last_api_activity
     path = request.url.path
+    if path.startswith("/api/") and not path.startswith("/api/prewarm/"):
+        _last_api_activity = time.time()
 
     # Remote auth gate: local requests are always allowed.
     if _requires_remote_auth() and (not _is_local_request(request)):
@@ -197,7 +249,21 @@ async def add_no_cache_headers(request: Request, call_next):
 
 db = DatabaseManager()
 ai_optimizer = AIPromptOptimizer()
-scanner = ImageScanner(db)
+thumb_cache = ThumbnailCache(os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".thumbs"
+))
+thumb_cache_manager = ThumbnailCacheManager(thumb_cache, db, max_mb=THUMB_CACHE_MAX_MB)
+
+def _is_idle_for_prewarm() -> bool:
+    """Web 端无请求、ComfyUI 无执行任务、且没有在扫描时才预热"""
+    if time.time() - _last_api_activity < PREWARM_IDLE_SECONDS:
+        return False
+    if progress_tracker.current_task_id is not None:
+        return False
+    return not getattr(scanner, "_is_scanning", False)
+
+thumb_prewarmer = ThumbnailPrewarmer(thumb_cache, sizes=WEB_THUMB_SIZES, idle_check=_is_idle_for_prewarm)
+scanner = ImageScanner(db, on_indexed=thumb_prewarmer.enqueue)
 
 # --- Core Logic ---
 
@@ -291,6 +357,7 @@ async def get_images(
             "width": info.get('width', 0) or 0,
             "height": info.get('height', 0) or 0,
             "file_mtime": info.get('file_mtime', 0) or 0,
+            "placeholder": info.get('placeholder', '') or '',
         })
     has_more = (start_idx + page_size) < total
     return {"total": total, "page": page, "page_size": page_size, "images": valid_images, "has_more": has_more}
@@ -446,6 +513,33 @@ async def get_full_queue():
     except Exception as e:
         return {"pending": [], "queue_remaining": 0, "running_count": 0, "pending_count": 0, "active_count": 0}
 
+@app.get("/api/comfy/preview/stream")
+async def stream_previews(request: Request):
+    """以 SSE 推送采样预览；每个连接只保留最新一帧，推送频率上限 30 fps"""
+    queue = progress_tracker.subscribe_previews()
+
+    async def events():
+        try:
+            last_sent = 0.0
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=PREVIEW_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                wait = PREVIEW_MIN_INTERVAL - (time.monotonic() - last_sent)
+                if wait > 0 and not event.get("done"):
+                    # 等待期间到达的新帧会覆盖队列中的旧帧，醒来后发送最新一帧
+                    await asyncio.sleep(wait)
+                    if not queue.empty():
+                        event = queue.get_nowait()
+                last_sent = time.monotonic()
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            progress_tracker.unsubscribe_previews(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/api/comfy/interrupt")
 async def interrupt_task():
     try:
@@ -579,22 +673,38 @@ async def trigger_scan():
 def get_thumbnail(path: str, size: int = 768):
     normalized_path = validate_path_security(path)
     if not os.path.exists(normalized_path): raise HTTPException(status_code=404, detail="Original image not found")
-    import hashlib
-    from PIL import Image
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    cache_dir = os.path.join(base_dir, ".thumbs")
-    os.makedirs(cache_dir, exist_ok=True)
-    file_hash = hashlib.md5(path.replace("\\", "/").encode('utf-8')).hexdigest()
     mtime = int(os.path.getmtime(normalized_path))
-    thumb_path = os.path.join(cache_dir, f"{file_hash}_{mtime}_w{size}.webp")
-    if os.path.exists(thumb_path): return FileResponse(thumb_path)
-    try:
-        with Image.open(normalized_path) as img:
-            img.thumbnail((min(size, 2560), min(size, 2560)), resample=getattr(Image, 'Resampling', Image).LANCZOS)
-            img.save(thumb_path, "WEBP", quality=85)
+    thumb_path = thumb_cache.get_variant_path(path, size, mtime)
+    if os.path.exists(thumb_path):
+        thumb_cache.record_access(thumb_path, True)
         return FileResponse(thumb_path)
+    thumb_cache.record_access(thumb_path, False)
+    try:
+        return FileResponse(thumb_cache.render_variant(normalized_path, size, mtime))
     except: return FileResponse(normalized_path)
 
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return thumb_cache_manager.get_stats()
+
+@app.post("/api/cache/sweep")
+def sweep_cache():
+    return thumb_cache_manager.sweep()
+
+@app.get("/api/prewarm/status")
+async def get_prewarm_status():
+    return thumb_prewarmer.get_status()
+
+@app.post("/api/prewarm/start")
+async def start_prewarm():
+    thumb_prewarmer.start()
+    return thumb_prewarmer.get_status()
+
+@app.post("/api/prewarm/cancel")
+async def cancel_prewarm(data: Dict[str, Any] = Body(default={})):
+    thumb_prewarmer.cancel(clear_queue=bool((data or {}).get("clear", False)))
+    return thumb_prewarmer.get_status()
+
 @app.delete("/api/image")
 async def delete_image(path: str):
     try:
@@ -621,7 +731,9 @@ if __name__ == "__main__":
     parser.add_argument("--comfy-host", type=str, default="127.0.0.1", help="ComfyUI host")
     parser.add_argument("--comfy-port", type=str, default="8189", help="ComfyUI port")
     parser.add_argument("--remote-access-code", type=str, default="", help="Remote web login code")
+    parser.add_argument("--thumb-cache-mb", type=int, default=THUMB_CACHE_MAX_MB, help="Thumbnail cache disk budget (MB)")
     args = parser.parse_args()
+    THUMB_CACHE_MAX_MB = args.thumb_cache_mb
     
     # Update global config
     COMFY_ADDRESS = f"{args.comfy_host}:{args.comfy_port}"
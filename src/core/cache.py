@@ -14,45 +14,105 @@ class ThumbnailCache:
                 os.makedirs(cache_dir, exist_ok=True)
             except:
                 pass
+        # 命中统计 (供 ThumbnailCacheManager 汇总命中率)
+        self.hits = 0
+        self.misses = 0
+        # 可选：每写入一个缩略图后回调 (字节数)，由 ThumbnailCacheManager 挂接以及时执行预算淘汰
+        self.on_written = None
+
+    @staticmethod
+    def path_hash(file_path):
+        """缓存文件名使用的路径哈希 (桌面端与 Web 端共用同一规则)"""
+        norm_path = os.path.normpath(file_path).replace("\\", "/")
+        return hashlib.md5(norm_path.encode('utf-8')).hexdigest()
 
     def _get_cache_path(self, file_path):
         """为文件生成唯一的缓存路径 (使用 MD5 避免路径冲突)"""
         norm_path = os.path.normpath(file_path).replace("\\", "/")
-        file_hash = hashlib.md5(norm_path.encode('utf-8')).hexdigest()
+        file_hash = self.path_hash(file_path)
         # 记录 mtime 确保图片更新时缓存同步刷新
         try:
             mtime = int(os.path.getmtime(norm_path))
         except:
             mtime = 0
-            
+
         return os.path.join(self.cache_dir, f"{file_hash}_{mtime}.webp")
 
+    def get_variant_path(self, file_path, size, mtime=None):
+        """Web 端按尺寸生成的缩略图路径: {hash}_{mtime}_w{size}.webp"""
+        if mtime is None:
+            try:
+                mtime = int(os.path.getmtime(file_path))
+            except:
+                mtime = 0
+        return os.path.join(self.cache_dir, f"{self.path_hash(file_path)}_{int(mtime)}_w{int(size)}.webp")
+
+    def render_variant(self, file_path, size, mtime=None):
+        """用 PIL 生成 Web 端尺寸变体 (线程安全，不依赖 Qt)，返回缓存路径"""
+        from PIL import Image
+        thumb_path = self.get_variant_path(file_path, size, mtime)
+        with Image.open(file_path) as img:
+            limit = min(int(size), 2560)
+            # JPEG 可在解码阶段直接降采样，显著减少大图解码耗时
+            img.draft('RGB', (limit, limit))
+            img.thumbnail((limit, limit), resample=getattr(Image, 'Resampling', Image).LANCZOS)
+            img.save(thumb_path, "WEBP", quality=85)
+        self._notify_written(thumb_path)
+        return thumb_path
+
+    def record_access(self, cache_path, hit):
+        """记录一次缓存访问；命中时刷新文件时间戳，作为 LRU 淘汰依据"""
+        if hit:
+            self.hits += 1
+            try:
+                # 许多文件系统关闭了 atime，这里显式 touch
+                os.utime(cache_path, None)
+            except OSError:
+                pass
+        else:
+            self.misses += 1
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
     def get_thumbnail(self, file_path):
         """尝试读取缓存"""
         cache_path = self._get_cache_path(file_path)
         if os.path.exists(cache_path):
             img = QImage(cache_path)
             if not img.isNull():
+                self.record_access(cache_path, True)
                 return img
+        self.record_access(cache_path, False)
         return None
 
     def save_thumbnail(self, file_path, qimage):
         """保存缩略图到缓存 (128x128 限制)"""
         cache_path = self._get_cache_path(file_path)
-        
+
         # 清理旧版本的同一文件的缓存 (可选，但推荐)
         self._cleanup_old_versions(file_path)
-        
+
         # 保存为 WebP
-        qimage.save(cache_path, "WEBP")
+        if qimage.save(cache_path, "WEBP"):
+            self._notify_written(cache_path)
+
+    def _notify_written(self, cache_path):
+        if self.on_written is None:
+            return
+        try:
+            self.on_written(os.path.getsize(cache_path))
+        except OSError:
+            pass
 
     def _cleanup_old_versions(self, file_path):
         """删除旧的缓存文件以节省空间"""
-        norm_path = os.path.normpath(file_path).replace("\\", "/")
-        file_hash = hashlib.md5(norm_path.encode('utf-8')).hexdigest()
+        file_hash = self.path_hash(file_path)
         try:
             for f in os.listdir(self.cache_dir):
-                if f.startswith(file_hash):
+                # 只清理桌面端主缩略图，Web 端尺寸变体交给 ThumbnailCacheManager 回收
+                if f.startswith(file_hash) and "_w" not in f:
                     os.remove(os.path.join(self.cache_dir, f))
         except:
             pass
@@ -0,0 +1,210 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.core.cache import ThumbnailCache
+
+# 缓存文件名: {md5}_{mtime}.webp (桌面端) / {md5}_{mtime}_w{size}.webp (Web 端尺寸变体)
+_ENTRY_RE = re.compile(r"^([0-9a-f]{32})_(\d+)(?:_w(\d+))?\.webp$")
+
+
+class ThumbnailCacheManager:
+    """
+    缩略图缓存管理：磁盘预算 (按最近访问淘汰)、孤儿条目回收与统计。
+    桌面端与 Web 服务共用同一个 .thumbs 目录，两边各自持有一个实例即可。
+    除低频的后台全量清理外，新写入累计达到预算的一定比例时也会 (限频) 在后台执行一次预算淘汰。
+    """
+    WRITE_CHECK_RATIO = 0.05      # 新写入累计超过预算的 5% 时检查一次预算
+    WRITE_CHECK_INTERVAL = 60     # 两次写入触发的检查至少间隔 (秒)
+
+    def __init__(self, cache: ThumbnailCache, db_manager=None, max_mb: int = 1024):
+        self.cache = cache
+        self.db = db_manager
+        self.max_bytes = max(int(max_mb), 0) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sweep_thread = None
+        self.last_sweep = {}
+        self._write_lock = threading.Lock()
+        self._written_bytes = 0
+        self._last_write_check = 0.0
+        self._write_check_running = False
+        cache.on_written = self.note_written
+
+    def set_budget_mb(self, max_mb: int) -> None:
+        self.max_bytes = max(int(max_mb), 0) * 1024 * 1024
+
+    def _list_entries(self) -> List[Dict[str, Any]]:
+        """列出缓存目录中的所有缩略图条目"""
+        entries = []
+        try:
+            with os.scandir(self.cache.cache_dir) as it:
+                for entry in it:
+                    if not entry.is_file():
+                        continue
+                    m = _ENTRY_RE.match(entry.name)
+                    if not m:
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append({
+                        'path': entry.path,
+                        'hash': m.group(1),
+                        'stamp': int(m.group(2)),
+                        'variant': int(m.group(3)) if m.group(3) else None,
+                        'size': st.st_size,
+                        # 命中时会 touch，取 atime/mtime 较大者作为最近访问时间
+                        'last_access': max(st.st_atime, st.st_mtime),
+                    })
+        except OSError as e:
+            print(f"[Cache] 无法读取缓存目录: {e}")
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def enforce_budget(self, max_bytes: Optional[int] = None) -> Tuple[int, int]:
+        """超出预算时按最近访问时间从旧到新淘汰，返回 (删除数量, 释放字节)"""
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        if budget <= 0:
+            return 0, 0
+        with self._lock:
+            entries = self._list_entries()
+            total = sum(e['size'] for e in entries)
+            if total <= budget:
+                return 0, 0
+            # 淘汰到预算的 90%，避免每次新增一张就触发一次淘汰
+            target = int(budget * 0.9)
+            entries.sort(key=lambda e: e['last_access'])
+            removed, freed = 0, 0
+            for e in entries:
+                if total <= target:
+                    break
+                if self._remove(e['path']):
+                    total -= e['size']
+                    freed += e['size']
+                    removed += 1
+            if removed:
+                print(f"[Cache] 超出预算，已淘汰 {removed} 个缩略图 ({freed / 1024 / 1024:.1f} MB)")
+            return removed, freed
+
+    def note_written(self, size: int) -> None:
+        """缩略图写入回调 (任意线程)：累计写入量超过阈值且距上次检查足够久时，在后台线程执行一次预算淘汰"""
+        if self.max_bytes <= 0:
+            return
+        with self._write_lock:
+            self._written_bytes += size
+            if (self._write_check_running
+                    or self._written_bytes < self.max_bytes * self.WRITE_CHECK_RATIO
+                    or time.time() - self._last_write_check < self.WRITE_CHECK_INTERVAL):
+                return
+            self._written_bytes = 0
+            self._last_write_check = time.time()
+            self._write_check_running = True
+        threading.Thread(target=self._enforce_after_writes, daemon=True).start()
+
+    def _enforce_after_writes(self) -> None:
+        try:
+            self.enforce_budget()
+        except Exception as e:
+            print(f"[Cache] 预算淘汰失败: {e}")
+        finally:
+            with self._write_lock:
+                self._write_check_running = False
+
+    def collect_orphans(self) -> int:
+        """与数据库交叉比对，删除已删除图片和旧 mtime 版本的缩略图"""
+        if self.db is None:
+            return 0
+        try:
+            mtime_map = self.db.get_file_mtime_map()
+        except Exception as e:
+            print(f"[Cache] 读取索引失败，跳过孤儿回收: {e}")
+            return 0
+        by_hash = {}
+        for path, mtime in mtime_map.items():
+            by_hash[ThumbnailCache.path_hash(path)] = (path, int(mtime or 0))
+
+        removed = 0
+        with self._lock:
+            live_stamps: Dict[str, int] = {}
+            for e in self._list_entries():
+                if self._stop_event.is_set():
+                    break
+                known = by_hash.get(e['hash'])
+                orphan = known is None
+                if not orphan and e['stamp'] != known[1]:
+                    # 索引里的 mtime 可能滞后，以磁盘实际 mtime 为准
+                    stamp = live_stamps.get(e['hash'])
+                    if stamp is None:
+                        try:
+                            stamp = int(os.path.getmtime(known[0]))
+                        except OSError:
+                            stamp = -1
+                        live_stamps[e['hash']] = stamp
+                    orphan = e['stamp'] != stamp
+                if orphan and self._remove(e['path']):
+                    removed += 1
+        if removed:
+            print(f"[Cache] 已回收 {removed} 个孤儿缩略图")
+        return removed
+
+    def sweep(self) -> Dict[str, Any]:
+        """完整清理一次：先回收孤儿，再执行预算淘汰"""
+        start = time.time()
+        orphans = self.collect_orphans()
+        evicted, freed = self.enforce_budget()
+        self.last_sweep = {
+            'orphans_removed': orphans,
+            'evicted': evicted,
+            'freed_bytes': freed,
+            'duration': round(time.time() - start, 3),
+            'finished_at': time.time(),
+        }
+        return self.last_sweep
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓存大小、条目数和命中率"""
+        entries = self._list_entries()
+        return {
+            'size_bytes': sum(e['size'] for e in entries),
+            'entry_count': len(entries),
+            'variant_count': sum(1 for e in entries if e['variant'] is not None),
+            'max_bytes': self.max_bytes,
+            'hits': self.cache.hits,
+            'misses': self.cache.misses,
+            'hit_rate': round(self.cache.hit_rate(), 4),
+            'last_sweep': dict(self.last_sweep),
+        }
+
+    def start_background_sweep(self, interval_seconds: float = 1800, initial_delay: float = 60) -> None:
+        """启动后台清理线程 (守护线程，低频运行)"""
+        if self._sweep_thread and self._sweep_thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def _loop():
+            if self._stop_event.wait(initial_delay):
+                return
+            while not self._stop_event.is_set():
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"[Cache] 后台清理失败: {e}")
+                if self._stop_event.wait(interval_seconds):
+                    break
+
+        self._sweep_thread = threading.Thread(target=_loop, daemon=True)
+        self._sweep_thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
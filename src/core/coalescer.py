@@ -0,0 +1,86 @@
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Tuple
+
+from PyQt6.QtCore import QObject, QTimer
+
+
+class LatestValueCoalescer(QObject):
+    """
+    把高频更新合并为每个间隔只投递一次最新值 (默认约 30Hz，即每帧一次)。
+    - submit(key, callback, *args)：同一 key 在一个间隔内多次提交，只保留最后一次
+    - flush()：立即投递所有待处理的值 (用于保证与其他事件的先后顺序)
+    - cancel(key)：丢弃尚未投递的值
+    间隔取较大值 (如 2000ms) 时即为写回式节流 (write-behind)，用于持久化快照。
+    只在 UI 线程使用。
+    """
+    def __init__(self, interval_ms: int = 33, parent=None):
+        super().__init__(parent)
+        self._pending: Dict[str, Tuple[Callable, tuple]] = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def submit(self, key: str, callback: Callable, *args) -> None:
+        self._pending.pop(key, None)  # 重新插入，保持按最后提交的顺序投递
+        self._pending[key] = (callback, args)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def has_pending(self, key: str) -> bool:
+        return key in self._pending
+
+    def cancel(self, key: str) -> None:
+        self._pending.pop(key, None)
+        if not self._pending:
+            self._timer.stop()
+
+    def flush(self) -> None:
+        self._timer.stop()
+        pending, self._pending = self._pending, {}
+        for key, (callback, args) in pending.items():
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"[Coalescer] 投递 {key} 失败: {e}")
+
+
+class LogRingBuffer:
+    """
+    有上限的日志环形缓冲区，每条日志带递增序号。
+    消费方记住上次读到的序号，用 since() 只取新增部分，而不是每次重建全文。
+    clear() 不会重置序号，因此消费方不会漏读清空后新写入的日志。线程安全。
+    """
+    def __init__(self, maxlen: int = 2000):
+        self._entries: deque = deque(maxlen=maxlen)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @property
+    def maxlen(self) -> int:
+        return self._entries.maxlen
+
+    def append(self, line: str) -> None:
+        with self._lock:
+            self._seq += 1
+            self._entries.append((self._seq, line))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def since(self, seq: int) -> Tuple[List[str], int]:
+        """返回序号大于 seq 的日志 (超出缓冲区的旧日志已丢弃) 及最新序号"""
+        with self._lock:
+            if not self._entries or self._entries[-1][0] <= seq:
+                return [], self._seq
+            lines = [line for s, line in self._entries if s > seq]
+            return lines, self._seq
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            return [line for _, line in self._entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
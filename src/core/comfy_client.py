@@ -1,16 +1,36 @@
 import copy
 import json
+import random
 import uuid
+from urllib.parse import urlencode
 from typing import Dict, Any, Optional, List
 from PyQt6.QtCore import QObject, pyqtSignal, QUrl, QByteArray, QTimer
+from PyQt6.QtGui import QImage
 from PyQt6.QtWebSockets import QWebSocket
 from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply, QAbstractSocket
 
+from src.core.comfy_queue import ComfyQueueState
+from src.core.generation_scheduler import PRIORITY_INTERACTIVE, PRIORITY_SWEEP
+from src.core.preview_stream import FEATURE_FLAGS_MESSAGE, PreviewDecoder, parse_preview_frame
+from src.core.workflow_hash import workflow_hash
+from src.core.seed_batch import (
+    MAX_SEED_BATCH, collapse_seed_batch, latent_batch_slot, plan_seed_batches, split_batch_images,
+)
+
 class ComfyClient(QObject):
     """
     ComfyUI 远程通讯客户端
     负责通过 API 提交工作流并监听实时进度
     """
+    # 查询模型清单的加载器节点 (多后端调度时据此判断后端是否具备任务所需模型)
+    INVENTORY_NODES = ("CheckpointLoaderSimple", "UNETLoader", "VAELoader", "CLIPLoader", "DualCLIPLoader", "LoraLoader")
+    # status 报告的队列余量与本地状态不一致时，等待该时长仍未对上才发起 /queue 核对
+    # (提交响应可能晚于 status 消息到达)
+    RECONCILE_DELAY_MS = 300
+    # 资源状态轮询间隔：有任务时 / 空闲时
+    SYSTEM_STATS_BUSY_MS = 2000
+    SYSTEM_STATS_IDLE_MS = 10000
+
     status_changed = pyqtSignal(str) # 队列状态或错误信息
     progress_updated = pyqtSignal(int, int) # 当前步数, 总步数
     progress_detail_updated = pyqtSignal(dict) # 进度详情 (含 ETA)
@@ -20,7 +40,14 @@ class ComfyClient(QObject):
     prompt_submitted = pyqtSignal(str) # 任务提交成功，携带 prompt_id
     prompt_submitted_with_context = pyqtSignal(str, dict) # (prompt_id, context)
     prompt_executed_images = pyqtSignal(str, list, dict) # (prompt_id, images, context)
+    output_fetched = pyqtSignal(str, dict, bytes, dict) # (prompt_id, image_info, 图片字节, context)；取回失败时字节为空
+    preview_updated = pyqtSignal(str, QImage, dict) # 采样中的实时预览 (prompt_id, 预览图, context)
     models_fetched = pyqtSignal(list) # 获取到可用模型列表
+    model_inventory_updated = pyqtSignal() # 该后端各加载器可选的模型文件清单已更新
+    connection_changed = pyqtSignal(bool) # WebSocket 连接/断开
+    prompt_queued = pyqtSignal(str, dict) # (prompt_id, 提交时的原始 context)
+    prompt_failed = pyqtSignal(dict, bool) # (context, 是否可重试: 网络错误/5xx)
+    prompt_history_checked = pyqtSignal(str, bool) # (prompt_id, /history 中是否有记录)
     
     # 队列管理信号
     queue_updated = pyqtSignal(dict) # 队列状态更新
@@ -37,9 +64,31 @@ class ComfyClient(QObject):
         self.ws.connected.connect(self._on_connected)
         self.ws.disconnected.connect(self._on_disconnected)
         self.ws.textMessageReceived.connect(self._on_message)
+        self.ws.binaryMessageReceived.connect(self._on_binary_message)
         self.ws.errorOccurred.connect(self._on_error)
         self.current_prompt_graph = {} # 存储当前执行的图
         self._prompt_context_by_id: Dict[str, Dict[str, Any]] = {}
+        # 仅种子不同的批量任务合并为一个 batch_size=N 的任务 (设置项，默认关闭)
+        self.collapse_seed_batches = False
+        # 本地调度器 (GenerationScheduler)；设置后所有提交都经由它排队
+        self.scheduler = None
+        # 采样耗时统计 (StepTimingTracker)；设置后由执行/进度事件驱动，用于估算 ETA
+        self.step_timings = None
+        self.model_inventory: Optional[set] = None  # None 表示尚未获取
+        # 收到 executed 后立即经 /view 取回输出图片 (远程后端也适用)
+        self.fetch_outputs = True
+        # 二进制预览帧在后台线程解码，只保留最新一帧
+        self.preview_decoder = PreviewDecoder(self)
+        # 连接到绑定方法 (而非捕获 self 的 lambda)：客户端销毁后，已排队的解码结果随之自动断开
+        self.preview_decoder.decoded.connect(self._on_preview_decoded)
+        # 队列状态由 WebSocket 事件维护，只在出现缺口或重连时请求 /queue
+        self.queue_state = ComfyQueueState()
+        self.queue_state.on_retired = self._discard_timing
+        self._queue_reply: Optional[QNetworkReply] = None  # 进行中的 /queue 请求 (并发调用共用)
+        self.reconcile_timer = QTimer(self)
+        self.reconcile_timer.setSingleShot(True)
+        self.reconcile_timer.setInterval(self.RECONCILE_DELAY_MS)
+        self.reconcile_timer.timeout.connect(self._reconcile_queue)
         
         self.nam = QNetworkAccessManager() # 用于非阻塞 HTTP 请求
         self._system_stats_supported = True
@@ -49,9 +98,12 @@ class ComfyClient(QObject):
         self.reconnect_timer.setInterval(3000) # 3秒重连一次
         self.reconnect_timer.timeout.connect(self.connect_server)
         self.system_stats_timer = QTimer(self)
-        self.system_stats_timer.setInterval(2000)
+        self.system_stats_timer.setInterval(self.SYSTEM_STATS_IDLE_MS)
         self.system_stats_timer.timeout.connect(self.get_system_stats)
 
+    def _on_preview_decoded(self, prompt_id: str, image: QImage) -> None:
+        self.preview_updated.emit(prompt_id, image, self._prompt_context_by_id.get(prompt_id, {}))
+
     def connect_server(self):
         """连接 WebSocket 监听状态"""
         # 如果已经连接或正在连接，则跳过
@@ -60,20 +112,32 @@ class ComfyClient(QObject):
             
         ws_url = f"ws://{self.server_address}/ws?clientId={self.client_id}"
         self.ws.open(QUrl(ws_url))
+
+    def is_connected(self) -> bool:
+        return self.ws.state() == QAbstractSocket.SocketState.ConnectedState
     def _on_connected(self):
         print(f"[Comfy] WebSocket 已连接: {self.server_address}")
         self.status_changed.emit("ComfyUI 已连接")
         # 连接成功后停止重连并同步基础状态
         self.reconnect_timer.stop()
+        self.ws.sendTextMessage(FEATURE_FLAGS_MESSAGE)
+        self.connection_changed.emit(True)
         if self._system_stats_supported and not self.system_stats_timer.isActive():
             self.system_stats_timer.start()
             self.get_system_stats()
         self.fetch_available_models()
+        self.fetch_model_inventory()
         # 重启后尽快同步队列，便于主界面恢复进度展示
         QTimer.singleShot(100, self.get_queue)
     def _on_disconnected(self):
         print(f"[Comfy] WebSocket 连接断开")
         self.status_changed.emit("连接断开，正在重连...")
+        # 断线期间的事件已丢失，重连后以 /queue 为准；执行中任务的计时不再可靠
+        self.reconcile_timer.stop()
+        self.queue_state.remaining = None
+        for prompt_id in list(self.queue_state.running):
+            self._discard_timing(prompt_id)
+        self.connection_changed.emit(False)
         if self.system_stats_timer.isActive():
             self.system_stats_timer.stop()
         if not self.reconnect_timer.isActive():
@@ -96,42 +160,69 @@ class ComfyClient(QObject):
             msg_type = data.get("type")
             
             # 打印非心跳消息以调试
-            if msg_type not in ['crystools.monitor', 'status', 'progress_state', 'progress', 'executing', 'executed']:
+            if msg_type not in ['crystools.monitor', 'status', 'progress_state', 'progress', 'executing', 'executed',
+                                'execution_start', 'execution_cached', 'execution_success']:
                 print(f"[Comfy WS] Type: {msg_type}, Data: {data}")
             
             if msg_type == "status":
                 queue_remaining = data["data"]["status"]["exec_info"]["queue_remaining"]
                 
-                # [Real-time] 检测队列余量变化
-                if hasattr(self, "_last_queue_remaining"):
-                    if queue_remaining != self._last_queue_remaining:
-                        # 队列余量变化（可能有新任务或任务完成），立即刷新完整队列数据
-                        self.get_queue()
-                self._last_queue_remaining = queue_remaining
+                # [Real-time] 余量与本地队列状态对不上 (其他客户端提交、漏掉事件) 时稍后核对
+                self.queue_state.remaining = queue_remaining
+                if self.queue_state.in_sync():
+                    self.reconcile_timer.stop()
+                elif not self.reconcile_timer.isActive():
+                    self.reconcile_timer.start()
                 
                 if queue_remaining > 0:
                     self.status_changed.emit(f"队列待处理: {queue_remaining}")
             
+            elif msg_type == "execution_start":
+                prompt_id = str(data.get("data", {}).get("prompt_id") or "")
+                if prompt_id:
+                    if not self.queue_state.start(prompt_id):
+                        self.reconcile_timer.start()
+                    if self.step_timings is not None:
+                        self.step_timings.start(prompt_id, self._running_graph(prompt_id), self.server_address)
+                    self._emit_queue_state()
+
             elif msg_type == "executing":
                 node_id = data["data"]["node"]
+                prompt_id = self._event_prompt_id(data)
                 if node_id:
                     node_type = "Unknown"
-                    if node_id in self.current_prompt_graph:
-                        node_type = self.current_prompt_graph[node_id].get('class_type', 'Unknown')
+                    graph = self._running_graph(prompt_id) or self.current_prompt_graph
+                    if node_id in graph:
+                        node_type = graph[node_id].get('class_type', 'Unknown')
+                    if self.step_timings is not None:
+                        self.step_timings.node(prompt_id, node_type)
                     self.execution_start.emit(node_id, node_type)
                 else:
                     # [Real-time] node 为 None 表示当前 Prompt 整体执行完毕
+                    if self.step_timings is not None:
+                        self.step_timings.finish(prompt_id)
                     self.status_changed.emit("所有任务已完成")
                     self.execution_done.emit("")
-                    QTimer.singleShot(500, self.get_queue) # 稍作延迟确保后端状态已更新
+                    if self.queue_state.finish(data["data"].get("prompt_id")):
+                        self._emit_queue_state()
             
-            elif msg_type == "execution_error":
-                # [Real-time] 执行报错也需要刷新队列（任务可能被强行中止）
-                print(f"[Comfy] 采样过程中发生错误")
-                self.get_queue()
+            elif msg_type in ("execution_success", "execution_error", "execution_interrupted"):
+                prompt_id = str(data.get("data", {}).get("prompt_id") or "")
+                if msg_type == "execution_error":
+                    print(f"[Comfy] 采样过程中发生错误")
+                if self.step_timings is not None:
+                    if msg_type == "execution_success":
+                        self.step_timings.finish(prompt_id)
+                    else:
+                        self.step_timings.discard(prompt_id)
+                # 报错/中断时不一定有 executing(None)，在此结束该任务
+                if self.queue_state.finish(prompt_id):
+                    self._emit_queue_state()
 
             elif msg_type in ("progress", "progress_state"):
                 progress_info = self._parse_progress_payload(data.get("data"))
+                if self.step_timings is not None and msg_type == "progress":
+                    self.step_timings.progress(self._event_prompt_id(data), progress_info["value"], progress_info["max"])
                 self.progress_detail_updated.emit(progress_info)
                 self.progress_updated.emit(progress_info["value"], progress_info["max"])
 
@@ -142,11 +233,48 @@ class ComfyClient(QObject):
                 images = self._extract_images_from_output(output)
                 if images:
                     context = self._prompt_context_by_id.get(prompt_id, {})
-                    self.prompt_executed_images.emit(prompt_id, images, context)
+                    # 合并任务的图片按 batch_index 拆回各逻辑任务
+                    for batch_images, batch_context in split_batch_images(images, context):
+                        self.prompt_executed_images.emit(prompt_id, batch_images, batch_context)
+                        if self.fetch_outputs:
+                            for image in batch_images:
+                                # 临时预览 (type=temp) 只在对比任务等等待结果的场景下取回
+                                if image.get("type", "output") == "output" or batch_context.get("session_id"):
+                                    self.fetch_output(prompt_id, image, batch_context)
                 
         except Exception as e:
             print(f"[Comfy] 消息处理异常: {e}")
 
+    def _discard_timing(self, prompt_id: str) -> None:
+        """结束事件缺失的任务不再参与 ETA (正常结束的任务此前已由 finish 记录)"""
+        if self.step_timings is not None:
+            self.step_timings.discard(prompt_id)
+
+    def _event_prompt_id(self, data: Dict[str, Any]) -> str:
+        """事件所属的 prompt_id；旧版 ComfyUI 的消息不带时归属当前执行的任务"""
+        payload = data.get("data") if isinstance(data.get("data"), dict) else {}
+        prompt_id = str(payload.get("prompt_id") or "")
+        if not prompt_id and self.queue_state.running:
+            prompt_id = next(iter(self.queue_state.running))
+        return prompt_id
+
+    def _running_graph(self, prompt_id: str) -> Dict[str, Any]:
+        task = self.queue_state.running.get(prompt_id)
+        graph = task[2] if task and len(task) > 2 else None
+        return graph if isinstance(graph, dict) else {}
+
+    def _on_binary_message(self, message: QByteArray) -> None:
+        """采样预览帧 (需 ComfyUI 开启 --preview-method)：解析帧头后交给后台解码"""
+        frame = parse_preview_frame(bytes(message))
+        if frame is None:
+            return
+        metadata, payload, _ = frame
+        prompt_id = str(metadata.get("prompt_id") or "")
+        if not prompt_id and self.queue_state.running:
+            # 旧格式不带 prompt_id：归属当前执行的任务
+            prompt_id = next(iter(self.queue_state.running))
+        self.preview_decoder.submit(prompt_id, payload)
+
     def _extract_images_from_output(self, output: Any) -> List[Dict[str, Any]]:
         """从 executed.output 中提取 images 列表。"""
         images: List[Dict[str, Any]] = []
@@ -192,10 +320,13 @@ class ComfyClient(QObject):
         json_data = json.dumps(p).encode('utf-8')
         reply = self.nam.post(request, QByteArray(json_data))
         ctx = dict(context or {})
+        # 实际提交的可执行图哈希随 context 传到出图回调，写入来源表用于识别重复生成
+        digest = workflow_hash(workflow_json)
+        if digest:
+            ctx["workflow_hash"] = digest
+            if ctx.get("batch_contexts"):
+                ctx["batch_contexts"] = [dict(c or {}, workflow_hash=digest) for c in ctx["batch_contexts"]]
         reply.finished.connect(lambda: self._handle_prompt_response(reply, workflow_json, ctx))
-        
-        # 在发送前检查队列状态，方便调试 (异步)
-        self.check_system_stats()
 
     def _handle_prompt_response(
         self,
@@ -211,12 +342,18 @@ class ComfyClient(QObject):
                 print(f"[Comfy] 任务提交成功, Prompt ID: {prompt_id}")
                 if prompt_id:
                     self.prompt_submitted.emit(prompt_id)
+                    self.prompt_queued.emit(str(prompt_id), dict(context or {}))
                     ctx = dict(context or {})
                     self._prompt_context_by_id[str(prompt_id)] = ctx
-                    self.prompt_submitted_with_context.emit(str(prompt_id), ctx)
+                    for logical_ctx in ctx.get("batch_contexts") or [ctx]:
+                        self.prompt_submitted_with_context.emit(str(prompt_id), logical_ctx)
+                    if self.queue_state.add_pending(str(prompt_id), data.get("number"), workflow_json):
+                        self._emit_queue_state()
             else:
                 err_msg = reply.errorString()
                 print(f"[Comfy] 任务提交失败: {err_msg}")
+                status_code = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+                self.prompt_failed.emit(dict(context or {}), status_code is None or int(status_code) >= 500)
                 
                 # 尝试读取服务器返回的详细错误信息
                 response_body = bytes(reply.readAll()).decode('utf-8')
@@ -258,6 +395,14 @@ class ComfyClient(QObject):
         finally:
             reply.deleteLater()
 
+    def _dispatch(self, items: List[Any], priority: int) -> None:
+        """[(workflow, context)] 交给调度器排队；未设置调度器时直接提交"""
+        if self.scheduler is not None:
+            self.scheduler.enqueue_many(items, priority)
+            return
+        for workflow, context in items:
+            self.send_prompt(workflow, context=context)
+
     def submit_workflow_batch(
         self,
         workflows: List[Dict[str, Any]],
@@ -268,11 +413,65 @@ class ComfyClient(QObject):
             return
 
         self.status_changed.emit(f"正在提交 {len(workflows)} 个任务...")
+        if self.collapse_seed_batches:
+            padded = [(contexts[idx] if contexts and idx < len(contexts) else None) for idx in range(len(workflows))]
+            planned = plan_seed_batches(workflows, padded)
+            if len(planned) < len(workflows):
+                print(f"[Comfy] {len(workflows)} 个任务合并为 {len(planned)} 次提交 (仅种子不同)")
+            self._dispatch(planned, PRIORITY_SWEEP)
+            return
+        items = []
         for idx, workflow in enumerate(workflows):
             context = None
             if contexts and idx < len(contexts):
                 context = contexts[idx]
-            self.send_prompt(workflow, context=context)
+            items.append((workflow, context))
+        self._dispatch(items, PRIORITY_SWEEP)
+
+    def _submit_seed_batches(self, workflow: Dict[str, Any], batch_count: int) -> bool:
+        """
+        把 batch_count 个随机种子任务合并为 batch_size 不超过 MAX_SEED_BATCH 的批次任务提交。
+        工作流没有可调 batch_size 的 Latent 节点时返回 False，由调用方逐个提交。
+        """
+        if batch_count <= 1 or not isinstance(workflow, dict) or latent_batch_slot(workflow) is None:
+            return False
+        items = []
+        remaining = batch_count
+        while remaining > 0:
+            count = min(remaining, MAX_SEED_BATCH)
+            if count == 1:
+                items.append((ComfyClient.randomize_workflow_seeds(workflow), None))
+            else:
+                seed = random.SystemRandom().randint(10**17, 18446744073709551614)
+                batched = collapse_seed_batch(workflow, count, seed)
+                print(f"[Comfy] 合并 {count} 个随机种子任务为 1 个批次 (seed={seed})")
+                items.append((batched, {"seed_batch": {"seed": seed, "count": count}}))
+            remaining -= count
+        self._dispatch(items, PRIORITY_INTERACTIVE)
+        return True
+
+    def fetch_output(self, prompt_id: str, image_info: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> None:
+        """通过 /view 下载一张输出图片，结果经 output_fetched 发出"""
+        query = urlencode({
+            "filename": image_info.get("filename", ""),
+            "subfolder": image_info.get("subfolder", ""),
+            "type": image_info.get("type", "output"),
+        })
+        reply = self.nam.get(QNetworkRequest(QUrl(f"http://{self.server_address}/view?{query}")))
+        ctx = dict(context or {})
+        reply.finished.connect(lambda: self._handle_output_response(reply, prompt_id, dict(image_info), ctx))
+
+    def _handle_output_response(self, reply: QNetworkReply, prompt_id: str,
+                                image_info: Dict[str, Any], context: Dict[str, Any]) -> None:
+        data = b""
+        try:
+            if reply.error() == QNetworkReply.NetworkError.NoError:
+                data = bytes(reply.readAll())
+            else:
+                print(f"[Comfy] 获取输出图片失败 {image_info.get('filename')}: {reply.errorString()}")
+        finally:
+            reply.deleteLater()
+        self.output_fetched.emit(prompt_id, image_info, data, context)
 
     def get_history(self, prompt_id: str) -> None:
         """获取任务执行历史（异步，暂未完全实现信号回调，仅用于兼容性）"""
@@ -281,24 +480,21 @@ class ComfyClient(QObject):
         print(f"[Comfy] Warning: get_history called but async return not implemented.")
         # 如果将来需要，应添加 history_received 信号
 
-    def check_system_stats(self) -> None:
-        """检查系统状态（异步）"""
-        url = QUrl(f"http://{self.server_address}/queue")
+    def check_prompt_history(self, prompt_id: str) -> None:
+        """查询 /history/{prompt_id}，结果通过 prompt_history_checked 发出"""
+        url = QUrl(f"http://{self.server_address}/history/{prompt_id}")
         reply = self.nam.get(QNetworkRequest(url))
-        reply.finished.connect(lambda: self._handle_stats_response(reply))
+        reply.finished.connect(lambda: self._handle_prompt_history_response(reply, prompt_id))
 
-    def _handle_stats_response(self, reply: QNetworkReply) -> None:
+    def _handle_prompt_history_response(self, reply: QNetworkReply, prompt_id: str) -> None:
         try:
-            if reply.error() == QNetworkReply.NetworkError.NoError:
-                queue_data = json.loads(bytes(reply.readAll()).decode('utf-8'))
-                pending = queue_data.get('queue_pending', [])
-                running = queue_data.get('queue_running', [])
-                # print(f"[Comfy] 当前队列: Running={len(running)}, Pending={len(pending)}")
-                # 可以在这里 emit 信号更新 UI
-            else:
-                print(f"[Comfy] 获取队列失败: {reply.errorString()}")
+            if reply.error() != QNetworkReply.NetworkError.NoError:
+                print(f"[Comfy] 查询任务记录失败: {reply.errorString()}")
+                return
+            data = json.loads(bytes(reply.readAll()).decode('utf-8'))
+            self.prompt_history_checked.emit(prompt_id, isinstance(data, dict) and prompt_id in data)
         except Exception as e:
-            print(f"[Comfy] 队列响应解析失败: {e}")
+            print(f"[Comfy] 解析任务记录失败: {e}")
         finally:
             reply.deleteLater()
 
@@ -502,13 +698,17 @@ class ComfyClient(QObject):
             # 直接使用提供的workflow
             print(f"[Comfy] 使用提供的workflow (批量: {batch_count})")
             self.status_changed.emit(f"正在提交 {batch_count} 个任务...")
+            if randomize_seed and self.collapse_seed_batches and self._submit_seed_batches(workflow, batch_count):
+                return
             
+            items = []
             for i in range(batch_count):
                 if randomize_seed:
                     submit_workflow = ComfyClient.randomize_workflow_seeds(workflow)
                 else:
                     submit_workflow = copy.deepcopy(workflow)
-                self.send_prompt(submit_workflow)
+                items.append((submit_workflow, None))
+            self._dispatch(items, PRIORITY_INTERACTIVE)
         else:
             # 从历史记录获取
             print("[Comfy] queue_current_prompt: 正在获取最近的工作流...")
@@ -581,12 +781,12 @@ class ComfyClient(QObject):
             self._pending_batch_count = 1 # Reset
             
             self.status_changed.emit(f"已获取workflow，正在提交 {batch_count} 个任务...")
+            if self.collapse_seed_batches and self._submit_seed_batches(workflow, batch_count):
+                return
             
-            for i in range(batch_count):
-                # 修改随机种子避免生成相同图片
-                modified_workflow = ComfyClient.randomize_workflow_seeds(workflow)
-                # 提交到队列
-                self.send_prompt(modified_workflow)
+            # 修改随机种子避免生成相同图片
+            items = [(ComfyClient.randomize_workflow_seeds(workflow), None) for _ in range(batch_count)]
+            self._dispatch(items, PRIORITY_INTERACTIVE)
             
         except Exception as e:
             import traceback
@@ -644,6 +844,35 @@ class ComfyClient(QObject):
         finally:
             reply.deleteLater()
 
+    def fetch_model_inventory(self) -> None:
+        """获取各加载器节点的可选模型文件名 (/object_info/<节点>)，合并到 model_inventory"""
+        self._inventory_parts: Dict[str, set] = {}
+        for node_class in self.INVENTORY_NODES:
+            request = QNetworkRequest(QUrl(f"http://{self.server_address}/object_info/{node_class}"))
+            request.setTransferTimeout(5000)
+            reply = self.nam.get(request)
+            reply.finished.connect(lambda r=reply, n=node_class: self._handle_inventory_response(r, n))
+
+    def _handle_inventory_response(self, reply: QNetworkReply, node_class: str) -> None:
+        try:
+            if reply.error() != QNetworkReply.NetworkError.NoError:
+                return
+            data = json.loads(bytes(reply.readAll()).decode('utf-8'))
+            names = set()
+            node_inputs = data.get(node_class, {}).get("input", {}) if isinstance(data, dict) else {}
+            for group in ("required", "optional"):
+                for param in (node_inputs.get(group) or {}).values():
+                    # 下拉选项的格式为 [[选项...], {配置}]
+                    if isinstance(param, list) and param and isinstance(param[0], list):
+                        names.update(v for v in param[0] if isinstance(v, str))
+            self._inventory_parts[node_class] = names
+            self.model_inventory = set().union(*self._inventory_parts.values())
+            self.model_inventory_updated.emit()
+        except Exception as e:
+            print(f"[Comfy] 模型清单解析异常 ({node_class}): {e}")
+        finally:
+            reply.deleteLater()
+
     @staticmethod
     def randomize_workflow_seeds(workflow: Any) -> Any:
         """
@@ -651,20 +880,40 @@ class ComfyClient(QObject):
         返回修改后的workflow副本
         支持字典格式和列表格式的workflow
         """
-        import json
-        import random
-        
-        # 深拷贝
-        workflow_copy = json.loads(json.dumps(workflow))
-        
-        if isinstance(workflow_copy, dict):
-            for node_id, node_data in workflow_copy.items():
-                ComfyClient._randomize_node_seed(node_id, node_data)
-        elif isinstance(workflow_copy, list):
-            for node_data in workflow_copy:
-                node_id = node_data.get("id", "unknown")
-                ComfyClient._randomize_node_seed(node_id, node_data)
+        # 只复制含 seed 的采样器节点，其余节点与原 workflow 共享 (提交时只做序列化，不会修改)
+        if isinstance(workflow, dict):
+            workflow_copy = dict(workflow)
+            for node_id, node_data in workflow.items():
+                if ComfyClient._has_sampler_seed(node_data):
+                    node_copy = ComfyClient._copy_node_inputs(node_data)
+                    ComfyClient._randomize_node_seed(node_id, node_copy)
+                    workflow_copy[node_id] = node_copy
+        elif isinstance(workflow, list):
+            workflow_copy = list(workflow)
+            for idx, node_data in enumerate(workflow):
+                if ComfyClient._has_sampler_seed(node_data):
+                    node_copy = ComfyClient._copy_node_inputs(node_data)
+                    ComfyClient._randomize_node_seed(node_data.get("id", "unknown"), node_copy)
+                    workflow_copy[idx] = node_copy
+        else:
+            workflow_copy = copy.deepcopy(workflow)
         return workflow_copy
+
+    @staticmethod
+    def _has_sampler_seed(node_data: Any) -> bool:
+        if not isinstance(node_data, dict):
+            return False
+        class_type = node_data.get("class_type", "")
+        if "sampler" not in class_type.lower() and class_type != "KSampler":
+            return False
+        inputs = node_data.get("inputs", {})
+        return isinstance(inputs, dict) and "seed" in inputs
+
+    @staticmethod
+    def _copy_node_inputs(node_data: Dict[str, Any]) -> Dict[str, Any]:
+        node_copy = dict(node_data)
+        node_copy["inputs"] = dict(node_data.get("inputs", {}))
+        return node_copy
     
     @staticmethod
     def _randomize_node_seed(node_id: Any, node_data: Dict[str, Any]) -> None:
@@ -681,25 +930,46 @@ class ComfyClient(QObject):
 
     # ========== 队列管理方法 ==========
     
+    def queue_snapshot(self) -> Dict[str, Any]:
+        """本地维护的队列状态 (与 /queue 响应同格式)"""
+        return self.queue_state.snapshot()
+
+    def _emit_queue_state(self) -> None:
+        busy = self.queue_state.count() > 0
+        self.system_stats_timer.setInterval(self.SYSTEM_STATS_BUSY_MS if busy else self.SYSTEM_STATS_IDLE_MS)
+        self.queue_updated.emit(self.queue_state.snapshot())
+
+    def _reconcile_queue(self) -> None:
+        if not self.queue_state.in_sync():
+            print(f"[Comfy Queue] 队列余量 {self.queue_state.remaining} 与本地 {self.queue_state.count()} 不一致，重新核对")
+            self.get_queue()
+
     def get_queue(self):
-        """获取当前队列状态"""
+        """从 /queue 全量核对队列状态 (已有请求在途时不重复发送，结果通过 queue_updated 发出)"""
+        if self._queue_reply is not None:
+            return
         url = QUrl(f"http://{self.server_address}/queue")
         request = QNetworkRequest(url)
         reply = self.nam.get(request)
+        self._queue_reply = reply
         reply.finished.connect(lambda: self._handle_queue_response(reply))
     
     def _handle_queue_response(self, reply: QNetworkReply):
         """处理队列查询响应"""
+        self._queue_reply = None
         try:
             if reply.error() != QNetworkReply.NetworkError.NoError:
                 print(f"[Comfy Queue] 查询失败: {reply.errorString()}")
                 return
             
             data = json.loads(bytes(reply.readAll()).decode())
-            # print(f"[Comfy Queue] 当前队列: Running={len(data.get('queue_running', []))}, Pending={len(data.get('queue_pending', []))}")
-            
-            # 发送信号
-            self.queue_updated.emit(data)
+            if isinstance(data, dict):
+                previous = set(self.queue_state.running)
+                self.queue_state.reset(data)
+                for prompt_id in previous - set(self.queue_state.running):
+                    self._discard_timing(prompt_id)
+                self.reconcile_timer.stop()
+                self._emit_queue_state()
             
         except Exception as e:
             print(f"[Comfy Queue] 解析队列数据失败: {e}")
@@ -735,6 +1005,8 @@ class ComfyClient(QObject):
                 print(f"[Comfy Queue] 无法解析响应: {resp_raw}")
             
             print(f"[Comfy Queue] 已成功发送取消请求: {prompt_id}")
+            if self.queue_state.remove(str(prompt_id)):
+                self._emit_queue_state()
             self.task_cancelled.emit(prompt_id)
             
         except Exception as e:
@@ -764,6 +1036,8 @@ class ComfyClient(QObject):
                 return
             
             print(f"[Comfy Queue] 队列已清空")
+            if self.queue_state.clear_pending():
+                self._emit_queue_state()
             self.queue_cleared.emit()
             
         except Exception as e:
@@ -771,8 +1045,8 @@ class ComfyClient(QObject):
         finally:
             reply.deleteLater()
     
-    def interrupt_current(self):
-        """中断当前任务"""
+    def interrupt_current(self, prompt_id: Optional[str] = None):
+        """中断当前任务 (prompt_id 仅供多后端时定位后端，单后端忽略)"""
         url = QUrl(f"http://{self.server_address}/interrupt")
         request = QNetworkRequest(url)
         
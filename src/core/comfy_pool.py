@@ -0,0 +1,227 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from src.core.comfy_client import ComfyClient
+
+
+def parse_backend_addresses(text: str) -> List[str]:
+    """解析设置中的额外后端地址 (逗号 / 分号 / 空白分隔)，去重并保持顺序"""
+    addresses = []
+    for part in re.split(r"[\s,;]+", str(text or "")):
+        part = part.strip().rstrip("/")
+        for prefix in ("http://", "https://", "ws://"):
+            if part.startswith(prefix):
+                part = part[len(prefix):]
+        if part and part not in addresses:
+            addresses.append(part)
+    return addresses
+
+
+class ComfyBackendPool(QObject):
+    """
+    多个 ComfyUI 后端的聚合视图。
+    - 主后端即原有的 ComfyClient (模型列表、系统状态等仍只来自主后端)；额外后端各自一个 ComfyClient，
+      拥有独立的 WebSocket 与队列状态
+    - 生成相关信号 (进度、执行、提交、出图、取回的输出、实时预览、队列) 汇总后以与 ComfyClient 同名的信号发出，界面只需连接本对象
+    - 队列操作 (查询/取消/清空/中断) 按 prompt_id 路由到所属后端
+    任务分派由 GenerationScheduler 负责 (backend_added / backend_removed 通知其增减后端)。
+    """
+    status_changed = pyqtSignal(str)
+    progress_updated = pyqtSignal(int, int)
+    progress_detail_updated = pyqtSignal(dict)
+    execution_start = pyqtSignal(str, str)
+    execution_done = pyqtSignal(str)
+    prompt_submitted = pyqtSignal(str)
+    prompt_submitted_with_context = pyqtSignal(str, dict)
+    prompt_executed_images = pyqtSignal(str, list, dict)
+    output_fetched = pyqtSignal(str, dict, bytes, dict)
+    preview_updated = pyqtSignal(str, QImage, dict)
+    queue_updated = pyqtSignal(dict)
+    task_cancelled = pyqtSignal(str)
+    queue_cleared = pyqtSignal()
+    operation_failed = pyqtSignal(str)
+    backend_added = pyqtSignal(object)
+    backend_removed = pyqtSignal(object)
+
+    MAX_TRACKED_PROMPTS = 4096
+
+    def __init__(self, primary: ComfyClient, parent=None):
+        super().__init__(parent)
+        self.primary = primary
+        self.extras: Dict[str, ComfyClient] = {}
+        self._snapshots: Dict[ComfyClient, Dict[str, Any]] = {}
+        self._progress: Dict[ComfyClient, Tuple[int, int]] = {}
+        self._owner: Dict[str, ComfyClient] = {}  # prompt_id -> 所属后端
+        self._attach(primary)
+
+    def backends(self) -> List[ComfyClient]:
+        return [self.primary] + list(self.extras.values())
+
+    def set_extra_addresses(self, addresses: List[str]) -> None:
+        """按地址列表增删额外后端 (与主后端相同的地址忽略)"""
+        wanted = [a for a in addresses if a and a != self.primary.server_address]
+        for address in list(self.extras):
+            if address not in wanted:
+                client = self.extras.pop(address)
+                self.backend_removed.emit(client)
+                self._detach(client)
+                print(f"[ComfyPool] 移除后端: {address}")
+        for address in wanted:
+            if address in self.extras:
+                continue
+            client = ComfyClient(address)
+            client.collapse_seed_batches = self.primary.collapse_seed_batches
+            client.step_timings = self.primary.step_timings
+            self.extras[address] = client
+            self._attach(client)
+            self.backend_added.emit(client)
+            client.connect_server()
+            print(f"[ComfyPool] 添加后端: {address}")
+
+    # ---- 信号汇总 ----
+    def _attach(self, client: ComfyClient) -> None:
+        prefix = "" if client is self.primary else f"[{client.server_address}] "
+        client.status_changed.connect(lambda msg: self.status_changed.emit(prefix + msg))
+        client.progress_updated.connect(lambda value, total, c=client: self._on_progress(c, value, total))
+        client.progress_detail_updated.connect(lambda detail, c=client: self._on_progress_detail(c, detail))
+        client.execution_start.connect(self.execution_start)
+        client.execution_done.connect(lambda payload, c=client: self._on_execution_done(c, payload))
+        client.prompt_submitted.connect(lambda prompt_id, c=client: self._on_prompt_submitted(c, prompt_id))
+        client.prompt_submitted_with_context.connect(self.prompt_submitted_with_context)
+        client.prompt_executed_images.connect(self.prompt_executed_images)
+        client.output_fetched.connect(self.output_fetched)
+        client.preview_updated.connect(self.preview_updated)
+        client.queue_updated.connect(lambda data, c=client: self._on_queue_updated(c, data))
+        client.task_cancelled.connect(self.task_cancelled)
+        client.queue_cleared.connect(self.queue_cleared)
+        client.operation_failed.connect(lambda msg: self.operation_failed.emit(prefix + msg))
+        client.connection_changed.connect(lambda connected, c=client: self._on_connection_changed(c, connected))
+
+    @staticmethod
+    def _disconnect(client: ComfyClient) -> None:
+        client.reconnect_timer.stop()
+        client.reconcile_timer.stop()
+        client.system_stats_timer.stop()
+        client.preview_decoder.shutdown()
+        client.ws.close()
+
+    def _detach(self, client: ComfyClient) -> None:
+        self._disconnect(client)
+        self._forget(client)
+        client.deleteLater()
+
+    def shutdown(self) -> None:
+        """退出时断开额外后端 (不移出调度器，未完成任务留在日志中下次核对)"""
+        for client in self.extras.values():
+            self._disconnect(client)
+
+    def _forget(self, client: ComfyClient) -> None:
+        self._snapshots.pop(client, None)
+        self._progress.pop(client, None)
+        self._emit_queue()
+
+    def _on_connection_changed(self, client: ComfyClient, connected: bool) -> None:
+        if not connected:
+            self._forget(client)
+
+    def _on_prompt_submitted(self, client: ComfyClient, prompt_id: str) -> None:
+        self._owner[str(prompt_id)] = client
+        while len(self._owner) > self.MAX_TRACKED_PROMPTS:
+            self._owner.pop(next(iter(self._owner)))
+        self.prompt_submitted.emit(prompt_id)
+
+    def _aggregate_progress(self) -> Tuple[int, int]:
+        return (sum(v for v, _ in self._progress.values()), sum(t for _, t in self._progress.values()))
+
+    def _on_progress(self, client: ComfyClient, value: int, total: int) -> None:
+        self._progress[client] = (value, total)
+        self.progress_updated.emit(*self._aggregate_progress())
+
+    def _on_progress_detail(self, client: ComfyClient, detail: Dict[str, Any]) -> None:
+        detail = dict(detail)
+        detail["backend"] = client.server_address
+        if len(self._progress) > 1:
+            # 多个后端同时执行：合计各后端当前步数
+            detail["value"], detail["max"] = self._aggregate_progress()
+        self.progress_detail_updated.emit(detail)
+
+    def _on_execution_done(self, client: ComfyClient, payload: str) -> None:
+        self._progress.pop(client, None)
+        self.execution_done.emit(payload)
+
+    def _on_queue_updated(self, client: ComfyClient, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            return
+        self._snapshots[client] = data
+        for key in ("queue_running", "queue_pending"):
+            for task in data.get(key) or []:
+                if isinstance(task, (list, tuple)) and len(task) >= 2 and task[1]:
+                    self._owner[str(task[1])] = client
+        self._emit_queue()
+
+    def queue_snapshot(self) -> Dict[str, Any]:
+        """各后端队列状态的合并视图 (所有界面共用，不发网络请求)"""
+        if len(self._snapshots) == 1 and self.primary in self._snapshots:
+            return self._snapshots[self.primary]
+        merged = {"queue_running": [], "queue_pending": []}
+        for client in self.backends():
+            data = self._snapshots.get(client) or {}
+            merged["queue_running"].extend(data.get("queue_running") or [])
+            merged["queue_pending"].extend(data.get("queue_pending") or [])
+        return merged
+
+    def running_prompt_ids(self) -> List[str]:
+        """各后端正在执行的任务"""
+        return [prompt_id for client in self.backends() for prompt_id in client.queue_state.running]
+
+    def backend_address(self, prompt_id: str) -> str:
+        client = self._owner.get(str(prompt_id))
+        return client.server_address if client else ""
+
+    def estimate_queue_seconds(self, local_workflows=()) -> Optional[float]:
+        """
+        按采样耗时统计估算全部任务完成还需多久：各在线后端 = 执行中剩余 + ComfyUI 队列中各任务；
+        本地待提交任务由调度器分给在线后端，按平均分摊计算。没有可参考的统计时返回 None
+        """
+        timings = self.primary.step_timings
+        if timings is None:
+            return None
+        loads = []
+        for client in self.backends():
+            if client is not self.primary and not client.is_connected():
+                continue
+            load = sum(timings.remaining_seconds(pid) or 0.0 for pid in client.queue_state.running)
+            load += sum(timings.estimate_seconds(task[2]) or 0.0 for task in client.queue_state.pending.values())
+            loads.append(load)
+        local = sum(timings.estimate_seconds(workflow) or 0.0 for workflow in local_workflows)
+        total = max(max(loads), (sum(loads) + local) / len(loads))
+        return total if total > 0 else None
+
+    def _emit_queue(self) -> None:
+        if self._snapshots:
+            self.queue_updated.emit(self.queue_snapshot())
+
+    # ---- 队列操作 ----
+    def get_queue(self) -> None:
+        """强制各后端与 /queue 核对一次 (平时队列状态由 WebSocket 事件维护)"""
+        for client in self.backends():
+            if client is self.primary or client.is_connected():
+                client.get_queue()
+
+    def cancel_task(self, prompt_id: str) -> None:
+        self._owner.get(str(prompt_id), self.primary).cancel_task(prompt_id)
+
+    def clear_queue(self) -> None:
+        for client in self.backends():
+            client.clear_queue()
+
+    def interrupt_current(self, prompt_id: Optional[str] = None) -> None:
+        """指定 prompt_id 时只中断其所属后端，否则中断所有后端正在执行的任务"""
+        if prompt_id and str(prompt_id) in self._owner:
+            self._owner[str(prompt_id)].interrupt_current()
+            return
+        for client in self.backends():
+            client.interrupt_current()
@@ -0,0 +1,92 @@
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ComfyQueueState:
+    """
+    单个 ComfyUI 后端的队列状态机，由 WebSocket 事件增量维护，代替轮询 /queue。
+    - 本客户端提交成功 → pending；execution_start → running；executing(None) / execution_success /
+      execution_error / execution_interrupted → 移除；取消、清空成功后同步删除
+    - status 消息报告的 queue_remaining 与本地计数不一致 (其他客户端提交、漏掉事件) 时视为缺口，
+      由 ComfyClient 发起一次 /queue 全量核对 (reset)
+    任务项沿用 /queue 的格式 [number, prompt_id, prompt, extra_data, outputs_to_execute]，界面代码无需改动。
+    """
+    RECENT_DONE_LIMIT = 256
+
+    def __init__(self):
+        self.running: "OrderedDict[str, list]" = OrderedDict()
+        self.pending: Dict[str, list] = {}
+        self.remaining: Optional[int] = None   # 最近一次 status 报告的剩余任务数
+        # 提交响应晚于执行事件到达时，用于识别已执行完的任务，避免重新加入 pending
+        self._recent_done = deque(maxlen=self.RECENT_DONE_LIMIT)
+        # 任务被判定结束 (含新任务开始时隐式结束的上一个) 时回调，参数为 prompt_id
+        self.on_retired: Optional[Callable[[str], None]] = None
+
+    def count(self) -> int:
+        return len(self.running) + len(self.pending)
+
+    def in_sync(self) -> bool:
+        return self.remaining is None or self.remaining == self.count()
+
+    def snapshot(self) -> Dict[str, List[list]]:
+        pending = sorted(self.pending.values(), key=lambda task: (task[0] is None, task[0] or 0))
+        return {"queue_running": list(self.running.values()), "queue_pending": pending}
+
+    def reset(self, data: Dict[str, Any]) -> None:
+        """以 /queue 的完整响应为准重建状态 (请求在途期间已结束的任务不会被响应带回来)"""
+        self.running.clear()
+        self.pending.clear()
+        for key, target in (("queue_running", self.running), ("queue_pending", self.pending)):
+            for task in data.get(key) or []:
+                if isinstance(task, (list, tuple)) and len(task) >= 2 and task[1] and str(task[1]) not in self._recent_done:
+                    target[str(task[1])] = list(task)
+        self.remaining = self.count()
+
+    def add_pending(self, prompt_id: str, number: Any, prompt: Optional[Dict[str, Any]] = None) -> bool:
+        if prompt_id in self._recent_done or prompt_id in self.pending:
+            return False
+        task = [number, prompt_id, prompt or {}, {}, []]
+        if prompt_id in self.running:
+            # execution_start 先于提交响应到达：补全占位项
+            self.running[prompt_id] = task
+            return True
+        self.pending[prompt_id] = task
+        return True
+
+    def start(self, prompt_id: str) -> bool:
+        """任务开始执行；返回 False 表示本地不认识该任务 (需要核对)"""
+        task = self.pending.pop(prompt_id, None)
+        known = task is not None or prompt_id in self.running
+        # ComfyUI 同一时刻只执行一个任务，新的开始即意味着之前的已结束
+        for stale in [pid for pid in self.running if pid != prompt_id]:
+            self._mark_done(stale)
+        if prompt_id not in self.running:
+            self.running[prompt_id] = task or [None, prompt_id, {}, {}, []]
+        return known
+
+    def finish(self, prompt_id: Optional[str]) -> bool:
+        if not prompt_id:
+            # 旧版 ComfyUI 的 executing(None) 不带 prompt_id：结束当前执行的任务
+            changed = bool(self.running)
+            for pid in list(self.running):
+                self._mark_done(pid)
+            return changed
+        changed = prompt_id in self.running or prompt_id in self.pending
+        self._mark_done(prompt_id)
+        return changed
+
+    def remove(self, prompt_id: str) -> bool:
+        return self.pending.pop(prompt_id, None) is not None
+
+    def clear_pending(self) -> bool:
+        changed = bool(self.pending)
+        self.pending.clear()
+        return changed
+
+    def _mark_done(self, prompt_id: str) -> None:
+        self.running.pop(prompt_id, None)
+        self.pending.pop(prompt_id, None)
+        if prompt_id not in self._recent_done:
+            self._recent_done.append(prompt_id)
+        if self.on_retired is not None:
+            self.on_retired(prompt_id)
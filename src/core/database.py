@@ -1,7 +1,7 @@
 import sqlite3
 import os
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterator
 
 class DatabaseManager:
     """
@@ -121,6 +121,49 @@ class DatabaseManager:
             cursor.execute("ALTER TABLE images ADD COLUMN height INTEGER")
             conn.commit()
         
+        # 低清占位图 (base64 微型 JPEG)，列表可在缩略图就绪前先行绘制
+        try:
+            cursor.execute("SELECT placeholder FROM images LIMIT 1")
+        except sqlite3.OperationalError:
+            cursor.execute("ALTER TABLE images ADD COLUMN placeholder TEXT")
+            conn.commit()
+
+        # 4. 采样耗时样本 (每个完成的生成任务一行)，用于估算 ETA 与统计吞吐
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS step_timings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model TEXT,
+                pixel_bucket INTEGER,
+                sampler TEXT,
+                steps INTEGER,
+                lora_count INTEGER,
+                seconds_per_step REAL,
+                pre_seconds REAL,
+                post_seconds REAL,
+                total_seconds REAL,
+                backend TEXT,
+                recorded_at REAL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_step_timings_model ON step_timings(model, recorded_at)')
+
+        # 5. 生成来源：prompt_id、可执行图的规范哈希与输出文件的对应关系 (用于识别重复生成)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS provenance (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                prompt_id TEXT,
+                workflow_hash TEXT,
+                file_path TEXT,
+                batch_index INTEGER DEFAULT 0,
+                backend TEXT,
+                created_at REAL,
+                UNIQUE(prompt_id, file_path)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_provenance_hash ON provenance(workflow_hash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_provenance_path ON provenance(file_path)')
+        conn.commit()
+        
         conn.close()
 
     def add_images_batch(self, batch: List[tuple]) -> None:
@@ -138,8 +181,8 @@ class DatabaseManager:
                     file_path, file_name, prompt, negative_prompt, 
                     seed, steps, sampler, scheduler, cfg_scale, 
                     model_name, model_hash, tool, loras, tech_info, raw_metadata, file_mtime,
-                    width, height
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    width, height, placeholder
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ON CONFLICT(file_path) DO UPDATE SET
                     file_name=excluded.file_name,
                     prompt=excluded.prompt,
@@ -157,7 +200,8 @@ class DatabaseManager:
                     raw_metadata=excluded.raw_metadata,
                     file_mtime=excluded.file_mtime,
                     width=excluded.width,
-                    height=excluded.height
+                    height=excluded.height,
+                    placeholder=COALESCE(excluded.placeholder, images.placeholder)
             '''
 
             for file_path, meta in batch:
@@ -185,7 +229,8 @@ class DatabaseManager:
                     meta.get('raw', ""),
                     file_mtime,
                     params.get('width') or tech_info.get('width') or meta.get('width') or 0,
-                    params.get('height') or tech_info.get('height') or meta.get('height') or 0
+                    params.get('height') or tech_info.get('height') or meta.get('height') or 0,
+                    meta.get('placeholder')
                 ))
                 
                 # 更新 LoRA 关联表 (此处仍需处理关联，但保持在同一事务内)
@@ -233,8 +278,8 @@ class DatabaseManager:
                     file_path, file_name, prompt, negative_prompt, 
                     seed, steps, sampler, scheduler, cfg_scale, 
                     model_name, model_hash, tool, loras, tech_info, raw_metadata, file_mtime,
-                    width, height
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    width, height, placeholder
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ON CONFLICT(file_path) DO UPDATE SET
                     file_name=excluded.file_name,
                     prompt=excluded.prompt,
@@ -252,7 +297,8 @@ class DatabaseManager:
                     raw_metadata=excluded.raw_metadata,
                     file_mtime=excluded.file_mtime,
                     width=excluded.width,
-                    height=excluded.height
+                    height=excluded.height,
+                    placeholder=COALESCE(excluded.placeholder, images.placeholder)
             ''', (
                 file_path,
                 os.path.basename(file_path),
@@ -271,7 +317,8 @@ class DatabaseManager:
                 meta.get('raw', ""),
                 file_mtime,
                 params.get('width') or tech_info.get('width') or meta.get('width') or 0,
-                params.get('height') or tech_info.get('height') or meta.get('height') or 0
+                params.get('height') or tech_info.get('height') or meta.get('height') or 0,
+                meta.get('placeholder')
             ))
             
             # 获取 ID 以更新 LoRA 表
@@ -283,7 +330,7 @@ class DatabaseManager:
             cursor.execute('DELETE FROM image_loras WHERE image_id = ?', (img_id,))
             for l in loras:
                 # 尝试解析 "LoRA Name (Weight)"
-                name = l.split('(')[0].strip()
+                name = self._lora_name(l)
                 weight = 1.0
                 if '(' in l:
                     try:
@@ -298,6 +345,46 @@ class DatabaseManager:
         finally:
             conn.close()
 
+    @staticmethod
+    def _lora_name(entry: str) -> str:
+        """"LoRA Name (Weight)" -> "LoRA Name" (与 image_loras 表中的名称一致)"""
+        return entry.split('(')[0].strip()
+
+    @staticmethod
+    def image_facets(meta: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        提取一张图片在筛选/历史参数中的取值，规则与 add_image 入库及 get_unique_* 聚合保持一致。
+        用于新图片入库后增量更新界面，而不必重新聚合整个文件夹。
+        """
+        params = meta.get('params', {}) or {}
+        tech_info = meta.get('tech_info', {}) or {}
+        resolution = None
+        res_str = tech_info.get('resolution')
+        if isinstance(res_str, str) and 'x' in res_str:
+            try:
+                w, h = res_str.split('x')
+                resolution = (int(w.strip()), int(h.strip()))
+            except ValueError:
+                pass
+        return {
+            'model': params.get('Model', "") or "",
+            'loras': [DatabaseManager._lora_name(l) for l in meta.get('loras', []) or []],
+            'resolution': resolution,
+            'sampler': params.get('Sampler', params.get('sampler_name')) or "",
+            'scheduler': params.get('Scheduler', params.get('scheduler')) or "",
+        }
+
+    @staticmethod
+    def _order_sql(order_by: str) -> str:
+        """排序逻辑映射 (使用 file_path 作为最终稳定键)"""
+        order_map = {
+            "time_desc": "i.file_mtime DESC, i.file_path ASC",
+            "time_asc": "i.file_mtime ASC, i.file_path ASC",
+            "name_asc": "i.file_name ASC, i.file_path ASC",
+            "name_desc": "i.file_name DESC, i.file_path DESC"
+        }
+        return order_map.get(order_by, 'i.file_mtime DESC, i.file_path DESC')
+
     def search_images(self, keyword: str = "", folder_path: Optional[str] = None, 
                      model: Optional[str] = None, lora: Optional[str] = None, 
                      order_by: str = "time_desc") -> List[str]:
@@ -305,14 +392,7 @@ class DatabaseManager:
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        # 排序逻辑映射 (使用 file_path 作为最终稳定键)
-        order_map = {
-            "time_desc": "i.file_mtime DESC, i.file_path ASC",
-            "time_asc": "i.file_mtime ASC, i.file_path ASC",
-            "name_asc": "i.file_name ASC, i.file_path ASC",
-            "name_desc": "i.file_name DESC, i.file_path DESC"
-        }
-        order_sql = order_map.get(order_by, 'i.file_mtime DESC, i.file_path DESC')
+        order_sql = self._order_sql(order_by)
 
         query, args = self._build_search_base_query(cursor, keyword, folder_path, model, lora)
         query += f" ORDER BY {order_sql}"
@@ -336,13 +416,7 @@ class DatabaseManager:
         conn = self._get_connection()
         cursor = conn.cursor()
 
-        order_map = {
-            "time_desc": "i.file_mtime DESC, i.file_path ASC",
-            "time_asc": "i.file_mtime ASC, i.file_path ASC",
-            "name_asc": "i.file_name ASC, i.file_path ASC",
-            "name_desc": "i.file_name DESC, i.file_path DESC"
-        }
-        order_sql = order_map.get(order_by, 'i.file_mtime DESC, i.file_path DESC')
+        order_sql = self._order_sql(order_by)
 
         query, args = self._build_search_base_query(cursor, keyword, folder_path, model, lora)
         query += f" ORDER BY {order_sql} LIMIT ? OFFSET ?"
@@ -358,6 +432,36 @@ class DatabaseManager:
             conn.close()
         return results
 
+    def iter_search_pages(self, keyword: str = "", folder_path: Optional[str] = None,
+                          model: Optional[str] = None, lora: Optional[str] = None,
+                          order_by: str = "time_desc", first_page: int = 256, page_size: int = 4096,
+                          is_cancelled: Optional[Callable[[], bool]] = None) -> Iterator[List[str]]:
+        """
+        流式分页返回搜索结果：首页较小以便尽快显示，后续按大页读取。
+        is_cancelled 返回 True 时通过 SQLite progress handler 中断正在执行的语句。
+        """
+        conn = self._get_connection()
+        if is_cancelled:
+            # 每执行约 1000 条虚拟机指令检查一次，非 0 返回值会让 SQLite 抛出 interrupted
+            conn.set_progress_handler(lambda: 1 if is_cancelled() else 0, 1000)
+        cursor = conn.cursor()
+        query, args = self._build_search_base_query(cursor, keyword, folder_path, model, lora)
+        query += f" ORDER BY {self._order_sql(order_by)}"
+        try:
+            cursor.execute(query, args)
+            size = first_page
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                yield [row[0] for row in rows]
+                size = page_size
+        except sqlite3.OperationalError as e:
+            if not (is_cancelled and is_cancelled()):
+                print(f"[DB] Search Error: {e}\nQuery: {query}\nArgs: {args}")
+        finally:
+            conn.close()
+
     def count_images(self, keyword: str = "", folder_path: Optional[str] = None,
                      model: Optional[str] = None, lora: Optional[str] = None) -> int:
         """统计搜索结果总数（用于分页）"""
@@ -384,6 +488,7 @@ class DatabaseManager:
         try:
             placeholders = ",".join(["?"] * len(file_paths))
             cursor.execute(f"DELETE FROM images WHERE file_path IN ({placeholders})", file_paths)
+            cursor.execute(f"DELETE FROM provenance WHERE file_path IN ({placeholders})", file_paths)
             conn.commit()
         except Exception as e:
             print(f"[DB] Batch delete failed: {e}")
@@ -621,8 +726,8 @@ class DatabaseManager:
                 'loras': json.loads(row[10]) if row[10] else []
             }
         return {}
-    def get_images_batch_info(self, file_paths: List[str]) -> Dict[str, Dict[str, Any]]:
-        """批量获取图片信息，优化列表加载性能"""
+    def get_images_batch_info(self, file_paths: List[str], include_raw: bool = False) -> Dict[str, Dict[str, Any]]:
+        """批量获取图片信息，优化列表加载性能 (include_raw 时附带原始元数据，供元数据缓存还原)"""
         if not file_paths:
             return {}
             
@@ -631,8 +736,9 @@ class DatabaseManager:
         
         # 动态构建 SQL，使用 parameters preventing injection
         placeholders = ','.join(['?'] * len(file_paths))
+        extra_cols = ", raw_metadata, tool" if include_raw else ""
         query = f'''
-            SELECT file_path, width, height, model_name, seed, steps, sampler, scheduler, cfg_scale, prompt, negative_prompt, loras, tech_info, file_mtime
+            SELECT file_path, width, height, model_name, seed, steps, sampler, scheduler, cfg_scale, prompt, negative_prompt, loras, tech_info, file_mtime, placeholder{extra_cols}
             FROM images WHERE file_path IN ({placeholders})
         '''
         
@@ -667,8 +773,16 @@ class DatabaseManager:
                     'prompt': row[9] or '',
                     'negative_prompt': row[10] or '',
                     'loras': json.loads(row[11]) if row[11] else [],
-                    'file_mtime': row[13] or 0
+                    'file_mtime': row[13] or 0,
+                    'placeholder': row[14] or ''
                 }
+                if include_raw:
+                    try:
+                        results[path]['tech_info'] = json.loads(row[12]) if row[12] else {}
+                    except ValueError:
+                        results[path]['tech_info'] = {}
+                    results[path]['raw_metadata'] = row[15] or ''
+                    results[path]['tool'] = row[16] or 'Unknown'
             return results
         except Exception as e:
             print(f"[DB] Batch info error: {e}")
@@ -676,6 +790,65 @@ class DatabaseManager:
         finally:
             conn.close()
 
+    def get_placeholders(self, file_paths: List[str]) -> Dict[str, str]:
+        """批量读取占位图 (只查一列，供列表首屏快速绘制)"""
+        results = {}
+        if not file_paths:
+            return results
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            # 分段查询，避免超出 SQLite 参数个数上限
+            for i in range(0, len(file_paths), 500):
+                chunk = file_paths[i:i + 500]
+                placeholders = ','.join(['?'] * len(chunk))
+                cursor.execute(
+                    f"SELECT file_path, placeholder FROM images WHERE file_path IN ({placeholders}) AND placeholder IS NOT NULL",
+                    chunk
+                )
+                for path, data in cursor.fetchall():
+                    results[path] = data
+        except Exception as e:
+            print(f"[DB] Placeholder query error: {e}")
+        finally:
+            conn.close()
+        return results
+
+    def get_paths_missing_placeholder(self, folder_path: Optional[str] = None) -> set:
+        """返回尚未生成占位图的路径集合 (用于对旧索引补齐)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        args = []
+        query = "SELECT file_path FROM images WHERE placeholder IS NULL"
+        if folder_path:
+            norm_folder = folder_path.replace("\\", "/")
+            query += " AND file_path LIKE ?"
+            args.append(f"{norm_folder}%")
+        try:
+            cursor.execute(query, args)
+            return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"[DB] Placeholder query error: {e}")
+            return set()
+        finally:
+            conn.close()
+
+    def set_placeholders(self, mapping: Dict[str, str]) -> None:
+        """批量写入占位图"""
+        if not mapping:
+            return
+        conn = self._get_connection()
+        try:
+            conn.executemany(
+                "UPDATE images SET placeholder = ? WHERE file_path = ?",
+                [(data, path.replace("\\", "/")) for path, data in mapping.items() if data]
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"[DB] Placeholder update error: {e}")
+        finally:
+            conn.close()
+
     def get_all_file_paths(self):
         """获取数据库中所有已索引的文件路径集合"""
         with self._get_connection() as conn:
@@ -701,3 +874,111 @@ class DatabaseManager:
             return {}
         finally:
             conn.close()
+
+    STEP_TIMING_COLUMNS = ("model", "pixel_bucket", "sampler", "steps", "lora_count", "seconds_per_step",
+                           "pre_seconds", "post_seconds", "total_seconds", "backend", "recorded_at")
+
+    def add_step_timing(self, record: Dict[str, Any]) -> None:
+        """写入一条采样耗时样本"""
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                f"INSERT INTO step_timings ({', '.join(self.STEP_TIMING_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self.STEP_TIMING_COLUMNS))})",
+                [record.get(column) for column in self.STEP_TIMING_COLUMNS]
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"[DB] Step timing insert error: {e}")
+        finally:
+            conn.close()
+
+    def get_recent_step_timings(self, limit: int = 5000) -> List[Dict[str, Any]]:
+        """按时间先后返回最近的采样耗时样本"""
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(self.STEP_TIMING_COLUMNS)} FROM step_timings ORDER BY id DESC LIMIT ?",
+                (int(limit),)
+            )
+            return [dict(zip(self.STEP_TIMING_COLUMNS, row)) for row in reversed(cursor.fetchall())]
+        except Exception as e:
+            print(f"[DB] Step timing query error: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def get_step_throughput(self, model: Optional[str] = None, period: str = "day") -> List[tuple]:
+        """
+        按时间段统计各模型的采样速度，返回 [(时间段, 模型, it/s, 任务数), ...]
+        period: "day" / "week" / "month"
+        """
+        fmt = {"day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m"}.get(period, "%Y-%m-%d")
+        query = (
+            "SELECT strftime(?, recorded_at, 'unixepoch', 'localtime') AS span, model, "
+            "SUM(steps) / SUM(steps * seconds_per_step), COUNT(*) "
+            "FROM step_timings WHERE seconds_per_step > 0"
+        )
+        args: List[Any] = [fmt]
+        if model:
+            query += " AND model = ?"
+            args.append(model)
+        query += " GROUP BY span, model ORDER BY span, model"
+        conn = self._get_connection()
+        try:
+            return [tuple(row) for row in conn.execute(query, args).fetchall()]
+        except Exception as e:
+            print(f"[DB] Step throughput query error: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def add_provenance(self, prompt_id: str, workflow_hash: str, file_path: str,
+                       batch_index: int = 0, backend: str = "") -> None:
+        """记录一张生成结果的来源 (同一 prompt 的同一文件只记一次)"""
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO provenance (prompt_id, workflow_hash, file_path, batch_index, backend, created_at) "
+                "VALUES (?, ?, ?, ?, ?, strftime('%s', 'now'))",
+                (prompt_id, workflow_hash, file_path.replace("\\", "/"), int(batch_index or 0), backend)
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"[DB] Provenance insert error: {e}")
+        finally:
+            conn.close()
+
+    def find_outputs_by_workflow_hash(self, workflow_hash: str) -> List[Dict[str, Any]]:
+        """按工作流哈希查找已有的生成结果 (新的在前)"""
+        if not workflow_hash:
+            return []
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute(
+                "SELECT file_path, prompt_id, batch_index, backend FROM provenance "
+                "WHERE workflow_hash = ? ORDER BY id DESC",
+                (workflow_hash,)
+            )
+            return [dict(zip(("file_path", "prompt_id", "batch_index", "backend"), row)) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"[DB] Provenance query error: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def get_provenance(self, file_path: str) -> Dict[str, Any]:
+        """查询一张图片的生成来源，未记录时返回空字典"""
+        conn = self._get_connection()
+        try:
+            row = conn.execute(
+                "SELECT prompt_id, workflow_hash, batch_index, backend, created_at FROM provenance "
+                "WHERE file_path = ? ORDER BY id DESC LIMIT 1",
+                (file_path.replace("\\", "/"),)
+            ).fetchone()
+            return dict(zip(("prompt_id", "workflow_hash", "batch_index", "backend", "created_at"), row)) if row else {}
+        except Exception as e:
+            print(f"[DB] Provenance query error: {e}")
+            return {}
+        finally:
+            conn.close()
@@ -0,0 +1,410 @@
+import heapq
+import itertools
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from src.core.coalescer import LatestValueCoalescer
+from src.core.model_affinity import affinity_rank, loader_signature, required_models
+
+
+PRIORITY_SWEEP = 0          # 对比扫描 / 批量任务
+PRIORITY_INTERACTIVE = 10   # 交互式单次生成，插到扫描任务之前
+
+
+class _Backend:
+    """调度器眼中的一个 ComfyUI 后端 (ComfyClient) 及其调度状态"""
+    def __init__(self, client):
+        self.client = client
+        self.recovering = False
+        self.retry_at = 0.0
+        self.last_signature = None   # 最近提交任务的加载器签名 (≈ 该后端当前加载的模型)
+        self.abandoned: set = set()  # 故障转移时已改投其他后端的 prompt_id，重连后从队列中删除
+        self.connections: List[Tuple[Any, Any]] = []
+
+    @property
+    def address(self) -> str:
+        return str(getattr(self.client, "server_address", ""))
+
+
+class GenerationScheduler(QObject):
+    """
+    位于 ComfyClient 之前的本地生成任务调度器，可同时调度多个 ComfyUI 后端。
+    - 任务先进入本地优先级队列 (优先级高者先出，同优先级按提交顺序)
+    - 每个后端的 ComfyUI 队列只保持 max_depth 个由本调度器提交的任务 (0 为不限制)，
+      依据各后端的 queue_updated 快照判断任务是否已离开队列，再补充下一个
+    - 同优先级内优先提交与该后端上一个任务模型状态 (加载器签名) 相同的任务，减少 ComfyUI
+      重新加载 Checkpoint / 重新打 LoRA 补丁；结果仍按 context 中的 variant_id 归位
+    - 多后端时：优先选缺少模型最少、在途任务最少的后端，再按模型状态接近程度挑任务；
+      某后端断线超过 FAILOVER_SECONDS 且有其他后端在线时，其未完成任务改投其他后端
+    - 待提交与已提交未完成的任务写入日志文件，断线重连或重启程序后：
+      未提交的重新提交；已提交但不在 ComfyUI 队列中的通过 /history 确认，
+      没有执行记录 (ComfyUI 重启丢失) 的重新提交
+    只在 UI 线程使用。
+    """
+    JOURNAL_NAME = "generation_queue.json"
+    ACCEPT_GRACE_SECONDS = 2.0   # 刚受理的任务可能还没出现在之前发出的队列查询结果里
+    RETRY_DELAY_MS = 3000
+    VERIFY_TIMEOUT_SECONDS = 5.0  # /history 查询无响应时，下次快照重新查询
+    FAILOVER_SECONDS = 10.0
+
+    pending_changed = pyqtSignal(int)  # 本地待提交任务数
+
+    def __init__(self, clients, journal_path: Optional[str] = None, max_depth: int = 2, parent=None):
+        super().__init__(parent)
+        self.journal_path = journal_path
+        self.max_depth = max(int(max_depth), 0)
+
+        self._backends: List[_Backend] = []
+        self._heap: List[Tuple[int, int, str]] = []
+        self._jobs: Dict[str, Dict[str, Any]] = {}       # 本地待提交
+        self._inflight: Dict[str, Dict[str, Any]] = {}   # 已交给 ComfyUI (含正在提交)
+        self._seq = itertools.count()
+        self._journal_writer = LatestValueCoalescer(500, self)
+
+        for client in (clients if isinstance(clients, (list, tuple)) else [clients]):
+            self.add_backend(client)
+        self._load_journal()
+
+    # ---- 后端 ----
+    def add_backend(self, client) -> None:
+        if self._backend_of(client) is not None:
+            return
+        backend = _Backend(client)
+        self._backends.append(backend)
+        backend.connections = [
+            (client.prompt_queued, self._on_prompt_queued),
+            (client.prompt_failed, self._on_prompt_failed),
+            (client.prompt_history_checked, self._on_history_checked),
+            (client.queue_updated, lambda data, b=backend: self._on_queue_updated(b, data)),
+            (client.queue_cleared, self.clear),
+            (client.connection_changed, lambda connected, b=backend: self._on_connection_changed(b, connected)),
+        ]
+        for signal, slot in backend.connections:
+            signal.connect(slot)
+        self._pump()
+
+    def remove_backend(self, client) -> None:
+        """移除后端：其在途任务放回本地队列，并尝试从该后端队列中删除"""
+        backend = self._backend_of(client)
+        if backend is None:
+            return
+        self._backends.remove(backend)
+        for signal, slot in backend.connections:
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass
+        for prompt_id in self._requeue_backend_jobs(backend):
+            client.cancel_task(prompt_id)
+        self._pump()
+
+    def _backend_of(self, client) -> Optional[_Backend]:
+        for backend in self._backends:
+            if backend.client is client:
+                return backend
+        return None
+
+    # ---- 提交 ----
+    def enqueue(self, workflow: Dict[str, Any], context: Optional[Dict[str, Any]] = None,
+                priority: int = PRIORITY_SWEEP) -> str:
+        return self.enqueue_many([(workflow, context)], priority)[0]
+
+    def enqueue_many(self, items: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+                     priority: int = PRIORITY_SWEEP) -> List[str]:
+        job_ids = []
+        for workflow, context in items:
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "priority": int(priority),
+                "seq": next(self._seq),
+                "workflow": workflow,
+                "context": dict(context or {}),
+            }
+            self._push(job)
+            job_ids.append(job["job_id"])
+        if job_ids:
+            self._changed()
+            self._pump()
+        return job_ids
+
+    def set_max_depth(self, max_depth: int) -> None:
+        self.max_depth = max(int(max_depth), 0)
+        self._pump()
+
+    def pending_count(self) -> int:
+        return len(self._jobs)
+
+    def pending_workflows(self) -> List[Dict[str, Any]]:
+        return [job["workflow"] for job in self._jobs.values()]
+
+    def inflight_count(self, client=None) -> int:
+        if client is None:
+            return len(self._inflight)
+        return sum(1 for job in self._inflight.values() if job["backend"].client is client)
+
+    def clear(self) -> None:
+        """丢弃本地待提交任务 (ComfyUI 队列被清空时同步清空)"""
+        if not self._jobs:
+            return
+        print(f"[Scheduler] 清空本地待提交任务: {len(self._jobs)} 个")
+        self._heap.clear()
+        self._jobs.clear()
+        self._changed()
+
+    def flush_journal(self) -> None:
+        self._journal_writer.flush()
+
+    # ---- 调度 ----
+    def _push(self, job: Dict[str, Any]) -> None:
+        for key in ("backend", "prompt_id", "accepted_at", "seen", "verifying"):
+            job.pop(key, None)
+        if "signature" not in job:
+            job["signature"] = loader_signature(job["workflow"])
+            job["models"] = required_models(job["workflow"])
+        self._jobs[job["job_id"]] = job
+        heapq.heappush(self._heap, (-job["priority"], job["seq"], job["job_id"]))
+
+    def _load_of(self, backend: _Backend) -> int:
+        return sum(1 for job in self._inflight.values() if job["backend"] is backend)
+
+    def _ready_backends(self) -> List[Tuple[_Backend, int]]:
+        now = time.monotonic()
+        ready = []
+        for backend in self._backends:
+            if backend.recovering or now < backend.retry_at or not backend.client.is_connected():
+                continue
+            load = self._load_of(backend)
+            if self.max_depth == 0 or load < self.max_depth:
+                ready.append((backend, load))
+        return ready
+
+    @staticmethod
+    def _missing_models(job: Dict[str, Any], backend: _Backend) -> int:
+        inventory = getattr(backend.client, "model_inventory", None)
+        if not inventory or not job.get("models"):
+            return 0
+        return len(job["models"] - inventory)
+
+    def _pump(self) -> None:
+        sent = 0
+        while True:
+            ready = self._ready_backends()
+            choice = self._next_dispatch(ready) if ready else None
+            if choice is None:
+                break
+            job_id, backend = choice
+            job = self._jobs.pop(job_id)
+            job["backend"] = backend
+            backend.last_signature = job["signature"]
+            self._inflight[job_id] = job
+            context = dict(job["context"])
+            context["job_id"] = job_id
+            backend.client.send_prompt(job["workflow"], context=context)
+            sent += 1
+        if sent:
+            self._changed()
+
+    def _next_dispatch(self, ready: List[Tuple[_Backend, int]]) -> Optional[Tuple[str, _Backend]]:
+        """
+        最高优先级的任务中，按 (缺少的模型数, 后端在途任务数, 与该后端模型状态的接近程度, 提交顺序)
+        取最优的 (任务, 后端) 组合；堆中已取走的条目惰性丢弃
+        """
+        while self._heap and self._heap[0][2] not in self._jobs:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        top_priority = -self._heap[0][0]
+        best = None
+        for job_id, job in self._jobs.items():
+            if job["priority"] != top_priority:
+                continue
+            for index, (backend, load) in enumerate(ready):
+                key = (self._missing_models(job, backend), load,
+                       affinity_rank(job["signature"], backend.last_signature), job["seq"], index)
+                if best is None or key < best[0]:
+                    best = (key, job_id, backend)
+        return (best[1], best[2]) if best else None
+
+    def _changed(self) -> None:
+        self.pending_changed.emit(len(self._jobs))
+        if self.journal_path:
+            self._journal_writer.submit("journal", self._save_journal)
+
+    def _requeue_backend_jobs(self, backend: _Backend) -> List[str]:
+        """把某后端的在途任务放回本地队列，返回其中已被受理的 prompt_id"""
+        prompt_ids = []
+        requeued = 0
+        for job_id, job in list(self._inflight.items()):
+            if job["backend"] is not backend:
+                continue
+            del self._inflight[job_id]
+            if job.get("prompt_id"):
+                prompt_ids.append(job["prompt_id"])
+            self._push(job)
+            requeued += 1
+        if requeued:
+            self._changed()
+        return prompt_ids
+
+    # ---- ComfyClient 事件 ----
+    def _on_prompt_queued(self, prompt_id: str, context: Dict[str, Any]) -> None:
+        job = self._inflight.get(str(context.get("job_id") or ""))
+        if job is None:
+            return
+        job["prompt_id"] = prompt_id
+        job["accepted_at"] = time.monotonic()
+        self._changed()
+
+    def _on_prompt_failed(self, context: Dict[str, Any], retryable: bool) -> None:
+        job = self._inflight.pop(str(context.get("job_id") or ""), None)
+        if job is None:
+            return
+        if retryable:
+            # 网络错误：放回队列，该后端稍后再试 (期间可由其他后端接手)
+            job["backend"].retry_at = time.monotonic() + self.RETRY_DELAY_MS / 1000.0
+            self._push(job)
+            QTimer.singleShot(self.RETRY_DELAY_MS, self._pump)
+        else:
+            print(f"[Scheduler] 任务被 ComfyUI 拒绝，已丢弃: {job['job_id']}")
+        self._changed()
+        self._pump()
+
+    def _on_connection_changed(self, backend: _Backend, connected: bool) -> None:
+        if connected:
+            return
+        # 断线期间 ComfyUI 可能已重启：重连后的第一次队列快照需要核对已提交任务
+        backend.recovering = True
+        if len(self._backends) > 1:
+            QTimer.singleShot(int(self.FAILOVER_SECONDS * 1000), lambda: self._failover(backend))
+
+    def _failover(self, backend: _Backend) -> None:
+        if backend not in self._backends or backend.client.is_connected():
+            return
+        if not any(b is not backend and b.client.is_connected() for b in self._backends):
+            return  # 没有其他可用后端：等它重连后再核对
+        prompt_ids = self._requeue_backend_jobs(backend)
+        backend.abandoned.update(prompt_ids)
+        print(f"[Scheduler] 后端 {backend.address} 断线，{len(prompt_ids)} 个已提交任务改投其他后端")
+        self._pump()
+
+    @staticmethod
+    def _active_prompt_ids(data: Dict[str, Any], keys=("queue_running", "queue_pending")) -> set:
+        active = set()
+        for key in keys:
+            for task in data.get(key) or []:
+                if isinstance(task, (list, tuple)) and len(task) >= 2 and task[1]:
+                    active.add(str(task[1]))
+        return active
+
+    def _on_queue_updated(self, backend: _Backend, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            return
+        active = self._active_prompt_ids(data)
+        if backend.abandoned:
+            # 已改投其他后端的任务若还在队列中则删除，正在执行的则中断，避免重复生成
+            running = self._active_prompt_ids(data, ("queue_running",))
+            for prompt_id in backend.abandoned & active:
+                if prompt_id in running:
+                    backend.client.interrupt_current(prompt_id)
+                else:
+                    backend.client.cancel_task(prompt_id)
+            backend.abandoned.clear()
+        now = time.monotonic()
+        finished = []
+        for job_id, job in self._inflight.items():
+            if job["backend"] is not backend:
+                continue
+            prompt_id = job.get("prompt_id")
+            verifying_since = job.get("verifying")
+            if not prompt_id or (verifying_since is not None and now - verifying_since < self.VERIFY_TIMEOUT_SECONDS):
+                continue
+            if prompt_id in active:
+                job["seen"] = True
+            elif backend.recovering or "verifying" in job:
+                job["verifying"] = now
+                backend.client.check_prompt_history(prompt_id)
+            elif job.get("seen") or now - job.get("accepted_at", 0.0) >= self.ACCEPT_GRACE_SECONDS:
+                finished.append(job_id)
+        for job_id in finished:
+            del self._inflight[job_id]
+        backend.recovering = False
+        if finished:
+            self._changed()
+        self._pump()
+
+    def _on_history_checked(self, prompt_id: str, found: bool) -> None:
+        for job_id, job in list(self._inflight.items()):
+            if job.get("prompt_id") != prompt_id:
+                continue
+            del self._inflight[job_id]
+            if not found:
+                print(f"[Scheduler] 任务在 ComfyUI 中丢失，重新提交: {prompt_id}")
+                self._push(job)
+            self._changed()
+        self._pump()
+
+    # ---- 持久化 ----
+    def _load_journal(self) -> None:
+        if not self.journal_path:
+            return
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(entries, list):
+            return
+        backends = {backend.address: backend for backend in self._backends}
+        for entry in sorted((e for e in entries if isinstance(e, dict)), key=lambda e: e.get("seq", 0)):
+            workflow = entry.get("workflow")
+            if not isinstance(workflow, dict):
+                continue
+            job = {
+                "job_id": str(entry.get("job_id") or uuid.uuid4().hex),
+                "priority": int(entry.get("priority", PRIORITY_SWEEP)),
+                "seq": next(self._seq),
+                "workflow": workflow,
+                "context": entry.get("context") if isinstance(entry.get("context"), dict) else {},
+            }
+            self._push(job)
+            # 旧日志没有 backend 字段：视为主后端
+            backend = backends.get(str(entry["backend"])) if entry.get("backend") else (
+                self._backends[0] if self._backends else None)
+            if entry.get("prompt_id") and backend is not None:
+                # 上次已提交：等该后端连接后的第一次队列快照核对
+                del self._jobs[job["job_id"]]
+                job["backend"] = backend
+                job["prompt_id"] = str(entry["prompt_id"])
+                backend.recovering = True
+                self._inflight[job["job_id"]] = job
+        if self._jobs or self._inflight:
+            print(f"[Scheduler] 恢复未完成的生成任务: 待提交 {len(self._jobs)} 个, 待核对 {len(self._inflight)} 个")
+
+    def _save_journal(self) -> None:
+        entries = []
+        for job in list(self._inflight.values()) + list(self._jobs.values()):
+            entries.append({
+                "job_id": job["job_id"],
+                "priority": job["priority"],
+                "seq": job["seq"],
+                "workflow": job["workflow"],
+                "context": job["context"],
+                "prompt_id": job.get("prompt_id"),
+                "backend": job["backend"].address if "backend" in job else None,
+            })
+        try:
+            if not entries:
+                if os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+                return
+            tmp_path = self.journal_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.journal_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[Scheduler] 保存任务日志失败: {e}")
@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage
+
+
+class DecodedImageCache:
+    """
+    全尺寸解码结果的 LRU 缓存，按字节预算淘汰。键为 (路径, mtime)，文件被覆盖后自动失效。
+    """
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, QImage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str):
+        try:
+            return (os.path.normpath(path), os.path.getmtime(path))
+        except OSError:
+            return None
+
+    def get(self, path: str) -> Optional[QImage]:
+        key = self._key(path)
+        if key is None:
+            return None
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+            return image
+
+    def put(self, path: str, image: QImage) -> None:
+        key = self._key(path)
+        if key is None or image.isNull():
+            return
+        size = image.sizeInBytes()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.sizeInBytes()
+            self._entries[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.sizeInBytes()
+
+    def contains(self, path: str) -> bool:
+        key = self._key(path)
+        with self._lock:
+            return key is not None and key in self._entries
+
+    def size_bytes(self) -> int:
+        return self._bytes
+
+
+class _DecodeTask(QRunnable):
+    def __init__(self, decoder, path):
+        super().__init__()
+        self.decoder = decoder
+        self.path = path
+
+    def run(self):
+        self.decoder._run_task(self.path)
+
+
+class ImageDecoder(QObject):
+    """
+    共享的全图解码器：线程池复用工作线程，解码结果进入 DecodedImageCache。
+    - request(): 当前要显示的图片，高优先级
+    - prefetch(): 列表顺序上的相邻图片，低优先级；新一轮预取会让旧的、尚未开始的任务作废
+    """
+    decoded = pyqtSignal(str, QImage) # path, image
+
+    PRIORITY_CURRENT = 10
+    PRIORITY_PREFETCH = 0
+
+    _instance = None
+
+    def __init__(self, cache: Optional[DecodedImageCache] = None, max_threads: int = 3):
+        super().__init__()
+        self.cache = cache or DecodedImageCache()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(1, min(max_threads, QThreadPool.globalInstance().maxThreadCount())))
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._wanted = set()      # 当前这一轮预取的目标
+        self._requested = set()   # 正在等待显示的图片 (不受预取轮换影响)
+
+    @classmethod
+    def shared(cls) -> "ImageDecoder":
+        """所有 ImageViewer (含对比视图) 共用一个解码器和缓存"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _submit(self, path: str, priority: int) -> None:
+        with self._lock:
+            if path in self._inflight:
+                return
+            self._inflight.add(path)
+        self.pool.start(_DecodeTask(self, path), priority)
+
+    def request(self, path: str) -> Optional[QImage]:
+        """命中缓存直接返回；否则排队解码，完成后发出 decoded"""
+        image = self.cache.get(path)
+        if image is not None:
+            return image
+        with self._lock:
+            self._requested.add(path)
+        self._submit(path, self.PRIORITY_CURRENT)
+        return None
+
+    def prefetch(self, paths: Iterable[str]) -> None:
+        """预解码一批图片；不在本批中的旧预取任务若尚未开始则直接跳过"""
+        paths = [p for p in paths if p]
+        with self._lock:
+            self._wanted = set(paths)
+        for path in paths:
+            if not self.cache.contains(path):
+                self._submit(path, self.PRIORITY_PREFETCH)
+
+    def _run_task(self, path: str) -> None:
+        try:
+            with self._lock:
+                if path not in self._wanted and path not in self._requested:
+                    return
+            image = self.cache.get(path)
+            if image is None:
+                image = QImage(path)
+                if image.isNull():
+                    return
+                self.cache.put(path, image)
+            self.decoded.emit(path, image)
+        except Exception as e:
+            print(f"[Decoder] 解码失败 {os.path.basename(path)}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.discard(path)
+                self._requested.discard(path)
+
+    def shutdown(self) -> None:
+        self.pool.clear()
+        self.pool.waitForDone(2000)
@@ -1,17 +1,41 @@
 import os
 import time
+import threading
 from PyQt6.QtGui import QImage
 from PyQt6.QtCore import QThread, pyqtSignal, Qt
 
 from src.core.metadata import MetadataParser
 from src.core.cache import ThumbnailCache
+from src.core.placeholder import placeholder_from_qimage
+
+class _SignalBatcher:
+    """
+    按数量或时间间隔攒批发信号，把成千上万个跨线程排队事件合并为少量批次。
+    第一条结果立即发出，保证首屏响应。
+    """
+    def __init__(self, emit, max_items=256, interval=0.1):
+        self._emit = emit
+        self.max_items = max_items
+        self.interval = interval
+        self._items = []
+        self._last = 0.0
+
+    def add(self, item):
+        self._items.append(item)
+        if len(self._items) >= self.max_items or time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._items:
+            items, self._items = self._items, []
+            self._emit(items)
+        self._last = time.monotonic()
 
 class ImageLoaderThread(QThread):
     """
-    后台线程：扫描文件夹并逐个返回图片路径。
+    后台线程：扫描文件夹并分批返回图片路径和缩略图。
     """
-    image_found = pyqtSignal(str) # 仅发送路径
-    image_thumb_ready = pyqtSignal(str, QImage) # 发送路径和预生成的缩略图
+    images_ready = pyqtSignal(list) # [(path, thumb 或 None), ...]，按数量/时间攒批
     finished_loading = pyqtSignal() # 全部扫描完成
 
     def __init__(self, folder_path, db_manager=None, thumb_cache=None, recursive: bool = False):
@@ -29,8 +53,11 @@ class ImageLoaderThread(QThread):
         extensions = {'.png', '.jpg', '.jpeg', '.webp'}
         files = []
         known_mtimes = {}
+        missing_placeholders = set()
+        pending_placeholders = {}
         if self.db_manager:
             known_mtimes = self.db_manager.get_file_mtime_map(self.folder_path)
+            missing_placeholders = self.db_manager.get_paths_missing_placeholder(self.folder_path)
         
         try:
             if self.recursive:
@@ -55,7 +82,8 @@ class ImageLoaderThread(QThread):
             
             if self._is_running:
                 files.sort(key=lambda x: (-os.path.getmtime(x), os.path.basename(x)))
-                
+
+            batcher = _SignalBatcher(self.images_ready.emit)
             for i, f in enumerate(files):
                 if not self._is_running:
                     break
@@ -83,21 +111,32 @@ class ImageLoaderThread(QThread):
                             # TODO: 这里可以优化为批量提交
                             meta = MetadataParser.parse_image(f)
                             if meta:
+                                # 占位图直接由手上的缩略图缩小得到，无需再读原图
+                                meta['placeholder'] = placeholder_from_qimage(thumb) if thumb else None
                                 self.db_manager.add_image(f, meta)
                             # 更新本地缓存，避免同次扫描重复解析
                             known_mtimes[norm_path] = current_mtime
+                        elif thumb and norm_path in missing_placeholders:
+                            # 旧索引补齐占位图，攒批写入
+                            pending_placeholders[norm_path] = placeholder_from_qimage(thumb)
+                            if len(pending_placeholders) >= 100:
+                                self.db_manager.set_placeholders(pending_placeholders)
+                                pending_placeholders = {}
 
-                    if thumb:
-                        self.image_thumb_ready.emit(f, thumb)
-                    else:
-                        self.image_found.emit(f)
+                    batcher.add((f, thumb))
                         
                 except Exception as e:
                     print(f"[Loader] Error processing {f}: {e}")
-                    self.image_found.emit(f)
+                    batcher.add((f, None))
+
+            if self._is_running:
+                batcher.flush()
                 
         except Exception as e:
             print(f"[Loader] Scan error: {e}")
+        
+        if pending_placeholders:
+            self.db_manager.set_placeholders(pending_placeholders)
             
         print(f"[Loader] 完成，耗时: {time.time() - start_time:.3f} 秒")
         self.finished_loading.emit()
@@ -108,19 +147,40 @@ class ImageLoaderThread(QThread):
 class SearchThumbnailLoader(QThread):
     """专门为搜索结果异步加载缩略图的微型线程 - V4.2 竞态防护版"""
     # 增加 search_id 参数，防止快速切换筛选时旧线程的回调污染新列表
-    thumbnail_ready = pyqtSignal(int, str, QImage, str) # index, path, thumb, search_id
+    thumbnails_ready = pyqtSignal(list, str) # [(path, thumb), ...], search_id (攒批发送)
     file_missing = pyqtSignal(str) # 发现文件丢失，请求清理 DB
 
     def __init__(self, paths, thumb_cache=None, search_id=None):
         super().__init__()
-        self.paths = paths
+        self.paths = list(paths)
         self.thumb_cache = thumb_cache or ThumbnailCache()
         self.search_id = search_id
         self._is_running = True
+        # 列表分页时会不断追加路径；_next 记录处理进度，_idle 表示线程已处理完现有路径
+        self._lock = threading.Lock()
+        self._next = 0
+        self._idle = not self.paths
+
+    def extend(self, paths):
+        """追加待加载的路径。返回 True 表示线程已空闲，需要调用方重新 start()"""
+        with self._lock:
+            self.paths.extend(paths)
+            restart = self._idle
+            self._idle = False
+        return restart
 
     def run(self):
-        for i, path in enumerate(self.paths):
-            if not self._is_running: break
+        batcher = _SignalBatcher(lambda items: self.thumbnails_ready.emit(items, self.search_id),
+                                 max_items=64, interval=0.05)
+        while self._is_running:
+            with self._lock:
+                if self._next >= len(self.paths):
+                    batcher.flush()
+                    self._idle = True
+                    break
+                i = self._next
+                path = self.paths[i]
+                self._next += 1
             
             # V4.3 修复：恢复存在性检查
             # 如果文件被外部删除，必须在此拦截，否则会生成空缩略图占位
@@ -140,9 +200,104 @@ class SearchThumbnailLoader(QThread):
                         self.thumb_cache.save_thumbnail(path, thumb)
                 
                 if thumb and self._is_running:
-                    self.thumbnail_ready.emit(i, path, thumb, self.search_id)
+                    batcher.add((path, thumb))
             except Exception as e:
                 print(f"[SearchLoader] Thumb error for {path}: {e}")
 
     def stop(self):
         self._is_running = False
+
+class SearchQueryThread(QThread):
+    """
+    后台执行搜索查询，分页流式返回结果。
+    search_id 作为取消令牌：新搜索开始后旧线程被 cancel()，正在执行的 SQL 会被中断。
+    """
+    page_ready = pyqtSignal(str, list, bool) # search_id, paths, is_first_page
+    search_finished = pyqtSignal(str, int) # search_id, total
+
+    def __init__(self, db_manager, search_id, keyword="", folder_path=None,
+                 model=None, lora=None, order_by="time_desc"):
+        super().__init__()
+        self.db_manager = db_manager
+        self.search_id = search_id
+        self.query = dict(keyword=keyword, folder_path=folder_path, model=model, lora=lora, order_by=order_by)
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        total = 0
+        first = True
+        try:
+            for page in self.db_manager.iter_search_pages(is_cancelled=self.is_cancelled, **self.query):
+                if self._cancelled:
+                    return
+                total += len(page)
+                self.page_ready.emit(self.search_id, page, first)
+                first = False
+        except Exception as e:
+            print(f"[SearchQuery] 搜索失败: {e}")
+        if not self._cancelled:
+            if first:
+                # 没有任何结果也要通知，以便清空列表
+                self.page_ready.emit(self.search_id, [], True)
+            self.search_finished.emit(self.search_id, total)
+
+class MetadataLoaderThread(QThread):
+    """
+    常驻后台线程：为选中的图片加载元数据，并为可见行预取元数据到缓存。
+    选中请求只保留最新一个 (快速切换时旧请求直接丢弃)，优先于预取。
+    """
+    metadata_ready = pyqtSignal(str, dict) # path, meta
+
+    PREFETCH_BATCH = 64
+
+    def __init__(self, metadata_cache):
+        super().__init__()
+        self.cache = metadata_cache
+        self._cond = threading.Condition()
+        self._selection = None
+        self._prefetch = []
+        self._is_running = True
+
+    def request(self, path):
+        """请求加载选中图片的元数据，完成后发出 metadata_ready"""
+        with self._cond:
+            self._selection = path
+            self._cond.notify()
+
+    def prefetch(self, paths):
+        """把一批路径排入预取队列 (替换尚未处理的旧队列)"""
+        with self._cond:
+            self._prefetch = list(paths)
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._is_running = False
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._is_running and self._selection is None and not self._prefetch:
+                    self._cond.wait()
+                if not self._is_running:
+                    return
+                path, self._selection = self._selection, None
+                batch = []
+                if path is None:
+                    batch = self._prefetch[:self.PREFETCH_BATCH]
+                    del self._prefetch[:self.PREFETCH_BATCH]
+            try:
+                if path is not None:
+                    meta = self.cache.load(path)
+                    self.metadata_ready.emit(path, meta or {})
+                else:
+                    self.cache.prefetch(batch)
+            except Exception as e:
+                print(f"[MetaLoader] 加载元数据失败: {e}")
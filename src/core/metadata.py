@@ -1,12 +1,14 @@
+import io
 import re
 import json
 from PIL import Image
 
 class MetadataParser:
     @staticmethod
-    def parse_image(file_path):
+    def parse_image(file_path, data=None):
         """
         读取图片元数据并解析 A1111/Fooocus/ComfyUI 参数。
+        data: 已在内存中的图片字节 (如从 ComfyUI /view 取回)，提供时不读取 file_path
         """
         import os
         
@@ -19,12 +21,12 @@ class MetadataParser:
             'raw': "",
             'tool': "Unknown",
             'tech_info': {
-                'file_size': f"{os.path.getsize(file_path) / 1024:.1f} KB",
+                'file_size': f"{(len(data) if data is not None else os.path.getsize(file_path)) / 1024:.1f} KB",
             }
         }
         
         try:
-            with Image.open(file_path) as img:
+            with Image.open(io.BytesIO(data) if data is not None else file_path) as img:
                 info = img.info
                 # 提取技术参数
                 result['tech_info'].update({
@@ -90,6 +92,26 @@ class MetadataParser:
             
         return result # 至少返回技术信息
 
+    @staticmethod
+    def parse_indexed(raw, tool, tech_info):
+        """
+        由索引中保存的原始文本 (raw_metadata) 还原 parse_image 的结果，无需再打开图片文件。
+        """
+        result = {
+            'prompt': "",
+            'negative_prompt': "",
+            'loras': [],
+            'params': {},
+            'raw': "",
+            'tool': "Unknown",
+            'tech_info': dict(tech_info or {})
+        }
+        if raw:
+            # parse_image 中除 ComfyUI 外的来源 (PNG/XMP/Exif/comment) 都走 A1111 解析
+            parsed = MetadataParser.parse_comfyui(raw) if tool == "ComfyUI" else MetadataParser.parse_a1111(raw)
+            result.update(parsed)
+        return result
+
     @staticmethod
     def _decode_exif(val):
         """解析 Exif 编码文本"""
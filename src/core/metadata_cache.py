@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from src.core.metadata import MetadataParser
+
+
+class MetadataCache:
+    """
+    图片元数据 LRU 缓存，键为 (路径, mtime)。
+    优先从数据库索引批量还原 (不读图片文件)，索引缺失或过期时才回退到解析文件。
+    线程安全：可在后台线程填充，UI 线程读取。
+    """
+    def __init__(self, db_manager=None, capacity: int = 256):
+        self.db = db_manager
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple[str, float], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _norm(path: str) -> str:
+        return path.replace("\\", "/")
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def _put(self, key, meta) -> None:
+        with self._lock:
+            self._entries[key] = meta
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """只查缓存，不做任何解析 (UI 线程使用)"""
+        mtime = self._mtime(path)
+        if mtime is None:
+            return None
+        key = (self._norm(path), mtime)
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is not None:
+                self._entries.move_to_end(key)
+            return meta
+
+    def prefetch(self, paths: Iterable[str]) -> int:
+        """从索引批量填充缓存，返回新填充的数量"""
+        if self.db is None:
+            return 0
+        wanted = {}
+        for path in paths:
+            mtime = self._mtime(path)
+            if mtime is None:
+                continue
+            key = (self._norm(path), mtime)
+            with self._lock:
+                if key in self._entries:
+                    continue
+            wanted[key[0]] = mtime
+        if not wanted:
+            return 0
+
+        filled = 0
+        infos = self.db.get_images_batch_info(list(wanted.keys()), include_raw=True)
+        for path, info in infos.items():
+            mtime = wanted.get(path)
+            # 索引里的 mtime 与文件不一致说明记录已过期，留给文件解析
+            if mtime is None or info.get('file_mtime') != mtime or not info.get('tech_info'):
+                continue
+            try:
+                meta = MetadataParser.parse_indexed(info.get('raw_metadata'), info.get('tool'), info.get('tech_info'))
+            except Exception as e:
+                print(f"[MetaCache] 还原元数据失败 {os.path.basename(path)}: {e}")
+                continue
+            self._put((path, mtime), meta)
+            filled += 1
+        return filled
+
+    def load(self, path: str) -> Optional[Dict[str, Any]]:
+        """缓存 → 索引 → 解析文件，依次尝试 (会做 IO，勿在 UI 线程调用)"""
+        meta = self.get(path)
+        if meta is not None:
+            return meta
+        if self.prefetch([path]):
+            meta = self.get(path)
+            if meta is not None:
+                return meta
+        mtime = self._mtime(path)
+        if mtime is None:
+            return None
+        meta = MetadataParser.parse_image(path)
+        if meta:
+            self._put((self._norm(path), mtime), meta)
+        return meta
+
+    def invalidate(self, path: str) -> None:
+        norm = self._norm(path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == norm]:
+                del self._entries[key]
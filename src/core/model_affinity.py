@@ -0,0 +1,51 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+
+# (基础模型签名, LoRA 签名)：基础模型 = Checkpoint/UNET/VAE/CLIP 等加载器，切换时要重新加载权重；
+# LoRA 变化只需重新打补丁，代价较小
+LoaderSignature = Tuple[str, str]
+
+MODEL_EXTENSIONS = ('.safetensors', '.ckpt', '.pt', '.pth', '.bin', '.sft', '.gguf')
+
+
+def loader_signature(workflow: Dict[str, Any]) -> Optional[LoaderSignature]:
+    """收集工作流中所有 *Loader* 节点的参数值 (忽略连线)，作为模型状态签名"""
+    if not isinstance(workflow, dict):
+        return None
+    base, loras = [], []
+    for node in workflow.values():
+        if not isinstance(node, dict):
+            continue
+        ctype = str(node.get("class_type", ""))
+        if "loader" not in ctype.lower():
+            continue
+        values = sorted((k, v) for k, v in (node.get("inputs") or {}).items() if not isinstance(v, list))
+        (loras if "lora" in ctype.lower() else base).append((ctype, values))
+    try:
+        return (json.dumps(sorted(base), ensure_ascii=False, default=str),
+                json.dumps(sorted(loras), ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return None
+
+
+def required_models(workflow: Dict[str, Any]) -> frozenset:
+    """工作流中加载器节点引用的模型文件名 (用于判断某个后端是否具备这些模型)"""
+    names = set()
+    if isinstance(workflow, dict):
+        for node in workflow.values():
+            if not isinstance(node, dict) or "loader" not in str(node.get("class_type", "")).lower():
+                continue
+            for value in (node.get("inputs") or {}).values():
+                if isinstance(value, str) and value.lower().endswith(MODEL_EXTENSIONS):
+                    names.add(value)
+    return frozenset(names)
+
+
+def affinity_rank(signature: Optional[LoaderSignature], current: Optional[LoaderSignature]) -> int:
+    """0: 与当前模型状态完全相同；1: 基础模型相同只换 LoRA；2: 需要重新加载基础模型"""
+    if signature is None or current is None:
+        return 2
+    if signature == current:
+        return 0
+    return 1 if signature[0] == current[0] else 2
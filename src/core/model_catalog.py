@@ -0,0 +1,79 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class ModelFileCatalog:
+    """
+    ComfyUI 模型目录 (loras / checkpoints / unet ...) 的文件清单缓存。
+    - 第一次 list_files() 时 os.walk 一遍，记下每个子目录的 mtime
+    - 之后只 stat 这些目录：增删文件/子目录都会改变其所在目录的 mtime，全部未变则直接复用清单
+    - 每次清单实际发生变化，version 加一 (供名称解析索引等判断是否需要重建)
+    线程安全。
+    """
+    _instance = None
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, tuple], dict] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    @classmethod
+    def shared(cls) -> "ModelFileCatalog":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def _dir_mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _is_fresh(self, entry: dict) -> bool:
+        for path, mtime in entry["dirs"].items():
+            if self._dir_mtime(path) != mtime:
+                return False
+        return True
+
+    def _scan(self, root: str, exts: tuple) -> dict:
+        files: List[str] = []
+        seen = set()
+        dirs = {}
+        for current, _, names in os.walk(root):
+            dirs[current] = self._dir_mtime(current)
+            for fname in names:
+                if fname.lower().endswith(exts):
+                    rel_path = os.path.relpath(os.path.join(current, fname), root).replace("\\", "/")
+                    if rel_path not in seen:
+                        seen.add(rel_path)
+                        files.append(rel_path)
+        return {"files": files, "dirs": dirs}
+
+    def list_files(self, root: str, exts: Iterable[str]) -> List[str]:
+        """返回 root 下匹配扩展名的文件相对路径 (正斜杠)；目录不存在时返回空列表"""
+        if not root or not os.path.isdir(root):
+            return []
+        key = (os.path.normpath(root), tuple(e.lower() for e in exts))
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(entry):
+            return list(entry["files"])
+        fresh = self._scan(key[0], key[1])
+        with self._lock:
+            if entry is None or entry["files"] != fresh["files"]:
+                self.version += 1
+            self._entries[key] = fresh
+        return list(fresh["files"])
+
+    def invalidate(self, root: Optional[str] = None) -> None:
+        """丢弃缓存 (root 为空时全部丢弃)，下次 list_files 重新扫描"""
+        with self._lock:
+            if root is None:
+                self._entries.clear()
+            else:
+                norm = os.path.normpath(root)
+                for key in [k for k in self._entries if k[0] == norm]:
+                    del self._entries[key]
+            self.version += 1
@@ -0,0 +1,162 @@
+import bisect
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+class _RangeMin:
+    """静态区间最小值 (稀疏表)：O(n log n) 构建，O(1) 查询 [lo, hi)"""
+    def __init__(self, values: Sequence[int]):
+        self._table = [list(values)]
+        k = 1
+        while (1 << k) <= len(values):
+            prev = self._table[-1]
+            half = 1 << (k - 1)
+            self._table.append([min(prev[i], prev[i + half]) for i in range(len(values) - (1 << k) + 1)])
+            k += 1
+
+    def query(self, lo: int, hi: int) -> Optional[int]:
+        if lo >= hi:
+            return None
+        k = (hi - lo).bit_length() - 1
+        row = self._table[k]
+        return min(row[lo], row[hi - (1 << k)])
+
+
+class ModelNameResolver:
+    """
+    把 UI / 元数据里的模型名解析为 ComfyUI 可用列表中的实际名称。
+    在列表上一次性建好索引，匹配规则和先后顺序与原先的逐项扫描一致
+    (同一规则命中多个时取列表中靠前的一个)：
+    - 精确名 / 补扩展名 / 小写路径 / 文件名 / 去扩展名：哈希表 O(1)
+    - 后缀匹配：反转字符串排序 + 二分，区间内最靠前的位置用稀疏表 O(1) 取得
+    - 子串匹配：三字母组倒排索引求交后再校验
+    结果按查询名缓存；调用方换了列表对象时重建 (未变的名称复用其三字母组)，
+    因此清单未变时调用方应沿用同一个列表对象。
+    """
+    EXTENSIONS = ('.safetensors', '.ckpt', '.pt', '.sft')
+    _MAX_CHAR = "\U0010ffff"
+
+    def __init__(self, names: Iterable[str], previous: Optional["ModelNameResolver"] = None):
+        self.source = names
+        self.names: List[str] = list(names)
+        self._memo: Dict[tuple, Optional[str]] = {}
+
+        self._exact: Dict[str, int] = {}
+        self._lower: Dict[str, int] = {}
+        self._base: Dict[str, int] = {}
+        self._stem: Dict[str, int] = {}
+        for i, name in enumerate(self.names):
+            self._exact.setdefault(name, i)
+            self._lower.setdefault(name.replace("\\", "/").lower(), i)
+            base = os.path.basename(name).lower()
+            self._base.setdefault(base, i)
+            self._stem.setdefault(os.path.splitext(base)[0], i)
+
+        reversed_names = sorted((name[::-1], i) for i, name in enumerate(self.names))
+        self._rev_keys = [r for r, _ in reversed_names]
+        self._rev_min = _RangeMin([i for _, i in reversed_names])
+
+        old_grams = previous._grams if previous is not None else {}
+        self._grams: Dict[str, frozenset] = {}
+        self._postings: Dict[str, set] = defaultdict(set)
+        for i, name in enumerate(self.names):
+            grams = self._grams.get(name)
+            if grams is None:
+                grams = old_grams.get(name)
+                if grams is None:
+                    grams = self._trigrams(name)
+                self._grams[name] = grams
+            for gram in grams:
+                self._postings[gram].add(i)
+
+    def matches(self, names: Sequence[str]) -> bool:
+        """是否为建索引时的同一个列表对象 (O(1)，不逐项比较)"""
+        return names is self.source
+
+    @staticmethod
+    def _trigrams(text: str) -> frozenset:
+        return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+    @staticmethod
+    def _clean(ui_name: str) -> str:
+        return ui_name.replace("🎨 ", "").strip()
+
+    def _suffix_first(self, suffix: str) -> Optional[int]:
+        """以 suffix 结尾的名称中最靠前的位置"""
+        prefix = suffix[::-1]
+        lo = bisect.bisect_left(self._rev_keys, prefix)
+        hi = bisect.bisect_left(self._rev_keys, prefix + self._MAX_CHAR)
+        return self._rev_min.query(lo, hi)
+
+    def _substring_first(self, text: str) -> Optional[int]:
+        """包含 text 的名称中最靠前的位置"""
+        if len(text) < 3:
+            candidates = range(len(self.names))
+        else:
+            postings = sorted((self._postings.get(g, set()) for g in self._trigrams(text)), key=len)
+            if not postings[0]:
+                return None
+            found = set(postings[0])
+            for posting in postings[1:]:
+                found &= posting
+                if not found:
+                    return None
+            candidates = sorted(found)
+        for i in candidates:
+            if text in self.names[i]:
+                return i
+        return None
+
+    @staticmethod
+    def _first(*indices) -> Optional[int]:
+        hits = [i for i in indices if i is not None]
+        return min(hits) if hits else None
+
+    def resolve(self, ui_name: str) -> Optional[str]:
+        """模型 / UNET / VAE / CLIP：精确 → 补扩展名 → 后缀 → 子串"""
+        clean = self._clean(ui_name)
+        key = ("model", clean)
+        if key in self._memo:
+            return self._memo[key]
+        result = None
+        if clean in self._exact:
+            result = clean
+        else:
+            for ext in self.EXTENSIONS:
+                if clean + ext in self._exact:
+                    result = clean + ext
+                    break
+            else:
+                index = self._first(self._suffix_first(clean), self._suffix_first(clean + ".safetensors"))
+                if index is None:
+                    index = self._substring_first(clean)
+                if index is not None:
+                    result = self.names[index]
+        self._memo[key] = result
+        return result
+
+    def resolve_lora(self, ui_name: str) -> Optional[str]:
+        """LoRA：精确 → 列表项是查询路径的后缀 (绝对路径) → 补扩展名 → 文件名 / 去扩展名"""
+        clean = self._clean(ui_name)
+        key = ("lora", clean)
+        if key in self._memo:
+            return self._memo[key]
+        result = None
+        if clean in self._exact:
+            result = clean
+        else:
+            clean_lower = clean.lower().replace("\\", "/")
+            index = self._first(*(self._lower.get(clean_lower[i:]) for i in range(len(clean_lower) + 1)))
+            if index is None:
+                for ext in self.EXTENSIONS:
+                    if clean + ext in self._exact:
+                        index = self._exact[clean + ext]
+                        break
+            if index is None:
+                base_clean = os.path.basename(clean).lower()
+                index = self._first(self._base.get(base_clean), self._stem.get(os.path.splitext(base_clean)[0]))
+            if index is not None:
+                result = self.names[index]
+        self._memo[key] = result
+        return result
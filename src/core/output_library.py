@@ -0,0 +1,145 @@
+import os
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from src.core.metadata import MetadataParser
+from src.core.placeholder import placeholder_from_qimage
+
+DEFAULT_LIBRARY_DIR = "comfy_outputs"
+
+
+def _app_dir() -> str:
+    """程序目录 (打包后为可执行文件所在目录)"""
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(os.path.abspath(sys.executable))
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class OutputLibrary:
+    """
+    本地生成结果库：把从 ComfyUI /view 取回的图片字节写入库目录，并直接用内存中的数据
+    解析元数据、生成缩略图与占位图后入索引，不再猜测 ComfyUI 的输出路径，也无需等待文件落盘。
+    目录结构沿用 ComfyUI 的 subfolder；同名但内容不同的文件 (例如来自不同后端) 追加序号。
+    未指定库目录时：设置了 ComfyUI 目录则直接使用其 output 目录 (本地后端写出的文件内容相同，原地复用，
+    不会多存一份)，否则为程序目录下的 comfy_outputs。
+    """
+    def __init__(self, db_manager, thumb_cache, root: str = "", comfy_root: str = ""):
+        self.db = db_manager
+        self.thumb_cache = thumb_cache
+        self.root = ""
+        self.comfy_root = ""
+        self.set_root(root, comfy_root)
+
+    def set_root(self, root: str, comfy_root: str = "") -> None:
+        self.comfy_root = str(comfy_root or "").strip()
+        root = str(root or "").strip()
+        if not root:
+            root = os.path.join(self.comfy_root, "output") if self.comfy_root else DEFAULT_LIBRARY_DIR
+        self.root = os.path.normpath(os.path.join(_app_dir(), root))
+
+    @staticmethod
+    def _subfolder_parts(image_info: Dict[str, Any]):
+        subfolder = str(image_info.get("subfolder") or "").replace("\\", "/").strip("/")
+        return [p for p in subfolder.split("/") if p and p not in (".", "..")]
+
+    def comfy_output_path(self, image_info: Dict[str, Any]) -> Optional[str]:
+        """本地 ComfyUI 自己写出的同一文件的路径 (未设置 ComfyUI 目录或非 output 类型时为 None)"""
+        filename = os.path.basename(str(image_info.get("filename") or ""))
+        if not self.comfy_root or not filename or image_info.get("type", "output") != "output":
+            return None
+        return os.path.join(self.comfy_root, "output", *self._subfolder_parts(image_info), filename)
+
+    def _target_path(self, image_info: Dict[str, Any], data: bytes) -> Optional[str]:
+        filename = os.path.basename(str(image_info.get("filename") or ""))
+        if not filename:
+            return None
+        folder = os.path.join(self.root, *self._subfolder_parts(image_info))
+        stem, ext = os.path.splitext(filename)
+        path = os.path.join(folder, filename)
+        index = 1
+        while os.path.exists(path):
+            # 内容相同说明已保存过 (或库目录就是 ComfyUI 的输出目录)，直接复用
+            if os.path.getsize(path) == len(data):
+                with open(path, "rb") as f:
+                    if f.read() == data:
+                        return path
+            path = os.path.join(folder, f"{stem}_{index}{ext}")
+            index += 1
+        return path
+
+    def store(self, data: bytes, image_info: Dict[str, Any]) -> Optional[str]:
+        """写入库目录 (临时文件 + 替换，避免监视器读到半个文件)，返回保存路径"""
+        path = self._target_path(image_info, data)
+        if not path:
+            return None
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def ingest(self, data: bytes, image_info: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any], QImage]]:
+        """保存并入索引，返回 (路径, 元数据, 128px 缩略图)；失败返回 None"""
+        try:
+            path = self.store(data, image_info)
+        except OSError as e:
+            print(f"[Output] 保存生成结果失败: {e}")
+            return None
+        if not path:
+            return None
+        image = QImage.fromData(data)
+        thumb = QImage()
+        if not image.isNull():
+            thumb = image.scaled(128, 128, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.FastTransformation)
+        meta = MetadataParser.parse_image(path, data=data)
+        if meta:
+            meta['placeholder'] = placeholder_from_qimage(thumb)
+            self.db.add_image(path, meta)
+        if not thumb.isNull():
+            self.thumb_cache.save_thumbnail(path, thumb)
+        return path, meta, thumb
+
+
+class _IngestTask(QRunnable):
+    def __init__(self, ingestor, prompt_id, data, image_info, context):
+        super().__init__()
+        self.ingestor = ingestor
+        self.args = (prompt_id, data, image_info, context)
+
+    def run(self):
+        self.ingestor._run_task(*self.args)
+
+
+class OutputIngestor(QObject):
+    """
+    在后台线程执行 OutputLibrary.ingest (写文件、解码、解析元数据、入库)，结果经 ingested 回到 UI 线程。
+    单线程串行执行，同名文件的序号判断不会互相竞争。
+    """
+    ingested = pyqtSignal(str, object, dict, dict)  # prompt_id, (路径, 元数据, 缩略图) 或 None, image_info, context
+
+    def __init__(self, library: OutputLibrary, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+
+    def submit(self, prompt_id: str, data: bytes, image_info: Dict[str, Any], context: Dict[str, Any]) -> None:
+        self.pool.start(_IngestTask(self, prompt_id, data, dict(image_info), dict(context)))
+
+    def _run_task(self, prompt_id, data, image_info, context) -> None:
+        try:
+            result = self.library.ingest(data, image_info)
+        except Exception as e:
+            print(f"[Output] 入库失败: {e}")
+            result = None
+        self.ingested.emit(prompt_id, result, image_info, context)
+
+    def shutdown(self) -> None:
+        self.pool.waitForDone(3000)
@@ -0,0 +1,63 @@
+import io
+import base64
+from typing import Optional
+
+from PyQt6.QtCore import Qt, QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImage
+
+# 低清占位图 (LQIP)：长边 16px 的 JPEG，base64 后约 300~600 字节，直接存进索引
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+
+
+def encode_placeholder(img) -> str:
+    """由 PIL Image 生成 base64 编码的微型 JPEG"""
+    from PIL import Image
+    small = img.convert("RGB")
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), resample=getattr(Image, 'Resampling', Image).BILINEAR)
+    buf = io.BytesIO()
+    small.save(buf, "JPEG", quality=PLACEHOLDER_QUALITY, optimize=True)
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def make_placeholder(file_path: str) -> Optional[str]:
+    """读取图片并生成占位图，失败返回 None (线程安全，不依赖 Qt)"""
+    from PIL import Image
+    try:
+        with Image.open(file_path) as img:
+            # JPEG 可在解码阶段直接降到 1/8，几乎不花时间
+            img.draft('RGB', (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+            return encode_placeholder(img)
+    except Exception as e:
+        print(f"[Placeholder] 生成失败 {file_path}: {e}")
+        return None
+
+
+def placeholder_from_qimage(qimage: QImage) -> Optional[str]:
+    """由已解码的缩略图 (QImage) 生成占位图，避免重复读取原图"""
+    if qimage is None or qimage.isNull():
+        return None
+    small = qimage.scaled(PLACEHOLDER_SIZE, PLACEHOLDER_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                          Qt.TransformationMode.SmoothTransformation)
+    data = QByteArray()
+    buf = QBuffer(data)
+    buf.open(QIODevice.OpenModeFlag.WriteOnly)
+    ok = small.convertToFormat(QImage.Format.Format_RGB32).save(buf, "JPEG", PLACEHOLDER_QUALITY)
+    buf.close()
+    if not ok:
+        return None
+    return base64.b64encode(bytes(data)).decode("ascii")
+
+
+def decode_placeholder(data: str, size: int = 128) -> Optional[QImage]:
+    """解码占位图并平滑放大到显示尺寸 (放大本身就带来模糊效果)"""
+    if not data:
+        return None
+    try:
+        img = QImage.fromData(base64.b64decode(data))
+    except (ValueError, TypeError):
+        return None
+    if img.isNull():
+        return None
+    return img.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                      Qt.TransformationMode.SmoothTransformation)
@@ -0,0 +1,91 @@
+import json
+import struct
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage
+
+# ComfyUI WebSocket 二进制帧：前 4 字节为大端事件类型
+PREVIEW_IMAGE = 1                   # [类型][图片格式 1=JPEG 2=PNG][图片数据]
+PREVIEW_IMAGE_WITH_METADATA = 4     # [类型][元数据长度][元数据 JSON (含 prompt_id)][图片数据]
+IMAGE_FORMATS = {1: "image/jpeg", 2: "image/png"}
+
+# 连接后发送，声明支持带元数据的预览帧 (旧版 ComfyUI 忽略该消息，仍发送 PREVIEW_IMAGE)
+FEATURE_FLAGS_MESSAGE = json.dumps({"type": "feature_flags", "data": {"supports_preview_metadata": True}})
+
+
+def parse_preview_frame(data: bytes) -> Optional[Tuple[Dict[str, Any], bytes, str]]:
+    """解析采样预览帧，返回 (元数据, 图片字节, MIME)；不是预览帧或格式不符时返回 None"""
+    if len(data) < 8:
+        return None
+    event, = struct.unpack(">I", data[:4])
+    if event == PREVIEW_IMAGE:
+        image_format, = struct.unpack(">I", data[4:8])
+        return {}, data[8:], IMAGE_FORMATS.get(image_format, "image/jpeg")
+    if event == PREVIEW_IMAGE_WITH_METADATA:
+        length, = struct.unpack(">I", data[4:8])
+        if len(data) < 8 + length:
+            return None
+        try:
+            metadata = json.loads(data[8:8 + length].decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            return None
+        if not isinstance(metadata, dict):
+            return None
+        return metadata, data[8 + length:], str(metadata.get("image_type") or "image/jpeg")
+    return None
+
+
+class _PreviewDecodeTask(QRunnable):
+    def __init__(self, decoder):
+        super().__init__()
+        self.decoder = decoder
+
+    def run(self):
+        self.decoder._drain()
+
+
+class PreviewDecoder(QObject):
+    """
+    后台解码采样预览帧。只保留最新一帧：解码期间到达的帧互相覆盖，
+    采样步速超过解码速度时直接丢弃中间帧，不会在 UI 线程堆积。
+    """
+    decoded = pyqtSignal(str, QImage) # prompt_id, 预览图
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+        self._lock = threading.Lock()
+        self._pending: Optional[Tuple[str, bytes]] = None
+        self._busy = False
+        self.received = 0
+        self.decoded_count = 0
+
+    def submit(self, prompt_id: str, payload: bytes) -> None:
+        with self._lock:
+            self.received += 1
+            self._pending = (prompt_id, payload)
+            if self._busy:
+                return
+            self._busy = True
+        self.pool.start(_PreviewDecodeTask(self))
+
+    def _drain(self) -> None:
+        while True:
+            with self._lock:
+                item, self._pending = self._pending, None
+                if item is None:
+                    self._busy = False
+                    return
+            image = QImage.fromData(item[1])
+            if image.isNull():
+                continue
+            self.decoded_count += 1
+            self.decoded.emit(item[0], image)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._pending = None
+        self.pool.waitForDone(1000)
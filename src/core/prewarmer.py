@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional, Dict, Any
+
+from src.core.cache import ThumbnailCache
+
+
+def _system_cpu_percent() -> Optional[float]:
+    """尽力获取系统 CPU 占用 (0-100)，无法获取时返回 None"""
+    try:
+        import psutil  # 可选依赖
+        return float(psutil.cpu_percent(interval=None))
+    except Exception:
+        pass
+    if hasattr(os, "getloadavg"):
+        try:
+            load1 = os.getloadavg()[0]
+            return min(load1 / max(os.cpu_count() or 1, 1) * 100.0, 100.0)
+        except OSError:
+            pass
+    return None
+
+
+class ThumbnailPrewarmer:
+    """
+    空闲时预生成缩略图的低优先级后台任务。
+    - 只在 idle_check() 为 True 时工作 (应用与 ComfyUI 均空闲)
+    - 按 CPU 负载和占空比自我限速
+    - 待处理队列落盘，重启或取消后可从中断处继续；入队后延迟 JOURNAL_DELAY 秒写盘，
+      扫描期间的多批入队合并为一次写入
+    """
+    JOURNAL_NAME = "prewarm_queue.json"
+    JOURNAL_DELAY = 2.0
+
+    def __init__(
+        self,
+        cache: ThumbnailCache,
+        sizes: Iterable[int] = (512,),
+        idle_check: Optional[Callable[[], bool]] = None,
+        max_cpu_percent: float = 60.0,
+        duty_cycle: float = 0.3,
+    ):
+        self.cache = cache
+        self.sizes = sorted({int(s) for s in sizes}, reverse=True)
+        self.idle_check = idle_check or (lambda: True)
+        self.max_cpu_percent = max_cpu_percent
+        # 工作时间占比：处理一张耗时 t，则随后休眠 t * (1 - duty) / duty
+        self.duty_cycle = min(max(duty_cycle, 0.05), 1.0)
+        self.journal_path = os.path.join(cache.cache_dir, self.JOURNAL_NAME)
+
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._journal_lock = threading.Lock()   # 串行化日志文件写入 (工作线程与延迟写入定时器)
+        self._journal_timer: Optional[threading.Timer] = None
+        self._wake = threading.Event()
+        self._cancel = threading.Event()
+        self._thread = None
+        self._dirty = 0
+        self.generated = 0
+        self.skipped = 0
+        self._load_journal()
+
+    # ---- 队列与持久化 ----
+    def _load_journal(self) -> None:
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                paths = json.load(f)
+            if isinstance(paths, list):
+                for p in paths:
+                    if isinstance(p, str):
+                        self._pending[p] = None
+            if self._pending:
+                print(f"[Prewarm] 恢复未完成的预热任务: {len(self._pending)} 张")
+        except (OSError, ValueError):
+            pass
+
+    def _save_journal(self) -> None:
+        with self._journal_lock:
+            with self._lock:
+                paths = list(self._pending.keys())
+                self._dirty = 0
+            try:
+                if not paths:
+                    if os.path.exists(self.journal_path):
+                        os.remove(self.journal_path)
+                    return
+                tmp_path = self.journal_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(paths, f, ensure_ascii=False)
+                os.replace(tmp_path, self.journal_path)
+            except OSError as e:
+                print(f"[Prewarm] 保存队列失败: {e}")
+
+    def _schedule_journal(self) -> None:
+        with self._lock:
+            if self._journal_timer is not None:
+                return
+            timer = threading.Timer(self.JOURNAL_DELAY, self.flush_journal)
+            timer.daemon = True
+            self._journal_timer = timer
+        timer.start()
+
+    def flush_journal(self) -> None:
+        """立即写入日志 (取消尚未触发的延迟写入)"""
+        with self._lock:
+            timer, self._journal_timer = self._journal_timer, None
+        if timer is not None:
+            timer.cancel()
+        self._save_journal()
+
+    def enqueue(self, paths: Iterable[str]) -> int:
+        """加入待预热的图片路径 (自动去重)，返回新增数量"""
+        added = 0
+        with self._lock:
+            for p in paths:
+                if p and p not in self._pending:
+                    self._pending[p] = None
+                    added += 1
+        if added:
+            self._schedule_journal()
+            self._wake.set()
+        return added
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    # ---- 生命周期 ----
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._cancel.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if self._pending:
+            self._wake.set()
+
+    def cancel(self, clear_queue: bool = False) -> None:
+        """停止预热；默认保留队列，下次 start() 时继续"""
+        self._cancel.set()
+        self._wake.set()
+        if clear_queue:
+            with self._lock:
+                self._pending.clear()
+        self.flush_journal()
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running() and not self._cancel.is_set(),
+            "pending": self.pending_count(),
+            "generated": self.generated,
+            "skipped": self.skipped,
+            "sizes": list(self.sizes),
+        }
+
+    # ---- 工作循环 ----
+    def _missing_sizes(self, path: str, mtime: int) -> List[int]:
+        return [s for s in self.sizes if not os.path.exists(self.cache.get_variant_path(path, s, mtime))]
+
+    def _wait_until_allowed(self) -> bool:
+        """等待空闲且 CPU 负载低于阈值；被取消时返回 False"""
+        while not self._cancel.is_set():
+            idle = False
+            try:
+                idle = bool(self.idle_check())
+            except Exception:
+                idle = False
+            cpu = _system_cpu_percent() if idle else None
+            if idle and (cpu is None or cpu <= self.max_cpu_percent):
+                return True
+            self._cancel.wait(2.0)
+        return False
+
+    def _process_one(self, path: str) -> None:
+        fs_path = os.path.normpath(path)
+        if not os.path.exists(fs_path):
+            self.skipped += 1
+            return
+        mtime = int(os.path.getmtime(fs_path))
+        missing = self._missing_sizes(path, mtime)
+        if not missing:
+            self.skipped += 1
+            return
+        for size in missing:
+            self.cache.render_variant(fs_path, size, mtime)
+        self.generated += 1
+
+    def _run(self) -> None:
+        while not self._cancel.is_set():
+            with self._lock:
+                path = next(iter(self._pending), None)
+            if path is None:
+                if self._dirty:
+                    self._save_journal()
+                self._wake.clear()
+                self._wake.wait(30)
+                continue
+            if not self._wait_until_allowed():
+                break
+
+            started = time.time()
+            try:
+                self._process_one(path)
+            except Exception as e:
+                print(f"[Prewarm] 生成缩略图失败 {os.path.basename(path)}: {e}")
+            with self._lock:
+                self._pending.pop(path, None)
+                self._dirty += 1
+                dirty = self._dirty
+            if dirty >= 50:
+                self._save_journal()
+
+            elapsed = time.time() - started
+            pause = elapsed * (1.0 - self.duty_cycle) / self.duty_cycle
+            if pause > 0:
+                self._cancel.wait(min(pause, 5.0))
+        self._save_journal()
@@ -1,17 +1,20 @@
 import os
 import concurrent.futures
 import threading
-from typing import List, Optional
+from typing import Callable, List, Optional
 from src.core.database import DatabaseManager
 from src.core.metadata import MetadataParser
+from src.core.placeholder import make_placeholder
 from PyQt6.QtCore import QSettings
 
 class ImageScanner:
     """
     负责扫描文件夹并索引新图片的独立服务类。
     """
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, on_indexed: Optional[Callable[[List[str]], None]] = None):
         self.db = db_manager
+        # 每批新图入库后的回调 (例如缩略图预热)
+        self.on_indexed = on_indexed
         self._lock = threading.Lock()
         self._is_scanning = False
 
@@ -78,7 +81,7 @@ class ImageScanner:
             
             # 限制并发数防止卡顿
             with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-                future_to_path = {executor.submit(MetadataParser.parse_image, path): path for path in new_files}
+                future_to_path = {executor.submit(self._parse_for_index, path): path for path in new_files}
                 
                 for future in concurrent.futures.as_completed(future_to_path):
                     path = future_to_path[future]
@@ -107,7 +110,20 @@ class ImageScanner:
             with self._lock:
                 self._is_scanning = False
 
+    @staticmethod
+    def _parse_for_index(path):
+        """解析元数据，并顺带生成低清占位图一起入库"""
+        meta = MetadataParser.parse_image(path)
+        if meta:
+            meta['placeholder'] = make_placeholder(path)
+        return meta
+
     def _flush_batch(self, batch):
         """将一批解析结果写入数据库"""
         # 使用数据库层实现的批量事务写入，极大提高效率并减少锁定时间
         self.db.add_images_batch(batch)
+        if self.on_indexed:
+            try:
+                self.on_indexed([path.replace("\\", "/") for path, _ in batch])
+            except Exception as e:
+                print(f"[Scanner] on_indexed callback failed: {e}")
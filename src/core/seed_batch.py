@@ -0,0 +1,154 @@
+import json
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+
+MAX_SEED_BATCH = 8   # 单个合并任务的最大 batch_size，避免显存溢出
+
+
+def _node_class(node: Any) -> str:
+    return str(node.get("class_type", "")).lower() if isinstance(node, dict) else ""
+
+
+def _is_seeded_sampler(node: Any) -> bool:
+    inputs = node.get("inputs") if isinstance(node, dict) else None
+    return "sampler" in _node_class(node) and isinstance(inputs, dict) and "seed" in inputs
+
+
+def latent_batch_slot(workflow: Dict[str, Any]) -> Optional[str]:
+    """唯一的 Empty*LatentImage 节点 (batch_size 为 1) 的 ID；没有或不止一个时无法合并"""
+    found = None
+    for node_id, node in workflow.items():
+        ctype = _node_class(node)
+        if "latentimage" in ctype and "empty" in ctype:
+            if found is not None:
+                return None
+            found = node_id
+    if found is None:
+        return None
+    batch_size = workflow[found].get("inputs", {}).get("batch_size")
+    return found if batch_size in (None, 1) else None
+
+
+def seed_signature(workflow: Dict[str, Any]) -> Optional[str]:
+    """去掉采样器 seed 后的规范化 JSON；两个 workflow 签名相同即只有种子不同"""
+    if not isinstance(workflow, dict):
+        return None
+    stripped = {}
+    for node_id, node in workflow.items():
+        if _is_seeded_sampler(node):
+            node = dict(node)
+            node["inputs"] = {k: v for k, v in node["inputs"].items() if k != "seed"}
+        stripped[node_id] = node
+    try:
+        return json.dumps(stripped, sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+def sampler_seeds(workflow: Dict[str, Any]) -> Tuple:
+    return tuple(node["inputs"]["seed"] for node in workflow.values() if _is_seeded_sampler(node))
+
+
+def collapse_seed_batch(workflow: Dict[str, Any], count: int, seed: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    把 count 个只差种子的任务改写为一个 batch_size=count 的任务 (结构共享，只复制被修改的节点)。
+    seed 为空时生成一个新的随机种子；ComfyUI 用同一种子为整批生成噪声，
+    第 i 张图可通过 (seed, batch_index=i) 复现。无法合并时返回 None。
+    """
+    if count <= 1 or not isinstance(workflow, dict):
+        return None
+    latent_id = latent_batch_slot(workflow)
+    if latent_id is None:
+        return None
+    if seed is None:
+        seed = random.SystemRandom().randint(10**17, 18446744073709551614)
+
+    batched = dict(workflow)
+    latent = dict(workflow[latent_id])
+    latent["inputs"] = dict(latent.get("inputs", {}))
+    latent["inputs"]["batch_size"] = count
+    batched[latent_id] = latent
+    for node_id, node in workflow.items():
+        if _is_seeded_sampler(node):
+            node = dict(node)
+            node["inputs"] = dict(node["inputs"])
+            node["inputs"]["seed"] = int(seed)
+            batched[node_id] = node
+    return batched
+
+
+def is_random_seed_context(context: Optional[Dict[str, Any]]) -> bool:
+    """context 标记了种子为随机生成 (seed_mode == "random") 时才允许改写种子"""
+    return isinstance(context, dict) and context.get("seed_mode") == "random"
+
+
+def plan_seed_batches(
+    workflows: List[Dict[str, Any]],
+    contexts: List[Optional[Dict[str, Any]]],
+    max_batch: int = MAX_SEED_BATCH,
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    把只差种子、且 context 标记为随机种子 (seed_mode == "random") 的任务合并为批次任务，返回 [(workflow, context)]。
+    合并后的 context 含:
+    - batch_contexts: 各逻辑任务原本的 context (按 batch_index 顺序)
+    - seed_batch: {"seed", "count"}
+    调用方指定的种子保持不变：未标记随机种子或种子相同的任务不合并 (合并后会得到不同的图)；
+    无法合并的任务原样提交。
+    """
+    groups: Dict[str, List[int]] = {}
+    order: List[Any] = []
+    for idx, workflow in enumerate(workflows):
+        mergeable = is_random_seed_context(contexts[idx]) and latent_batch_slot(workflow)
+        signature = seed_signature(workflow) if mergeable else None
+        if signature is None:
+            order.append(idx)
+            continue
+        if signature not in groups:
+            groups[signature] = []
+            order.append(signature)
+        groups[signature].append(idx)
+
+    planned: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    for entry in order:
+        if isinstance(entry, int):
+            planned.append((workflows[entry], dict(contexts[entry] or {})))
+            continue
+        members = groups[entry]
+        seeds = [sampler_seeds(workflows[i]) for i in members]
+        if len(members) == 1 or len(set(seeds)) != len(seeds):
+            planned.extend((workflows[i], dict(contexts[i] or {})) for i in members)
+            continue
+        for start in range(0, len(members), max_batch):
+            chunk = members[start:start + max_batch]
+            if len(chunk) == 1:
+                planned.append((workflows[chunk[0]], dict(contexts[chunk[0]] or {})))
+                continue
+            first_seeds = seeds[start]
+            seed = first_seeds[0] if first_seeds else None
+            batched = collapse_seed_batch(workflows[chunk[0]], len(chunk), seed)
+            batch_contexts = []
+            for batch_index, i in enumerate(chunk):
+                ctx = dict(contexts[i] or {})
+                ctx["batch_index"] = batch_index
+                if seed is not None and "seed" in ctx:
+                    ctx["seed"] = seed
+                batch_contexts.append(ctx)
+            planned.append((batched, {
+                "batch_contexts": batch_contexts,
+                "seed_batch": {"seed": seed, "count": len(chunk)},
+            }))
+    return planned
+
+
+def split_batch_images(images: List[Dict[str, Any]], context: Dict[str, Any]) -> List[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """把合并任务返回的图片按 batch_index 映射回各逻辑任务的 context"""
+    batch_contexts = context.get("batch_contexts") if isinstance(context, dict) else None
+    if not batch_contexts:
+        return [(images, context)]
+    result = []
+    for batch_index, image in enumerate(images):
+        if batch_index >= len(batch_contexts):
+            break
+        result.append(([image], batch_contexts[batch_index]))
+    return result
@@ -0,0 +1,223 @@
+import time
+from collections import deque
+from statistics import median
+from typing import Any, Dict, List, Optional, Tuple
+
+# (模型, 像素档, 采样器, 总步数, LoRA 数)
+TimingKey = Tuple[str, int, str, int, int]
+
+PIXEL_BUCKET = 256 * 256   # 像素数 (含 batch) 按 256×256 取整分档
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def timing_key(workflow: Dict[str, Any]) -> Optional[TimingKey]:
+    """从 API 格式的工作流提取耗时统计的键；没有带 steps 的采样节点时返回 None"""
+    if not isinstance(workflow, dict):
+        return None
+    model, sampler, pixels, steps, loras = "", "", 0, 0, 0
+    for node in workflow.values():
+        if not isinstance(node, dict):
+            continue
+        ctype = str(node.get("class_type", "")).lower()
+        inputs = node.get("inputs") if isinstance(node.get("inputs"), dict) else {}
+        if "lora" in ctype and "loader" in ctype:
+            strength = _number(inputs.get("strength_model"))
+            if strength is None or strength != 0:
+                loras += 1
+        elif "loader" in ctype and not model:
+            for name_key in ("ckpt_name", "unet_name"):
+                if isinstance(inputs.get(name_key), str):
+                    model = inputs[name_key]
+                    break
+        width, height = _number(inputs.get("width")), _number(inputs.get("height"))
+        if "latent" in ctype and width and height:
+            batch = _number(inputs.get("batch_size")) or 1
+            pixels = max(pixels, int(width * height * max(batch, 1)))
+        node_steps = _number(inputs.get("steps"))
+        if "sampler" in ctype and node_steps:
+            steps += int(node_steps)
+            sampler = sampler or str(inputs.get("sampler_name") or "")
+    if steps <= 0:
+        return None
+    bucket = max(round(pixels / PIXEL_BUCKET), 1) if pixels else 0
+    return (model, bucket, sampler, steps, loras)
+
+
+class _Job:
+    def __init__(self, key: Optional[TimingKey], backend: str, now: float):
+        self.key = key
+        self.backend = backend
+        self.started_at = now
+        self.in_sampler = False
+        self.first_progress_at: Optional[float] = None
+        self.last_progress_at: Optional[float] = None
+        self.last_value: Optional[int] = None
+        self.last_total = 0
+        self.done_before = 0        # 之前各段采样 (如高清修复第二遍) 已完成的步数
+        self.step_seconds = 0.0     # 相邻进度事件之间的累计耗时
+        self.timed_steps = 0
+
+    def steps_done(self) -> int:
+        return self.done_before + (self.last_value or 0)
+
+    def live_seconds_per_step(self) -> Optional[float]:
+        return self.step_seconds / self.timed_steps if self.timed_steps > 0 else None
+
+
+class StepTimingTracker:
+    """
+    持久化的采样耗时统计。由 ComfyClient 的 execution_start / executing / progress / 结束事件驱动：
+    - 采样节点执行期间按相邻进度事件计算每步耗时；其余时间 (加载模型、编码、VAE 解码、保存) 计为固定开销，
+      分为首个采样步之前 (pre) 与最后一个采样步之后 (post)
+    - 任务结束时按 (模型, 像素档, 采样器, 总步数, LoRA 数) 写入数据库，启动时载入最近的样本
+    - 估算取同键最近样本的中位数；没有完全相同的键时依次放宽到步数、LoRA 数、采样器、像素档不同的样本，
+      每步耗时按像素档比例换算
+    只在 UI 线程使用。
+    """
+    SAMPLE_HISTORY = 20   # 每个键参与估算的最近样本数
+    LOAD_LIMIT = 5000
+
+    def __init__(self, db_manager=None):
+        self.db = db_manager
+        self._samples: Dict[TimingKey, deque] = {}
+        self._estimates: Dict[TimingKey, Optional[Tuple[float, float, float]]] = {}
+        self._jobs: Dict[str, _Job] = {}
+        if db_manager is not None:
+            for row in db_manager.get_recent_step_timings(self.LOAD_LIMIT):
+                key = (row["model"] or "", int(row["pixel_bucket"] or 0), row["sampler"] or "",
+                       int(row["steps"] or 0), int(row["lora_count"] or 0))
+                self._add_sample(key, row["seconds_per_step"], row["pre_seconds"], row["post_seconds"])
+
+    # ---- 事件 ----
+    def start(self, prompt_id: str, workflow: Dict[str, Any], backend: str = "", now: Optional[float] = None) -> None:
+        if prompt_id and prompt_id not in self._jobs:
+            self._jobs[prompt_id] = _Job(timing_key(workflow), backend, time.time() if now is None else now)
+
+    def node(self, prompt_id: str, class_type: str) -> None:
+        """当前执行的节点；只有采样节点的进度参与每步耗时统计"""
+        job = self._jobs.get(prompt_id)
+        if job is not None:
+            job.in_sampler = "sampler" in str(class_type or "").lower()
+
+    def progress(self, prompt_id: str, value: int, total: int, now: Optional[float] = None) -> None:
+        job = self._jobs.get(prompt_id)
+        if job is None or not job.in_sampler or total <= 0:
+            return
+        now = time.time() if now is None else now
+        if job.first_progress_at is None:
+            job.first_progress_at = now
+        if job.last_value is not None and total == job.last_total and value > job.last_value:
+            job.step_seconds += now - job.last_progress_at
+            job.timed_steps += value - job.last_value
+        elif job.last_value is not None and (value < job.last_value or total != job.last_total):
+            job.done_before += job.last_value   # 进入下一段采样
+        job.last_value, job.last_total, job.last_progress_at = value, total, now
+
+    def finish(self, prompt_id: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """任务正常结束：记录样本并返回；无法计时 (没有采样进度、工作流未知) 时返回 None"""
+        job = self._jobs.pop(prompt_id, None)
+        if job is None or job.key is None:
+            return None
+        seconds_per_step = job.live_seconds_per_step()
+        if not seconds_per_step:
+            return None
+        now = time.time() if now is None else now
+        total = now - job.started_at
+        post = max(now - job.last_progress_at, 0.0)
+        pre = max(total - job.steps_done() * seconds_per_step - post, 0.0)
+        model, bucket, sampler, steps, loras = job.key
+        record = {
+            "model": model, "pixel_bucket": bucket, "sampler": sampler, "steps": steps, "lora_count": loras,
+            "seconds_per_step": seconds_per_step, "pre_seconds": pre, "post_seconds": post,
+            "total_seconds": total, "backend": job.backend, "recorded_at": now,
+        }
+        self._add_sample(job.key, seconds_per_step, pre, post)
+        if self.db is not None:
+            self.db.add_step_timing(record)
+        return record
+
+    def discard(self, prompt_id: str) -> None:
+        """报错 / 中断的任务不计入统计"""
+        self._jobs.pop(prompt_id, None)
+
+    # ---- 估算 ----
+    def _add_sample(self, key: TimingKey, seconds_per_step: Any, pre: Any, post: Any) -> None:
+        if not seconds_per_step or seconds_per_step <= 0:
+            return
+        self._samples.setdefault(key, deque(maxlen=self.SAMPLE_HISTORY)).append(
+            (float(seconds_per_step), float(pre or 0.0), float(post or 0.0)))
+        self._estimates.clear()
+
+    def estimate(self, key: Optional[TimingKey]) -> Optional[Tuple[float, float, float]]:
+        """返回 (每步秒数, pre 开销, post 开销)；没有任何可参考的样本时返回 None"""
+        if key is None:
+            return None
+        if key not in self._estimates:
+            self._estimates[key] = self._estimate(key)
+        return self._estimates[key]
+
+    def _estimate(self, key: TimingKey) -> Optional[Tuple[float, float, float]]:
+        model, bucket, sampler, _, loras = key
+        levels = (
+            lambda k: k == key,
+            lambda k: (k[0], k[1], k[2], k[4]) == (model, bucket, sampler, loras),
+            lambda k: (k[0], k[1], k[2]) == (model, bucket, sampler),
+            lambda k: (k[0], k[1]) == (model, bucket),
+            lambda k: k[0] == model,
+            lambda k: True,
+        )
+        for match in levels:
+            rows = []
+            for sample_key, samples in self._samples.items():
+                if not match(sample_key):
+                    continue
+                # 每步耗时大致与像素数成正比
+                scale = bucket / sample_key[1] if bucket and sample_key[1] else 1.0
+                rows.extend((sps * scale, pre, post) for sps, pre, post in samples)
+            if rows:
+                return (median(r[0] for r in rows), median(r[1] for r in rows), median(r[2] for r in rows))
+        return None
+
+    def estimate_seconds(self, workflow: Dict[str, Any]) -> Optional[float]:
+        """尚未开始的任务预计总耗时"""
+        key = timing_key(workflow)
+        estimate = self.estimate(key)
+        if estimate is None:
+            return None
+        seconds_per_step, pre, post = estimate
+        return pre + key[3] * seconds_per_step + post
+
+    def remaining_seconds(self, prompt_id: str, now: Optional[float] = None) -> Optional[float]:
+        """执行中任务的剩余时间：已有采样进度时优先使用本次实测的每步耗时"""
+        job = self._jobs.get(prompt_id)
+        if job is None:
+            return None
+        now = time.time() if now is None else now
+        estimate = self.estimate(job.key)
+        seconds_per_step = job.live_seconds_per_step() or (estimate[0] if estimate else None)
+        if seconds_per_step is None:
+            return None
+        pre, post = (estimate[1], estimate[2]) if estimate else (0.0, 0.0)
+        total_steps = job.key[3] if job.key else job.last_total
+        remaining_steps = max(total_steps - job.steps_done(), 0)
+        if job.first_progress_at is None:
+            # 仍在加载模型 / 编码提示词
+            return max(pre - (now - job.started_at), 0.0) + remaining_steps * seconds_per_step + post
+        return remaining_steps * seconds_per_step + post
+
+    def running_remaining_seconds(self, prompt_ids, now: Optional[float] = None) -> Optional[float]:
+        """
+        指定的执行中任务 (各后端 queue_state.running，多后端时各自执行) 里最晚结束的剩余时间；
+        只看调用方确认仍在执行的任务，漏掉结束事件的残留记录不会拖住 ETA
+        """
+        values = [v for v in (self.remaining_seconds(pid, now) for pid in prompt_ids) if v is not None]
+        return max(values) if values else None
+
+    def throughput(self, model: Optional[str] = None, period: str = "day") -> List[tuple]:
+        """各模型按时间段的采样速度 [(时间段, 模型, it/s, 任务数), ...]"""
+        return self.db.get_step_throughput(model, period) if self.db is not None else []
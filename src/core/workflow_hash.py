@@ -0,0 +1,43 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+
+def _is_link(value: Any, workflow: Dict[str, Any]) -> bool:
+    """API 格式中长度为 2 的 [节点ID, 输出序号] 列表表示连线"""
+    return (isinstance(value, list) and len(value) == 2 and isinstance(value[1], int)
+            and not isinstance(value[1], bool) and str(value[0]) in workflow)
+
+
+def workflow_hash(workflow: Dict[str, Any]) -> Optional[str]:
+    """
+    可执行图的规范哈希：每个节点只取 class_type 与 inputs (忽略 _meta 等展示信息)，
+    连线替换为上游节点的哈希，整图哈希为全部节点哈希排序后的摘要。
+    因此与节点编号、键顺序无关；任一参数 (含种子) 或连线不同则哈希不同。无法识别的工作流返回 None
+    """
+    if not isinstance(workflow, dict) or not workflow:
+        return None
+    memo: Dict[str, str] = {}
+    visiting = set()
+
+    def node_hash(node_id: str) -> str:
+        if node_id in memo:
+            return memo[node_id]
+        node = workflow.get(node_id)
+        if not isinstance(node, dict) or node_id in visiting:
+            return f"invalid:{node_id}"
+        visiting.add(node_id)
+        inputs = {}
+        for name, value in (node.get("inputs") or {}).items():
+            inputs[name] = ["@link", node_hash(str(value[0])), value[1]] if _is_link(value, workflow) else value
+        visiting.discard(node_id)
+        payload = json.dumps({"class_type": node.get("class_type"), "inputs": inputs},
+                             sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        memo[node_id] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return memo[node_id]
+
+    try:
+        hashes = sorted(node_hash(str(node_id)) for node_id in workflow)
+    except RecursionError:
+        return None
+    return hashlib.sha256("\n".join(hashes).encode("ascii")).hexdigest()
@@ -0,0 +1,164 @@
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _node_class(node: Dict[str, Any]) -> str:
+    return str(node.get("class_type", "")).lower()
+
+
+def _sort_key(node_id: str) -> int:
+    try:
+        return int(node_id)
+    except Exception:
+        return 10**9
+
+
+def trace_prompt_nodes(wf: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    通过遍历图结构寻找提示词节点 (KSampler -> positive/negative -> CLIPTextEncode)
+    返回: (pos_id, neg_id)
+    """
+    ks_node = None
+    for node in wf.values():
+        if "ksampler" in _node_class(node):
+            ks_node = node
+            break
+    if ks_node is None:
+        return None, None
+
+    def trace_back(current_node_id, visited):
+        if current_node_id in visited:
+            return None
+        visited.add(current_node_id)
+        curr_node = wf.get(str(current_node_id))
+        if not curr_node:
+            return None
+        ctype = _node_class(curr_node)
+        if "cliptextencode" in ctype:
+            return str(current_node_id)
+        # 遇到 ZeroOut/SetArea/Combine/Average 等衍生 Conditioning 的节点停止回溯，
+        # 不追踪到它的来源 (通常是正向提示词节点)
+        if "zeroout" in ctype or "setarea" in ctype or "combine" in ctype or "average" in ctype:
+            return None
+        # 穿透：检查所有连线输入
+        for v in curr_node.get("inputs", {}).values():
+            if isinstance(v, list) and len(v) >= 1:
+                res = trace_back(str(v[0]), visited)
+                if res:
+                    return res
+        return None
+
+    pos_id = neg_id = None
+    inputs = ks_node.get("inputs", {})
+    if isinstance(inputs.get("positive"), list):
+        pos_id = trace_back(str(inputs["positive"][0]), set())
+    if isinstance(inputs.get("negative"), list):
+        neg_id = trace_back(str(inputs["negative"][0]), set())
+    return pos_id, neg_id
+
+
+class WorkflowSlots:
+    """一个图结构的注入点分析结果 (只含节点 ID，不含参数值，可被同结构的图共用)"""
+    def __init__(self, graph: Dict[str, Any]):
+        self.samplers: List[str] = []
+        self.latents: List[str] = []
+        self.checkpoint_loaders: List[str] = []
+        self.unet_loaders: List[str] = []
+        self.vae_loaders: List[str] = []
+        self.clip_loaders: List[str] = []
+        lora_loaders = []
+        for node_id, node in graph.items():
+            ctype = _node_class(node)
+            if "ksampler" in ctype:
+                self.samplers.append(node_id)
+            if "latentimage" in ctype and "empty" in ctype:
+                self.latents.append(node_id)
+            if "checkpointloader" in ctype:
+                self.checkpoint_loaders.append(node_id)
+            if "unetloader" in ctype:
+                self.unet_loaders.append(node_id)
+            if "vaeloader" in ctype:
+                self.vae_loaders.append(node_id)
+            if "cliploader" in ctype:
+                self.clip_loaders.append(node_id)
+            if "loraloader" in ctype:
+                lora_loaders.append(str(node_id))
+        self.lora_loaders: List[str] = sorted(lora_loaders, key=_sort_key)
+        # 需要注入参数的节点 (不含 LoRA)，保持图中原有顺序
+        targets = set(self.samplers + self.latents + self.checkpoint_loaders
+                      + self.unet_loaders + self.vae_loaders + self.clip_loaders)
+        self.injectable: List[str] = [node_id for node_id in graph if node_id in targets]
+
+        # 首个 KSampler 直接连着的 positive/negative 节点
+        self.sampler_prompts: Tuple[Optional[str], Optional[str]] = (None, None)
+        if self.samplers:
+            inputs = graph[self.samplers[0]].get("inputs", {})
+            pos_link, neg_link = inputs.get("positive"), inputs.get("negative")
+            self.sampler_prompts = (
+                str(pos_link[0]) if isinstance(pos_link, list) and pos_link else None,
+                str(neg_link[0]) if isinstance(neg_link, list) and neg_link else None,
+            )
+        # 沿连线回溯到的 CLIPTextEncode 节点
+        self.traced_prompts = trace_prompt_nodes(graph)
+
+
+class WorkflowTemplate:
+    """
+    预编译的工作流模板。
+    - 注入点 (提示词/采样器/Latent/加载器/LoRA 节点) 按图结构哈希缓存，同结构的图只分析一次
+    - render() 只浅拷贝顶层字典，节点与原图共享；写入前用 inputs_for_write() 按需复制单个节点 (写时复制)
+    - 需要任意改写连线的少数路径 (LoRA 链扩容/自动插入) 先 materialize() 原地换成深拷贝
+    原图始终不被修改。
+    """
+    MAX_CACHED = 16
+    _slot_cache: "OrderedDict[str, WorkflowSlots]" = OrderedDict()
+
+    def __init__(self, graph: Dict[str, Any], slots: WorkflowSlots):
+        self.graph = graph
+        self.slots = slots
+
+    @staticmethod
+    def structure_hash(graph: Dict[str, Any]) -> str:
+        """只包含节点 ID、类型和连线，不包含参数值"""
+        shape = []
+        for node_id, node in graph.items():
+            links = sorted(
+                (k, str(v[0]), v[1] if len(v) > 1 else 0)
+                for k, v in node.get("inputs", {}).items()
+                if isinstance(v, list) and v
+            )
+            shape.append((str(node_id), str(node.get("class_type", "")), links))
+        return hashlib.sha1(json.dumps(shape, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def compile(cls, graph: Dict[str, Any]) -> "WorkflowTemplate":
+        key = cls.structure_hash(graph)
+        slots = cls._slot_cache.get(key)
+        if slots is None:
+            slots = WorkflowSlots(graph)
+            cls._slot_cache[key] = slots
+            while len(cls._slot_cache) > cls.MAX_CACHED:
+                cls._slot_cache.popitem(last=False)
+        else:
+            cls._slot_cache.move_to_end(key)
+        return cls(graph, slots)
+
+    def render(self) -> Dict[str, Any]:
+        return dict(self.graph)
+
+    def inputs_for_write(self, workflow: Dict[str, Any], node_id: str) -> Dict[str, Any]:
+        """返回 workflow 中该节点可安全修改的 inputs (仍与模板共享时先复制该节点)"""
+        node = workflow[node_id]
+        if node is self.graph.get(node_id):
+            node = dict(node)
+            node["inputs"] = dict(node.get("inputs", {}))
+            workflow[node_id] = node
+        return node.setdefault("inputs", {})
+
+    def materialize(self, workflow: Dict[str, Any]) -> None:
+        """原地把所有节点替换为深拷贝，之后可任意修改 (inputs_for_write 不会再复制)"""
+        for node_id, node in workflow.items():
+            workflow[node_id] = copy.deepcopy(node)
@@ -70,7 +70,8 @@ class WebServerService(QObject):
             "--port", str(self.port), 
             "--no-scan",
             "--comfy-host", host,
-            "--comfy-port", port
+            "--comfy-port", port,
+            "--thumb-cache-mb", str(settings.value("thumb_cache_max_mb", 1024, type=int))
         ]
         if self.remote_auth_enabled:
             args.extend(["--remote-access-code", self.remote_access_code])
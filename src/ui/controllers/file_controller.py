@@ -10,6 +10,13 @@ class FileController(QObject):
         super().__init__()
         self.main = main_window
         self.loader_thread = None
+        # 新图片的筛选项 (模型/LoRA/分辨率/采样器) 先攒起来，批量生成时合并成一次界面更新
+        self._pending_facets = []
+        self._facet_timer = QTimer(self)
+        self._facet_timer.setSingleShot(True)
+        self._facet_timer.timeout.connect(self._flush_facets)
+        # 已由 OutputLibrary 入库的生成结果，监视器再报告时跳过重复解析
+        self._ingested_paths = set()
 
     def load_folder(self, folder: str) -> None:
         """扫描文件夹并加载现有图片 (异步)"""
@@ -20,6 +27,9 @@ class FileController(QObject):
         self.main.param_panel.clear_info()
         self.main.statusBar().showMessage(f"正在加载: {folder}...")
         self.main._is_scanning = True # 开启扫描锁
+        # 加载完成后会全量刷新，丢弃尚未合并的增量
+        self._pending_facets = []
+        self._facet_timer.stop()
         
         if self.loader_thread and self.loader_thread.isRunning():
             self.loader_thread.stop()
@@ -27,31 +37,24 @@ class FileController(QObject):
             
         recursive = self.main.settings.value("scan_recursive", False, type=bool)
         self.loader_thread = ImageLoaderThread(folder, self.main.db_manager, self.main.thumb_cache, recursive=recursive)
-        self.loader_thread.image_thumb_ready.connect(self._on_loader_image_ready)
-        self.loader_thread.image_found.connect(self._on_loader_image_found)
+        self.loader_thread.images_ready.connect(self._on_loader_images_ready)
         self.loader_thread.finished_loading.connect(self._on_loader_finished)
         self.loader_thread.start()
 
-    def _on_loader_image_ready(self, path, thumb):
-        # 检查是否是第一张图片（即最新的一张）
+    def _on_loader_images_ready(self, items):
+        # 检查是否是第一批（第一张即最新的一张）
         is_first = self.main.thumbnail_list.count() == 0
         
-        # 线程回调：添加带缩略图的图片
-        self.main.thumbnail_list.add_image(path, thumbnail=thumb)
+        # 线程回调：整批添加 (缩略图可能为 None)
+        self.main.thumbnail_list.add_images(items)
         
-        # 如果是第一张，自动选中并显示
-        if is_first:
+        # 如果是第一批，自动选中并显示第一张
+        if is_first and items:
             self.main.thumbnail_list.setCurrentRow(0)
-            self.main.on_image_selected(path)
+            self.main.on_image_selected(items[0][0])
             
-        # 增量更新状态栏进度
-        count = self.main.thumbnail_list.count()
-        if count % 100 == 0:
-            self.main.statusBar().showMessage(f"正在加载: {count} 张图片...")
-
-    def _on_loader_image_found(self, path):
-        # 线程回调：添加单张图片 (无缩略图)
-        self.main.thumbnail_list.add_image(path)
+        # 增量更新状态栏进度 (每批一次)
+        self.main.statusBar().showMessage(f"正在加载: {self.main.thumbnail_list.count()} 张图片...")
         
     def _on_loader_finished(self):
         # 释放扫描锁
@@ -75,6 +78,36 @@ class FileController(QObject):
         if hasattr(self.main, "param_panel"):
             self.main.param_panel.refresh_lora_options()
 
+    def _queue_facets(self, meta) -> None:
+        self._pending_facets.append(self.main.db_manager.image_facets(meta))
+        self._facet_timer.start(400) # 连续到达的新图片合并为一次更新
+
+    def _flush_facets(self) -> None:
+        """把攒下的新图片筛选项合并进模型浏览器和参数面板"""
+        facets, self._pending_facets = self._pending_facets, []
+        if not facets or not self.main.current_folder:
+            return
+        current_model = getattr(self.main, "current_model", "ALL")
+        models, loras = {}, {}
+        resolutions, samplers, schedulers = [], [], []
+        for f in facets:
+            if f['model']:
+                models[f['model']] = models.get(f['model'], 0) + 1
+            # LoRA 列表按当前模型级联过滤，其他模型的图片不计入
+            if current_model in (None, "", "ALL") or f['model'] == current_model:
+                for name in f['loras']:
+                    loras[name] = loras.get(name, 0) + 1
+            if f['resolution'] and f['resolution'] not in resolutions:
+                resolutions.append(f['resolution'])
+            if f['sampler'] and f['sampler'] not in samplers:
+                samplers.append(f['sampler'])
+            if f['scheduler'] and f['scheduler'] not in schedulers:
+                schedulers.append(f['scheduler'])
+
+        self.main.model_explorer.merge_counts(models, loras)
+        if hasattr(self.main, "param_panel"):
+            self.main.param_panel.merge_history(resolutions, samplers, schedulers)
+
     def delete_current_image(self) -> None:
         """删除当前选中的图片"""
         idx = self.main.thumbnail_list.currentIndex()
@@ -99,9 +132,7 @@ class FileController(QObject):
             send2trash(safe_path)
             
             # 从模型中移除
-            self.main.thumbnail_list.image_model.beginRemoveRows(idx.parent(), row, row)
-            self.main.thumbnail_list.image_model.image_data.pop(row)
-            self.main.thumbnail_list.image_model.endRemoveRows()
+            self.main.thumbnail_list.remove_row(row)
             
             self.main.statusBar().showMessage(f"已删除: {os.path.basename(path)}")
             
@@ -114,14 +145,39 @@ class FileController(QObject):
                 next_path = self.main.thumbnail_list.image_model.get_path(next_row)
                 self.main.on_image_selected(next_path)
             else:
-                self.main.viewer.scene.clear()
+                self.main.viewer.clear_view()
                 self.main.param_panel.clear_info()
                 
         except Exception as e:
             QMessageBox.critical(self.main, "删除失败", str(e))
 
+    def mark_ingested(self, path: str) -> None:
+        """该文件已由生成结果库入索引，监视器检测到时跳过"""
+        self._ingested_paths.add(os.path.normpath(path))
+
+    def add_generated_image(self, path: str, meta, thumb) -> None:
+        """ComfyUI 输出已保存并入索引 (元数据与缩略图来自内存)：合并筛选项，位于当前文件夹时直接显示"""
+        norm = os.path.normpath(path)
+        self._ingested_paths.add(norm)
+        if meta:
+            self._queue_facets(meta)
+        folder = self.main.current_folder
+        if not folder:
+            return
+        parent = os.path.dirname(norm)
+        folder = os.path.normpath(folder)
+        recursive = self.main.settings.value("watch_recursive", False, type=bool)
+        if parent != folder and not (recursive and parent.startswith(folder + os.sep)):
+            return
+        self.main.thumbnail_list.add_image(path, index=0, thumbnail=thumb if thumb is not None and not thumb.isNull() else None)
+        self.main.thumbnail_list.setCurrentRow(max(0, self.main.thumbnail_list.image_model.row_of(path)))
+        self.main.on_image_selected(path)
+
     def on_new_image_detected(self, path: str) -> None:
         """Watcher 信号回调：新图片生成"""
+        if os.path.normpath(path) in self._ingested_paths:
+            self._ingested_paths.discard(os.path.normpath(path))
+            return
         print(f"[新图片] 检测到: {path}")
         self.main.statusBar().showMessage(f"新图片 detected: {os.path.basename(path)}")
         
@@ -130,6 +186,8 @@ class FileController(QObject):
 
     def _load_new_image_with_retry(self, path: str, retries: int = 3) -> None:
         """延迟重试加载新图片，处理文件未完全写入的情况"""
+        if os.path.normpath(path) in self._ingested_paths:
+            return   # 等待期间已由生成结果库入索引
         try:
             from PyQt6.QtGui import QImage
             img = QImage(path)
@@ -141,18 +199,19 @@ class FileController(QObject):
                 # print(f"[新图片] 缩略图生成成功: {thumb.size()}")
                 # 立即将图片存入数据库，防止重置或搜索时由于未入库而消失
                 from src.core.metadata import MetadataParser
+                from src.core.placeholder import placeholder_from_qimage
+                placeholder = placeholder_from_qimage(thumb)
                 meta = MetadataParser.parse_image(path)
                 if meta:
+                    # 与文件夹扫描一致写入占位图，搜索结果滚动到此行时无需等缩略图
+                    meta['placeholder'] = placeholder
                     self.main.db_manager.add_image(path, meta)
+                    # 新图片的 Model/LoRA、分辨率/采样器增量并入界面 (防抖合并，不重新聚合数据库)
+                    self._queue_facets(meta)
                 
-                self.main.thumbnail_list.add_image(path, index=0, thumbnail=thumb)
+                self.main.thumbnail_list.add_image(path, index=0, thumbnail=thumb, placeholder=placeholder)
                 self.main.thumbnail_list.setCurrentRow(0) # 明确选中第一张图片，确保高亮同步
                 
-                # 刷新模型浏览器，确保新生成图片使用的 Model/LoRA 逻辑立即可用
-                self.refresh_model_explorer()
-                # 刷新历史参数，确保新分辨率/采样器立即可见
-                self.main.refresh_historical_params()
-                
                 # 自动查看最新的
                 self.main.on_image_selected(path)
             else:
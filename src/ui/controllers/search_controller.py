@@ -1,6 +1,5 @@
 from PyQt6.QtCore import QObject, QTimer
 from PyQt6.QtWidgets import QMainWindow
-from typing import Optional
 
 class SearchController(QObject):
     """
@@ -14,6 +13,7 @@ class SearchController(QObject):
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
         self.search_timer.timeout.connect(self.perform_search)
+        self._model_bound = False
 
     def on_search_changed(self, text: str) -> None:
         """搜索框文字变化回调"""
@@ -58,8 +58,9 @@ class SearchController(QObject):
         self.perform_search()
 
     def perform_search(self) -> None:
-        """执行搜索"""
-        # 生成新的搜索 ID
+        """执行搜索 (后台线程分页查询，不阻塞 UI)"""
+        from src.core.loader import SearchQueryThread
+        # 生成新的搜索 ID (同时作为旧查询的取消令牌)
         import uuid
         self.current_search_id = str(uuid.uuid4())
         
@@ -70,80 +71,129 @@ class SearchController(QObject):
         # UI 反馈
         self.main.statusBar().showMessage(f"正在搜索: {keyword} [Model: {model}, LoRA: {lora}]...")
         
-        # 数据库查询
+        # 中断仍在执行的旧查询 (SQLite 层面中断，不等待)
+        old = getattr(self, 'query_thread', None)
+        if old is not None:
+            old.cancel()
+            self._retire_thread(old)
+        
         # 注意：这里耦合了 main_window 的 db_manager，实际应当注入 service
-        results = self.main.db_manager.search_images(
+        self.query_thread = SearchQueryThread(
+            self.main.db_manager,
+            self.current_search_id,
             keyword=keyword,
             folder_path=self.main.current_folder,
             model=model,
             lora=lora,
             order_by=self.main.current_sort_by
         )
-        
-        self.main.statusBar().showMessage(f"搜索完成: 找到 {len(results)} 张图片")
-        
-        # 更新缩略图列表 (传入当前 search_id)
-        self.load_thumbnails_for_list(results, self.current_search_id)
+        self.query_thread.page_ready.connect(self._on_search_page)
+        self.query_thread.search_finished.connect(self._on_search_finished)
+        self.query_thread.start()
+
+    def _on_search_page(self, search_id: str, paths: list, is_first: bool) -> None:
+        """搜索结果分页到达：首页直接重置列表，后续页追加"""
+        if search_id != self.current_search_id:
+            return
+        if is_first:
+            # 更新缩略图列表 (传入当前 search_id)
+            self.load_thumbnails_for_list(paths, search_id)
+        else:
+            self.main.thumbnail_list.append_images(paths)
+        self.main.statusBar().showMessage(f"正在搜索: 已找到 {self.main.thumbnail_list.count()} 张图片...")
+
+    def _on_search_finished(self, search_id: str, total: int) -> None:
+        if search_id != self.current_search_id:
+            return
+        self.main.statusBar().showMessage(f"搜索完成: 找到 {total} 张图片")
+
+    def _retire_thread(self, thread) -> None:
+        """被取代的线程不再等待，只保留引用直到其自行结束，避免 QThread 被提前回收"""
+        if not thread.isRunning():
+            return
+        if not hasattr(self, '_retired_threads'):
+            self._retired_threads = set()
+        self._retired_threads.add(thread)
+        thread.finished.connect(lambda t=thread: self._retired_threads.discard(t))
+
+    def shutdown(self) -> None:
+        """窗口关闭时停止所有后台线程"""
+        threads = list(getattr(self, '_retired_threads', ()))
+        for name in ('query_thread', 'search_loader'):
+            thread = getattr(self, name, None)
+            if thread is not None:
+                threads.append(thread)
+        for thread in threads:
+            if hasattr(thread, 'cancel'):
+                thread.cancel()
+            else:
+                thread.stop()
+        for thread in threads:
+            thread.wait()
 
     def _load_search_results(self, paths: list[str], search_id: str) -> None:
         """加载搜索结果"""
         from src.core.loader import SearchThumbnailLoader
         
-        # 停止旧的 loader (虽然有了 id 校验，停止也是好的)
+        # 停止旧的 loader，不阻塞等待 (有 id 校验，旧线程剩余的回调会被丢弃)
         if hasattr(self, 'search_loader') and self.search_loader.isRunning():
             self.search_loader.stop()
-            self.search_loader.wait()
-            
-        self.missing_files_detected = False # 重置标记
-        
+            self._retire_thread(self.search_loader)
+
         # 使用 Controller 自己的 loader 引用
         self.search_loader = SearchThumbnailLoader(paths, self.main.thumb_cache, search_id=search_id)
-        self.search_loader.thumbnail_ready.connect(self._on_search_thumb_ready)
+        self.search_loader.thumbnails_ready.connect(self._on_search_thumbs_ready)
         self.search_loader.file_missing.connect(self._on_file_missing)
-        self.search_loader.finished.connect(self._on_loader_finished)
-        self.search_loader.start()
+        if paths:
+            self.search_loader.start()
+
+    def _on_thumbnails_requested(self, paths: list) -> None:
+        """虚拟列表中可见但缺少缩略图的行：交给后台线程按需加载"""
+        loader = getattr(self, 'search_loader', None)
+        if loader is None or loader.search_id != self.current_search_id:
+            self._load_search_results(paths, self.current_search_id)
+            return
+        if loader.extend(paths):
+            loader.wait() # 线程刚跑完现有任务，等它彻底退出再重启
+            loader.start()
 
     def _on_file_missing(self, path: str) -> None:
-        """处理文件丢失：从数据库移除僵尸记录"""
+        """处理文件丢失：从数据库移除僵尸记录，并原地删除对应行 (不重新搜索，滚动位置保持不变)"""
         print(f"[Search] Cleaning up missing file: {path}")
-        self.missing_files_detected = True # 标记有文件被清理
         try:
             self.main.db_manager.delete_images([path])
         except Exception as e:
             print(f"[Search] Cleanup error: {e}")
-            
-    def _on_loader_finished(self):
-        """加载完成后，如果有清理过文件，则自动刷新"""
-        if self.missing_files_detected:
-            print("[Search] Missing files detected during load, auto-refreshing...")
-            # 为了避免无限循环（虽然通常不会），可以重置标记
-            self.missing_files_detected = False
-            # 稍微延迟一下，让 UI 喘口气？或者直接调
-            # 直接调用 perform_search 会再次走一遍，这次 DB 里已经没有那些文件了
-            self.perform_search()
-
-    def _on_search_thumb_ready(self, index: int, path: str, thumb, search_id: str) -> None:
-        """搜索结果缩略图准备就绪"""
+        model = self.main.thumbnail_list.image_model
+        row = model.row_of(path)
+        if row >= 0:
+            model.remove_row(row)
+
+    def _on_search_thumbs_ready(self, items: list, search_id: str) -> None:
+        """搜索结果缩略图准备就绪 (一批)"""
         # 关键校验：如果 ID 不匹配，说明这是过期的搜索结果，直接丢弃
         if search_id != self.current_search_id:
             return
             
-        # 注意：如果在此期间因为 _on_file_missing 触发了 auto-refresh，
-        # 新的 perform_search 会生成新的 search_id，
-        # 所以旧的 loader 即使还在发信号也会被这里的 id check 拦截。
-        # 完美。
-            
         # 再次确认路径是否匹配（双重保险，防止 List 和 Loader 错位）
         # 实际上我们依赖 SearchThumbnailLoader 是按顺序发送的，且 perform_search 先填充了 list
         # 如果 id 匹配，说明 list 就是我们要的那个 list
-        self.main.thumbnail_list.update_image_icon(index, thumb) 
+        # 按路径更新 (O(1))，即使期间删除过行导致行号偏移也不会错位
+        self.main.thumbnail_list.image_model.update_thumbnails(items)
+
+    def bind_model(self) -> None:
+        """列表控件晚于控制器创建，由 MainWindow 创建列表后调用以挂接模型信号"""
+        if self._model_bound:
+            return
+        model = self.main.thumbnail_list.image_model
+        # 只为真正绘制到的行加载缩略图；占位图随分页读取
+        model.thumbnails_requested.connect(self._on_thumbnails_requested)
+        model.placeholder_source = self.main.db_manager.get_placeholders
+        self._model_bound = True
 
     def load_thumbnails_for_list(self, paths: list[str], search_id: str) -> None:
-        # 实际上 perform_search 应该先添加 items
-        self.main.thumbnail_list.clear_list()
-        for path in paths:
-             # 先添加占位
-             self.main.thumbnail_list.add_image(path)
-             
-        # 然后启动 loader
-        self._load_search_results(paths, search_id)
+        self.bind_model()
+        # 先准备好空的 loader，再一次性重置虚拟列表；
+        # 视图绘制到某行时 (_on_thumbnails_requested) 才把对应路径交给 loader
+        self._load_search_results([], search_id)
+        self.main.thumbnail_list.set_images(paths)
@@ -2,7 +2,7 @@ import os
 from typing import Any, Dict, List, Optional
 
 from PyQt6.QtCore import QEvent, QSize, Qt
-from PyQt6.QtGui import QIcon, QImage, QPixmap
+from PyQt6.QtGui import QIcon, QImageReader, QPixmap
 from PyQt6.QtWidgets import (
     QAbstractItemView,
     QDialog,
@@ -17,13 +17,18 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from src.core.loader import SearchThumbnailLoader
 from src.ui.widgets.comparison_view import ComparisonView
 
 
 class ComparePopupDialog(QDialog):
-    """统一对比弹窗：左侧网格，右侧双栏对比。"""
+    """统一对比弹窗：左侧网格，右侧双栏对比。
+    图标走共享缩略图缓存在后台加载，宽高比只读文件头，会话更新时只刷新变化的那一项。
+    """
 
-    def __init__(self, parent=None):
+    MAX_ICONS = 512
+
+    def __init__(self, parent=None, thumb_cache=None):
         super().__init__(parent)
         self.setWindowTitle("对比视图")
         self.resize(1240, 780)
@@ -35,6 +40,14 @@ class ComparePopupDialog(QDialog):
         self._active_pair_variant_ids: List[str] = []
         self._preferred_aspect_ratio: Optional[float] = None
 
+        self._thumb_cache = thumb_cache
+        self._icon_loader: Optional[SearchThumbnailLoader] = None
+        self._icons: Dict[str, QIcon] = {}
+        self._aspect_ratios: Dict[str, float] = {}
+        placeholder = QPixmap(132, 132)
+        placeholder.fill(Qt.GlobalColor.lightGray)
+        self._placeholder_icon = QIcon(placeholder)
+
         self._build_ui()
 
     def _build_ui(self) -> None:
@@ -189,7 +202,9 @@ class ComparePopupDialog(QDialog):
 
         if label is not None:
             record["label"] = label
+        icon_stale = "icon_path" not in record
         if path is not None:
+            icon_stale = icon_stale or path != record.get("path")
             record["path"] = path
         if meta is not None:
             record["meta"] = dict(meta)
@@ -199,11 +214,21 @@ class ComparePopupDialog(QDialog):
         display_label = self._display_variant_text(record, variant_id)
         list_item.setText(f"{self._status_prefix(status)} {display_label}")
         list_item.setToolTip(str(record.get("path") or display_label))
-        list_item.setIcon(self._icon_for_record(record))
+        if icon_stale:
+            self._request_icon(record)
 
         self._refresh_progress_from_items()
         self._auto_preview_ready_items()
 
+    def show_live_preview(self, variant_id: str, image) -> None:
+        """生成中的变体以实时预览帧作为图标，出图后由正式缩略图替换"""
+        record = self._items_by_variant.get(str(variant_id or ""))
+        if record is None or record.get("status") == "done" or image.isNull():
+            return
+        icon_size = self.grid_list.iconSize()
+        thumb = image.scaled(icon_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
+        record["item"].setIcon(QIcon(QPixmap.fromImage(thumb)))
+
     def open_with_paths(self, paths: List[str], title: str = "手动对比") -> None:
         self.set_session(
             {
@@ -242,28 +267,47 @@ class ComparePopupDialog(QDialog):
             return "[失败]"
         return "[排队]"
 
-    def _icon_for_record(self, record: Dict[str, Any]) -> QIcon:
+    def _request_icon(self, record: Dict[str, Any]) -> None:
+        """先显示已缓存的图标或占位图，缺失的交给后台线程从缩略图缓存加载"""
         path = str(record.get("path") or "")
-        if path and os.path.exists(path):
-            img = QImage(path)
-            if not img.isNull():
-                pix = QPixmap.fromImage(
-                    img.scaled(
-                        132,
-                        132,
-                        Qt.AspectRatioMode.KeepAspectRatio,
-                        Qt.TransformationMode.SmoothTransformation,
-                    )
-                )
-                return QIcon(pix)
-
-        placeholder = QPixmap(132, 132)
-        placeholder.fill(Qt.GlobalColor.lightGray)
-        return QIcon(placeholder)
+        record["icon_path"] = path
+        icon = self._icons.get(path)
+        record["item"].setIcon(icon or self._placeholder_icon)
+        if icon is None and path and os.path.exists(path):
+            self._queue_icon_paths([path])
+
+    def _queue_icon_paths(self, paths: List[str]) -> None:
+        if self._icon_loader is None:
+            self._icon_loader = SearchThumbnailLoader(paths, self._thumb_cache, search_id="compare")
+            self._icon_loader.thumbnails_ready.connect(self._on_icons_ready)
+            self._icon_loader.start()
+        elif self._icon_loader.extend(paths):
+            self._icon_loader.wait()
+            self._icon_loader.start()
+
+    def _on_icons_ready(self, items: list, search_id: str) -> None:
+        if len(self._icons) + len(items) > self.MAX_ICONS:
+            # 只保留当前会话仍在使用的图标
+            live = {rec.get("icon_path") for rec in self._items_by_variant.values()}
+            self._icons = {p: i for p, i in self._icons.items() if p in live}
+        for path, thumb in items:
+            self._icons[path] = QIcon(QPixmap.fromImage(thumb))
+        ready = {path for path, _ in items}
+        for record in self._items_by_variant.values():
+            if record.get("icon_path") in ready:
+                record["item"].setIcon(self._icons[record["icon_path"]])
 
     def _reload_all_icons(self) -> None:
+        self._icons.clear()
+        self._aspect_ratios.clear()
         for record in self._items_by_variant.values():
-            record["item"].setIcon(self._icon_for_record(record))
+            self._request_icon(record)
+
+    def shutdown(self) -> None:
+        """停止图标加载线程 (主窗口关闭时调用)"""
+        if self._icon_loader is not None:
+            self._icon_loader.stop()
+            self._icon_loader.wait(2000)
 
     def _refresh_progress_from_items(self) -> None:
         expected = max(0, len(self._items_by_variant))
@@ -346,12 +390,20 @@ class ComparePopupDialog(QDialog):
         return str(rec.get("path") or "")
 
     def _path_aspect_ratio(self, path: str) -> Optional[float]:
-        if not path or not os.path.exists(path):
+        if not path:
+            return None
+        ratio = self._aspect_ratios.get(path)
+        if ratio is not None:
+            return ratio
+        if not os.path.exists(path):
             return None
-        image = QImage(path)
-        if image.isNull() or image.height() <= 0:
+        # 只解析文件头，不解码像素
+        size = QImageReader(path).size()
+        if not size.isValid() or size.height() <= 0:
             return None
-        return float(image.width()) / float(image.height())
+        ratio = float(size.width()) / float(size.height())
+        self._aspect_ratios[path] = ratio
+        return ratio
 
     def _load_pair_by_variant_ids(self, pair_ids: List[str], silent: bool = False) -> None:
         if len(pair_ids) < 2:
@@ -2,6 +2,7 @@ from PyQt6.QtCore import Qt, QSize, pyqtSignal, QTimer
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListView, 
                              QPushButton, QLabel, QFrame, QWidget, QLineEdit, QAbstractItemView, QMessageBox)
+from src.ui.widgets.thumbnail_list import ThumbnailDelegate
 
 class ImageGalleryDialog(QDialog):
     """
@@ -64,7 +65,9 @@ class ImageGalleryDialog(QDialog):
         self.list_view.setWordWrap(True)
         self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         
-        # 复用主界面的 Model
+        # 复用主界面的 Model 和绘制委托
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setItemDelegate(ThumbnailDelegate(self.list_view))
         self.list_view.setModel(self.image_model)
         
         # 样式 - 保持与主界面一致
@@ -94,7 +97,7 @@ class ImageGalleryDialog(QDialog):
         layout.addWidget(self.list_view)
         
         # 底部信息
-        self.info_label = QLabel(f"共 {self.image_model.rowCount()} 张图片")
+        self.info_label = QLabel(f"共 {self.image_model.total_count()} 张图片")
         self.info_label.setStyleSheet("color: palette(mid);")
         layout.addWidget(self.info_label)
 
@@ -1,3 +1,4 @@
+import bisect
 import json
 import os
 import re
@@ -10,7 +11,6 @@ from PyQt6.QtWidgets import (
     QComboBox,
     QDialog,
     QFrame,
-    QGridLayout,
     QHBoxLayout,
     QLabel,
     QLineEdit,
@@ -166,7 +166,10 @@ class LoraCard(QFrame):
             self.variant_combo.hide()
             lbl = QLabel(single.filename)
             lbl.setStyleSheet("color: palette(mid);")
-            lbl.setWordWrap(True)
+            lbl.setToolTip(single.filename)
+            # 单行省略显示，保证收起状态的卡片高度一致 (虚拟网格按行高排布)
+            lbl.setFixedHeight(self.variant_combo.sizeHint().height())
+            lbl.setText(lbl.fontMetrics().elidedText(single.filename, Qt.TextElideMode.ElideMiddle, 200))
             layout.addWidget(lbl)
 
         actions_layout = QHBoxLayout()
@@ -209,6 +212,7 @@ class LoraCard(QFrame):
         editor_layout.addWidget(self.auto_prompt_check)
 
         layout.addWidget(self.editor_frame)
+        layout.addStretch()
         self.editor_frame.setVisible(False)
 
         self.note_edit.textChanged.connect(self._emit_profile_changed)
@@ -313,6 +317,163 @@ class LoraCard(QFrame):
             self.selected.emit(full_path, self._collect_profile_from_editor())
 
 
+class LoraSearchIndex:
+    """
+    LoRA 搜索索引：为每个分组预先拼好小写的 "名称 + 文件名 + 备注" 文本。
+    搜索时每组只做一次子串查找，不再逐个版本读取备注；备注修改时只重建对应分组的文本。
+    """
+    def __init__(self, groups, profile_lookup):
+        self._profile_lookup = profile_lookup
+        self._texts = {}
+        self._groups_by_key = defaultdict(list)
+        for group in groups:
+            for v in group.variants:
+                self._groups_by_key[v.normalized_key].append(group)
+            self._texts[group] = self._build_text(group)
+
+    def _build_text(self, group: LoraGroup):
+        parts = [group.base_name]
+        for v in group.variants:
+            parts.append(v.filename)
+            note = str(self._profile_lookup(v.normalized_key).get("note", "") or "")
+            if note:
+                parts.append(note)
+        return "\n".join(parts).lower()
+
+    def update_key(self, key: str):
+        for group in self._groups_by_key.get(normalize_lora_key(key), []):
+            self._texts[group] = self._build_text(group)
+
+    def matches(self, group: LoraGroup, query: str):
+        """query 需已转为小写并去除首尾空白"""
+        if not query:
+            return True
+        text = self._texts.get(group)
+        if text is None:
+            text = self._texts[group] = self._build_text(group)
+        return query in text
+
+
+class LoraCardGrid(QScrollArea):
+    """
+    虚拟化的 LoRA 卡片网格：只为视口内 (上下各多留一行) 的分组创建 LoraCard，
+    滚动时销毁移出视口的卡片、创建新进入的卡片。
+    行高取收起状态卡片的高度；展开了编辑区的卡片记录其实际高度，所在行随之变高。
+    """
+    CARD_MIN_WIDTH = 260
+    CARD_MAX_WIDTH = 480
+    SPACING = 15
+    MARGIN = 15
+    OVERSCAN_ROWS = 1
+
+    def __init__(self, card_factory, parent=None):
+        super().__init__(parent)
+        self._card_factory = card_factory
+        self._groups = []
+        self._cards = {}       # index -> LoraCard
+        self._expanded = {}    # group -> 展开后的卡片高度
+        self._row_tops = []
+        self._cols = 1
+        self._card_width = self.CARD_MIN_WIDTH
+        self._row_height = 0
+
+        self.setWidgetResizable(False)
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self._container = QWidget()
+        self.setWidget(self._container)
+        self.verticalScrollBar().valueChanged.connect(self._update_visible)
+
+    def set_groups(self, groups, keep_scroll=False):
+        old_value = self.verticalScrollBar().value()
+        for index in list(self._cards):
+            self._drop_card(index)
+        self._groups = list(groups)
+        self._relayout()
+        self.verticalScrollBar().setValue(old_value if keep_scroll else 0)
+        self._update_visible()
+
+    def card_count(self):
+        return len(self._cards)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._relayout()
+
+    def _create_card(self, index):
+        group = self._groups[index]
+        card = self._card_factory(group)
+        card.setParent(self._container)
+        if group in self._expanded:
+            card.edit_btn.setChecked(True)
+        card.edit_btn.toggled.connect(lambda checked, g=group, c=card: self._on_card_toggled(g, c, checked))
+        card.show()
+        self._cards[index] = card
+        return card
+
+    def _drop_card(self, index):
+        card = self._cards.pop(index, None)
+        if card is not None:
+            card.hide()
+            card.deleteLater()
+
+    def _ensure_row_height(self):
+        if self._row_height or not self._groups:
+            return
+        # 用第一张卡片测量收起状态的高度 (顶部可见，卡片留着复用)
+        card = self._cards.get(0) or self._create_card(0)
+        self._row_height = card.sizeHint().height()
+
+    def _on_card_toggled(self, group, card, checked):
+        if checked:
+            card.layout().activate()
+            self._expanded[group] = max(self._row_height, card.sizeHint().height())
+        else:
+            self._expanded.pop(group, None)
+        self._relayout()
+
+    def _relayout(self):
+        width = self.viewport().width()
+        avail = max(self.CARD_MIN_WIDTH, width - 2 * self.MARGIN)
+        self._cols = max(1, (avail + self.SPACING) // (self.CARD_MIN_WIDTH + self.SPACING))
+        self._card_width = min(self.CARD_MAX_WIDTH, (avail - self.SPACING * (self._cols - 1)) // self._cols)
+        self._ensure_row_height()
+
+        tops = []
+        y = self.MARGIN
+        cols = self._cols
+        for start in range(0, len(self._groups), cols):
+            tops.append(y)
+            height = self._row_height
+            if self._expanded:
+                for group in self._groups[start:start + cols]:
+                    height = max(height, self._expanded.get(group, 0))
+            y += height + self.SPACING
+        self._row_tops = tops
+        total = y - self.SPACING + self.MARGIN if tops else 0
+        self._container.resize(width, total)
+        self._update_visible()
+
+    def _update_visible(self, *_):
+        if not self._row_tops:
+            return
+        top = self.verticalScrollBar().value()
+        bottom = top + self.viewport().height()
+        rows = len(self._row_tops)
+        first_row = max(0, bisect.bisect_right(self._row_tops, top) - 1 - self.OVERSCAN_ROWS)
+        last_row = min(rows - 1, bisect.bisect_right(self._row_tops, bottom) - 1 + self.OVERSCAN_ROWS)
+        wanted = range(first_row * self._cols, min(len(self._groups), (last_row + 1) * self._cols))
+
+        for index in [i for i in self._cards if i not in wanted]:
+            self._drop_card(index)
+        for index in wanted:
+            card = self._cards.get(index) or self._create_card(index)
+            row, col = divmod(index, self._cols)
+            x = self.MARGIN + col * (self._card_width + self.SPACING)
+            height = self._expanded.get(self._groups[index], self._row_height)
+            card.setGeometry(x, self._row_tops[row], self._card_width, height)
+
+
 class LoraSelectionDialog(QDialog):
     PROFILE_SETTINGS_KEY = "lora_profiles_v1"
 
@@ -370,6 +531,10 @@ class LoraSelectionDialog(QDialog):
         self.lora_profiles[norm_key] = data
         self._profile_save_timer.start(300)
 
+    def _on_profile_changed(self, key: str, profile: dict):
+        self._queue_profile_update(key, profile)
+        self.search_index.update_key(key)
+
     def _flush_profiles(self):
         try:
             self.settings.setValue(self.PROFILE_SETTINGS_KEY, json.dumps(self.lora_profiles, ensure_ascii=False))
@@ -402,6 +567,18 @@ class LoraSelectionDialog(QDialog):
             group_list.sort(key=lambda x: x.base_name.lower())
             self.processed_data[folder] = group_list
 
+        # "全部模型" 按名称去重，打开时算一次
+        seen = set()
+        self.all_groups = []
+        for groups in self.processed_data.values():
+            for group in groups:
+                if group.base_name not in seen:
+                    self.all_groups.append(group)
+                    seen.add(group.base_name)
+        self.search_index = LoraSearchIndex(
+            [g for groups in self.processed_data.values() for g in groups], self._get_profile
+        )
+
     def _init_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
@@ -438,49 +615,15 @@ class LoraSelectionDialog(QDialog):
         right_layout = QVBoxLayout(right_panel)
         right_layout.setContentsMargins(0, 0, 0, 0)
 
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setFrameShape(QFrame.Shape.NoFrame)
-        self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-
-        self.flow_container = QWidget()
-        self.content_layout = QGridLayout(self.flow_container)
-        self.content_layout.setContentsMargins(15, 15, 15, 15)
-        self.content_layout.setSpacing(15)
-        self.content_layout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-        self.scroll.setWidget(self.flow_container)
+        self.scroll = LoraCardGrid(self._create_card)
         right_layout.addWidget(self.scroll)
 
         splitter.addWidget(right_panel)
         splitter.setStretchFactor(1, 1)
         layout.addWidget(splitter)
 
-        self.scroll.viewport().installEventFilter(self)
         self._populate_tree()
 
-    def eventFilter(self, source, event):
-        if source == self.scroll.viewport() and event.type() == event.Type.Resize:
-            self._update_grid_layout()
-        return super().eventFilter(source, event)
-
-    def _update_grid_layout(self):
-        width = self.scroll.viewport().width()
-        if width < 100:
-            return
-        widgets = []
-        for i in range(self.content_layout.count()):
-            item = self.content_layout.itemAt(i)
-            if item and item.widget():
-                widgets.append(item.widget())
-        if not widgets:
-            return
-        card_min_width = 260
-        spacing = self.content_layout.spacing()
-        margin = self.content_layout.contentsMargins().left() + self.content_layout.contentsMargins().right()
-        cols = max(1, (width - margin + spacing) // (card_min_width + spacing))
-        for i, wid in enumerate(widgets):
-            self.content_layout.addWidget(wid, i // cols, i % cols)
-
     def _populate_tree(self):
         self.tree.clear()
         root_icon = self.style().standardIcon(self.style().StandardPixmap.SP_DirIcon)
@@ -502,53 +645,31 @@ class LoraSelectionDialog(QDialog):
         self.tree.setCurrentItem(all_item)
 
     def _group_matches_filter(self, group: LoraGroup, filter_text: str):
-        if not filter_text:
-            return True
-        q = filter_text.lower().strip()
-        if q in group.base_name.lower():
-            return True
-        for v in group.variants:
-            if q in v.filename.lower():
-                return True
-            note = str(self._get_profile(v.normalized_key).get("note", "") or "").lower()
-            if note and q in note:
-                return True
-        return False
+        return self.search_index.matches(group, (filter_text or "").lower().strip())
+
+    def _create_card(self, group: LoraGroup):
+        card = LoraCard(group, self._get_profile)
+        card.selected.connect(self._on_lora_selected)
+        card.pinned_changed.connect(lambda _, g=group: self._on_pin_changed(g))
+        card.profile_changed.connect(self._on_profile_changed)
+        return card
 
     def _on_folder_selected(self, current, _previous):
         if not current:
             return
         self._display_groups(current.data(0, Qt.ItemDataRole.UserRole))
 
-    def _display_groups(self, folder, filter_text=""):
-        while self.content_layout.count():
-            child = self.content_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-
+    def _display_groups(self, folder, filter_text="", keep_scroll=False):
         if folder == "__all__":
-            seen = set()
-            target_groups = []
-            for groups in self.processed_data.values():
-                for group in groups:
-                    if group.base_name not in seen:
-                        target_groups.append(group)
-                        seen.add(group.base_name)
+            target_groups = self.all_groups
         else:
             target_groups = self.processed_data.get(folder, [])
 
-        filtered_groups = [g for g in target_groups if self._group_matches_filter(g, filter_text)]
+        query = (filter_text or "").lower().strip()
+        filtered_groups = [g for g in target_groups if self.search_index.matches(g, query)]
         filtered_groups.sort(key=lambda x: (not x.is_pinned, x.base_name.lower()))
-
-        for group in filtered_groups:
-            card = LoraCard(group, self._get_profile)
-            card.selected.connect(self._on_lora_selected)
-            card.pinned_changed.connect(lambda _, g=group: self._on_pin_changed(g))
-            card.profile_changed.connect(self._queue_profile_update)
-            self.content_layout.addWidget(card)
-
-        self._update_grid_layout()
-        self.flow_container.adjustSize()
+        # 只有视口内的卡片会被创建，其余分组滚动到时再生成
+        self.scroll.set_groups(filtered_groups, keep_scroll=keep_scroll)
 
     def _on_pin_changed(self, group):
         if group.is_pinned:
@@ -562,10 +683,7 @@ class LoraSelectionDialog(QDialog):
 
         current_item = self.tree.currentItem()
         current_folder = current_item.data(0, Qt.ItemDataRole.UserRole) if current_item else "__all__"
-        vbar = self.scroll.verticalScrollBar()
-        old_val = vbar.value()
-        self._display_groups(current_folder, self.search_input.text())
-        QTimer.singleShot(10, lambda: vbar.setValue(old_val))
+        self._display_groups(current_folder, self.search_input.text(), keep_scroll=True)
 
     def _on_search(self, text):
         current_item = self.tree.currentItem()
@@ -579,5 +697,5 @@ class LoraSelectionDialog(QDialog):
             "prompt": str(profile.get("prompt", "") or "").strip(),
             "auto_use_prompt": bool(profile.get("auto_use_prompt", True)),
         }
-        self._queue_profile_update(normalize_lora_key(full_path), self.selected_lora_profile)
+        self._on_profile_changed(normalize_lora_key(full_path), self.selected_lora_profile)
         self.accept()
@@ -2,7 +2,7 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QSplitter, QFileDialog, QToolBar, QMessageBox, 
                              QStatusBar, QLineEdit, QLabel, QTabWidget, QStackedWidget, 
-                             QFrame, QComboBox, QPushButton, QAbstractSpinBox, QTextEdit, QApplication,
+                             QFrame, QComboBox, QPushButton, QAbstractSpinBox, QTextEdit, QPlainTextEdit, QApplication,
                              QToolButton, QMenu, QStyle,
                              QProgressBar, QSizePolicy)
 from PyQt6.QtCore import Qt, QSize, QSettings, QTimer, QThread, QProcess, pyqtSignal, QUrl
@@ -11,6 +11,7 @@ import time
 import os
 import webbrowser
 import json
+from collections import deque
 from dataclasses import dataclass, field
 from typing import Dict, Any, List
 
@@ -22,9 +23,19 @@ from src.ui.widgets.param_panel import ParameterPanel
 from src.ui.widgets.model_explorer import ModelExplorer
 from src.ui.widgets.comparison_view import ComparisonView
 from src.core.comfy_client import ComfyClient
+from src.core.comfy_pool import ComfyBackendPool, parse_backend_addresses
+from src.core.generation_scheduler import GenerationScheduler
 from src.core.comfy_launcher import ComfyLauncher
 from src.ui.settings_dialog import SettingsDialog
 from src.core.cache import ThumbnailCache
+from src.core.cache_manager import ThumbnailCacheManager
+from src.core.metadata_cache import MetadataCache
+from src.core.output_library import OutputIngestor, OutputLibrary
+from src.core.loader import MetadataLoaderThread
+from src.core.image_decoder import ImageDecoder
+from src.core.coalescer import LatestValueCoalescer
+from src.core.step_timing import StepTimingTracker
+from src.core.workflow_hash import workflow_hash
 from src.ui.controllers.file_controller import FileController
 from src.ui.controllers.search_controller import SearchController
 from src.ui.dialogs.image_gallery_dialog import ImageGalleryDialog
@@ -47,6 +58,7 @@ class CompareSession:
 class MainWindow(QMainWindow):
     COMPARE_LAST_SESSION_KEY = "compare_last_session_v1"
     COMFY_PROGRESS_SNAPSHOT_KEY = "comfy/progress_snapshot_v1"
+    LOG_MAX_LINES = 2000  # 生成日志窗口保留的最大行数
 
     def __init__(self):
         super().__init__()
@@ -76,6 +88,26 @@ class MainWindow(QMainWindow):
         # 初始化数据库与缓存
         self.db_manager = DatabaseManager()
         self.thumb_cache = ThumbnailCache()
+        # 缩略图缓存预算与孤儿回收 (后台低频运行)
+        self.thumb_cache_manager = ThumbnailCacheManager(
+            self.thumb_cache,
+            self.db_manager,
+            max_mb=self.settings.value("thumb_cache_max_mb", 1024, type=int),
+        )
+        self.thumb_cache_manager.start_background_sweep()
+        # 元数据缓存：选中图片时优先读缓存，缺失时交给后台线程解析
+        self.metadata_cache = MetadataCache(self.db_manager)
+        self.metadata_loader = MetadataLoaderThread(self.metadata_cache)
+        self.metadata_loader.metadata_ready.connect(self._on_metadata_ready)
+        self.metadata_loader.start()
+        # ComfyUI 输出经 /view 取回后保存到本地库目录并直接入索引 (后台线程执行)
+        self.output_library = OutputLibrary(self.db_manager, self.thumb_cache,
+                                            self.settings.value("output_library_dir", "", type=str),
+                                            self.settings.value("comfy_root", "", type=str))
+        self.output_ingestor = OutputIngestor(self.output_library, self)
+        self.output_ingestor.ingested.connect(self._on_output_ingested)
+        # 看图器全图解码缓存预算
+        ImageDecoder.shared().cache.max_bytes = self.settings.value("viewer_cache_mb", 512, type=int) * 1024 * 1024
         
         # 核心组件初始化
         self.watcher = FileWatcher()
@@ -123,11 +155,33 @@ class MainWindow(QMainWindow):
         
         # 初始化 ComfyUI 客户端
         self.comfy_client = ComfyClient(self.settings.value("comfy_address", "127.0.0.1:8188"))
-        self.comfy_client.status_changed.connect(lambda msg: self.statusBar().showMessage(f"[Comfy] {msg}", 3000))
-        self.comfy_client.progress_detail_updated.connect(self._on_comfy_progress_detail)
-        self.comfy_client.progress_updated.connect(self._on_comfy_progress)
+        self.comfy_client.collapse_seed_batches = self.settings.value("comfy_collapse_seed_batch", False, type=bool)
+        # 采样耗时统计持久化在索引库中，按模型/分辨率/采样器/步数/LoRA 数估算 ETA (额外后端共用)
+        self.step_timings = StepTimingTracker(self.db_manager)
+        self.comfy_client.step_timings = self.step_timings
+        # 多后端：额外的 ComfyUI 实例与主后端一起组成后端池，生成相关信号统一从后端池接收
+        self.comfy_pool = ComfyBackendPool(self.comfy_client, self)
+        self.comfy_pool.set_extra_addresses(parse_backend_addresses(self.settings.value("comfy_extra_addresses", "")))
+        # 本地调度器：ComfyUI 队列只保持少量任务，其余按优先级排队并落盘，重连后继续提交
+        self.generation_scheduler = GenerationScheduler(
+            self.comfy_pool.backends(),
+            os.path.join(self.thumb_cache.cache_dir, GenerationScheduler.JOURNAL_NAME),
+            self.settings.value("comfy_queue_depth", 2, type=int),
+            self,
+        )
+        self.comfy_pool.backend_added.connect(self.generation_scheduler.add_backend)
+        self.comfy_pool.backend_removed.connect(self.generation_scheduler.remove_backend)
+        self.comfy_client.scheduler = self.generation_scheduler
+        self.comfy_pool.status_changed.connect(lambda msg: self.statusBar().showMessage(f"[Comfy] {msg}", 3000))
+        # 进度消息每个采样步都会到达：按帧 (~30Hz) 合并，只投递最新值；快照持久化改为写回式节流
+        self._progress_coalescer = LatestValueCoalescer(33, self)
+        self._snapshot_writer = LatestValueCoalescer(2000, self)
+        self.comfy_pool.progress_detail_updated.connect(
+            lambda detail: self._progress_coalescer.submit("detail", self._on_comfy_progress_detail, detail))
+        self.comfy_pool.progress_updated.connect(
+            lambda current, total: self._progress_coalescer.submit("progress", self._on_comfy_progress, current, total))
         self.comfy_client.system_stats_updated.connect(self._on_comfy_system_stats)
-        self.comfy_client.prompt_submitted.connect(self._on_prompt_submitted)
+        self.comfy_pool.prompt_submitted.connect(self._on_prompt_submitted)
         
         # 绑定模型列表获取信号
         self.comfy_client.models_fetched.connect(lambda models: self.param_panel.set_available_models(models))
@@ -136,8 +190,10 @@ class MainWindow(QMainWindow):
         # 尝试获取可用模型
         QTimer.singleShot(1000, self.comfy_client.fetch_available_models)
         
-        # 监听队列状态以更新右下角计数
-        self.comfy_client.queue_updated.connect(self._update_queue_button)
+        # 监听队列状态以更新右下角计数 (队列状态由 WebSocket 事件驱动，无需定时轮询)
+        self.comfy_pool.queue_updated.connect(self._update_queue_button)
+        self.generation_scheduler.pending_changed.connect(
+            lambda _: self._update_queue_button(self.comfy_pool.queue_snapshot()))
         self._has_realtime_progress = False
         self._progress_eta_seconds = None
         self._running_prompt_id = ""
@@ -146,25 +202,28 @@ class MainWindow(QMainWindow):
         self._progress_timing_last_value = 0
         self._progress_timing_total = 0
         self._progress_timing_avg_step_seconds = None
-        self.queue_sync_timer = QTimer(self)
-        self.queue_sync_timer.setInterval(1000)
-        self.queue_sync_timer.timeout.connect(self.comfy_client.get_queue)
-        # 初始获取一次队列
-        QTimer.singleShot(2000, self.comfy_client.get_queue)
+        self._queue_eta_seconds = None
+        self._queue_eta_at = 0.0
         
         # 绑定参数面板的远程生成请求
         self.param_panel.remote_gen_requested.connect(self.on_remote_gen_requested)
         self.param_panel.compare_generate_requested.connect(self.on_compare_generate_requested)
-        self.comfy_client.execution_start.connect(self._on_comfy_node_start)
-        self.comfy_client.execution_done.connect(self._on_comfy_done)
-        self.comfy_client.prompt_submitted_with_context.connect(self._on_prompt_submitted_with_context)
-        self.comfy_client.prompt_executed_images.connect(self._on_prompt_executed_images)
+        self.comfy_pool.execution_start.connect(self._on_comfy_node_start)
+        self.comfy_pool.execution_done.connect(self._on_comfy_done)
+        self.comfy_pool.prompt_submitted_with_context.connect(self._on_prompt_submitted_with_context)
+        self.comfy_pool.output_fetched.connect(self._on_output_fetched)
+        # 采样实时预览与进度共用按帧合并，同一帧内只显示最新的预览
+        self._live_preview_prompt_id = ""
+        self.comfy_pool.preview_updated.connect(
+            lambda prompt_id, image, context: self._progress_coalescer.submit(
+                "preview", self._on_live_preview, prompt_id, image, context))
         
         # 日志系统:使用定时器轮询param_panel的日志列表
         self.log_poll_timer = QTimer(self)
         self.log_poll_timer.timeout.connect(self._poll_logs)
         self.log_poll_timer.start(500)  # 每500ms检查一次新日志
-        self.last_log_count = 0  # 记录上次已处理的日志数量
+        self._log_seq = 0  # 上次已读取到的日志序号 (ParameterPanel.generation_logs)
+        self._gen_log_lines = deque(maxlen=self.LOG_MAX_LINES)
 
         # 图片选择同步定时器 (解决快速切换不跟手 bug)
         self._selection_timer = QTimer(self)
@@ -367,7 +426,7 @@ class MainWindow(QMainWindow):
         self.interrupt_btn.setFixedWidth(24) 
         self.interrupt_btn.setFixedHeight(18)
         self.interrupt_btn.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.interrupt_btn.clicked.connect(lambda: self.comfy_client.interrupt_current())
+        self.interrupt_btn.clicked.connect(lambda: self.comfy_pool.interrupt_current())
         self.interrupt_btn.setStyleSheet("""
             QPushButton {
                 background: transparent;
@@ -455,6 +514,7 @@ class MainWindow(QMainWindow):
         # 缩略图图库
         self.thumbnail_list = ThumbnailList()
         self.thumbnail_list.image_selected.connect(self.on_image_selected)
+        self.search_controller.bind_model()
         self.left_splitter.addWidget(self.thumbnail_list)
         
         self.left_splitter.setStretchFactor(0, 2)
@@ -469,10 +529,12 @@ class MainWindow(QMainWindow):
         
         self.viewer = ImageViewer()
         self.viewer.navigate_request.connect(self.navigate_image)
+        self.viewer.preview_source = self.thumb_cache.get_thumbnail
         self.view_stack.addWidget(self.viewer)
         
         self.comparison_view = ComparisonView()
         self.comparison_view.navigate_request.connect(self.navigate_image)
+        self.comparison_view.set_preview_source(self.thumb_cache.get_thumbnail)
         self.comparison_view.setContentsMargins(0, 0, 0, 0)
         self.view_stack.addWidget(self.comparison_view)
         
@@ -504,13 +566,13 @@ class MainWindow(QMainWindow):
         """
         if self._is_scanning: return # 正在扫描时禁止布局自动调整，防止界面跳动
         try:
-            if not hasattr(self, 'viewer') or self.viewer.pixmap_item.pixmap().isNull():
+            if not hasattr(self, 'viewer') or not self.viewer.has_image():
                 return
         except (RuntimeError, AttributeError):
             return
             
-        pix = self.viewer.pixmap_item.pixmap()
-        img_ratio = pix.width() / pix.height()
+        size = self.viewer.image_size()
+        img_ratio = size.width() / size.height()
         
         total_w = self.splitter.width()
         viewer_h = self.viewer.height()
@@ -712,8 +774,16 @@ class MainWindow(QMainWindow):
     def on_remote_gen_requested(self, workflow, batch_count=1, randomize_seed=True):
         """处理远程生成请求 - 使用当前图片的workflow重新生成"""
         # 清空上一轮日志缓存
-        self.last_gen_logs = ""
-        self.last_log_count = 0
+        self._clear_gen_logs()
+
+        # 固定种子重跑：完全相同的工作流已有结果时，可直接复用而不占用 GPU
+        if not randomize_seed and workflow:
+            existing = self._existing_outputs(workflow)
+            if existing and self._confirm_reuse_outputs(
+                    f"相同工作流 (含种子) 已生成过 {len(existing)} 张图片，直接查看已有结果？"):
+                self._show_existing_output(existing[0])
+                self.statusBar().showMessage(f"已复用已有结果: {os.path.basename(existing[0])}", 5000)
+                return
 
         if not self._ensure_comfy_ready_for_submit():
             self.statusBar().showMessage("ComfyUI 尚未就绪，已尝试自动启动，请稍后重试生成", 5000)
@@ -724,6 +794,33 @@ class MainWindow(QMainWindow):
         print(f"[Main] 远程生成: 使用当前图片的workflow（{seed_mode_text}） x{batch_count}")
         self.comfy_client.queue_current_prompt(workflow, batch_count, randomize_seed)
         self.statusBar().showMessage(f"已发送 {batch_count} 个生成请求到ComfyUI", 3000)
+
+    def _existing_outputs(self, workflow: Dict[str, Any]) -> List[str]:
+        """同一可执行图 (规范哈希相同) 最近一次生成且文件仍存在的结果，按 batch_index 排序"""
+        digest = workflow_hash(workflow)
+        if not digest:
+            return []
+        rows = [r for r in self.db_manager.find_outputs_by_workflow_hash(digest) if os.path.exists(r["file_path"])]
+        if not rows:
+            return []
+        latest = rows[0]["prompt_id"]
+        rows = sorted((r for r in rows if r["prompt_id"] == latest), key=lambda r: r["batch_index"] or 0)
+        return [r["file_path"] for r in rows]
+
+    def _confirm_reuse_outputs(self, text: str) -> bool:
+        reply = QMessageBox.question(
+            self, "已有相同结果", f"{text}\n\n选择“否”将重新生成。",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes,
+        )
+        return reply == QMessageBox.StandardButton.Yes
+
+    def _show_existing_output(self, path: str) -> None:
+        row = self.thumbnail_list.image_model.row_of(path)
+        if row >= 0:
+            self.thumbnail_list.setCurrentRow(row)
+        self.on_image_selected(path)
+
     def on_image_selected(self, path):
         """记录选中的图片路径，并启动同步定时器"""
         if not path: return
@@ -756,20 +853,61 @@ class MainWindow(QMainWindow):
         self._last_selection_time = time.time()
         
         t0 = time.time()
-        # 1. 核心图片显示
+        # 1. 核心图片显示 (并预解码列表中相邻的图片，方向键切换时直接命中)
         self.viewer.load_image(path)
+        self.viewer.prefetch(self._neighbor_paths(path))
         
         # 2. 只有在单图模式下才重置缩放（对比模式由其自己管理）
         if self.view_stack.currentIndex() == 0:
             self._on_zoom_changed()
         
-        # 3. 解析并显示参数 (优化：如果是扫描阶段，参数更新可以更慢)
-        from src.core.metadata import MetadataParser
-        meta = MetadataParser.parse_image(path)
-        self.param_panel.update_info(meta)
+        # 3. 显示参数：命中缓存直接显示，否则后台解析后由 _on_metadata_ready 异步刷新
+        meta = self.metadata_cache.get(path)
+        if meta is not None:
+            self.param_panel.update_info(meta)
+        else:
+            self.metadata_loader.request(path)
+        
+        # 4. 为可见行预取元数据，连续切换时直接命中缓存
+        self.metadata_loader.prefetch(self._visible_list_paths())
         
         # print(f"[UI] 图片同步切换耗时: {(time.time() - t0) * 1000:.1f} ms -> {os.path.basename(path)}")
         
+    def _on_metadata_ready(self, path, meta):
+        """后台元数据加载完成：只在仍是当前选中图片时刷新面板"""
+        if path == self._pending_selection_path:
+            self.param_panel.update_info(meta)
+
+    def _neighbor_paths(self, path):
+        """当前列表顺序中前后各 N 张图片 (先近后远，后一张优先)"""
+        count = self.settings.value("viewer_prefetch_count", 2, type=int)
+        model = self.thumbnail_list.image_model
+        row = model.row_of(path)
+        if row < 0 or count <= 0:
+            return []
+        paths = []
+        for step in range(1, count + 1):
+            for r in (row + step, row - step):
+                p = model.get_path(r) if r >= 0 else None
+                if p:
+                    paths.append(p)
+        return paths
+
+    def _visible_list_paths(self):
+        """缩略图列表当前可见的行，并向后多取一屏"""
+        lst = self.thumbnail_list
+        model = lst.image_model
+        rows = model.rowCount()
+        if rows == 0:
+            return []
+        rect = lst.viewport().rect()
+        first = lst.indexAt(rect.topLeft())
+        last = lst.indexAt(rect.bottomRight())
+        start = first.row() if first.isValid() else 0
+        end = last.row() if last.isValid() else start + 64
+        end = min(rows, end + (end - start + 1))
+        return [model.get_path(i) for i in range(start, end)]
+
     def keyPressEvent(self, event):
         """处理全局快捷键"""
         if event.key() == Qt.Key.Key_Delete:
@@ -817,6 +955,11 @@ class MainWindow(QMainWindow):
         old_web_auth_code = str(self.settings.value("web_auth_code", "")).strip()
         if dlg.exec():
             # 重新应用主题以响应设置变化
+            self.comfy_client.collapse_seed_batches = self.settings.value("comfy_collapse_seed_batch", False, type=bool)
+            self.generation_scheduler.set_max_depth(self.settings.value("comfy_queue_depth", 2, type=int))
+            for client in self.comfy_pool.extras.values():
+                client.collapse_seed_batches = self.comfy_client.collapse_seed_batches
+            self.comfy_pool.set_extra_addresses(parse_backend_addresses(self.settings.value("comfy_extra_addresses", "")))
             new_addr = self.settings.value("comfy_address", "127.0.0.1:8188")
             if new_addr != old_addr:
                 self.comfy_client.server_address = new_addr
@@ -828,6 +971,9 @@ class MainWindow(QMainWindow):
                 if new_root:
                     self.statusBar().showMessage(f"ComfyUI 目录已更新: {new_root}", 3000)
             self.apply_theme()
+            self.thumb_cache_manager.set_budget_mb(self.settings.value("thumb_cache_max_mb", 1024, type=int))
+            self.output_library.set_root(self.settings.value("output_library_dir", "", type=str),
+                                         self.settings.value("comfy_root", "", type=str))
             
             new_watch_recursive = self.settings.value("watch_recursive", False, type=bool)
             if new_watch_recursive != old_watch_recursive and self.current_folder:
@@ -843,51 +989,42 @@ class MainWindow(QMainWindow):
                 self.web_service.stop_server()
                 self.web_service.start_server()
 
+    @property
+    def last_gen_logs(self) -> str:
+        """最近一次生成的日志全文 (复制/首次打开窗口时使用)"""
+        return "\n".join(self._gen_log_lines)
+
     def _poll_logs(self):
-        """定时轮询param_panel的日志列表并更新UI"""
+        """定时轮询param_panel的日志缓冲区，只把新增的行追加到UI"""
         from src.ui.widgets.param_panel import ParameterPanel
         
-        current_log_count = len(ParameterPanel.generation_logs)
-        if current_log_count > self.last_log_count:
-            # 有新日志
-            new_logs = ParameterPanel.generation_logs[self.last_log_count:]
-            for log in new_logs:
-                # 不需要再加时间戳,_log已经加过了
-                if not hasattr(self, 'last_gen_logs'):
-                    self.last_gen_logs = ""
-                self.last_gen_logs += log + "\n"
-            
-            self.last_log_count = current_log_count
-            
-            # 如果日志窗口打开,实时更新
-            if hasattr(self, 'log_dialog') and self.log_dialog.isVisible():
-                self.log_text_edit.setPlainText(self.last_gen_logs)
-                sb = self.log_text_edit.verticalScrollBar()
-                sb.setValue(sb.maximum())
+        new_logs, self._log_seq = ParameterPanel.generation_logs.since(self._log_seq)
+        if new_logs:
+            # 不需要再加时间戳,_log已经加过了
+            self._push_log_lines(new_logs)
+
+    def _push_log_lines(self, lines):
+        self._gen_log_lines.extend(lines)
+        # 如果日志窗口打开,增量追加 (窗口本身也限制了最大行数)
+        if hasattr(self, 'log_dialog') and self.log_dialog.isVisible():
+            self.log_text_edit.appendPlainText("\n".join(lines))
+            sb = self.log_text_edit.verticalScrollBar()
+            sb.setValue(sb.maximum())
+
+    def _clear_gen_logs(self):
+        self._gen_log_lines.clear()
+        if hasattr(self, 'log_dialog') and self.log_dialog.isVisible():
+            self.log_text_edit.clear()
     
     def _append_log(self, msg: str):
         """追加日志到缓存"""
-        # print(f"[MainWindow._append_log] 收到日志: {msg[:60]}...")
-        
         if msg == "__CLEAR__":
-            self.last_gen_logs = ""
+            self._clear_gen_logs()
             return
             
         import datetime
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        self.last_gen_logs += f"[{timestamp}] {msg}\n"
-        
-        # 如果日志窗口是打开的，实时更新内容
-        if hasattr(self, 'log_dialog') and self.log_dialog.isVisible():
-            self.log_text_edit.setPlainText(self.last_gen_logs)
-            # 滚动到底部
-            sb = self.log_text_edit.verticalScrollBar()
-            sb.setValue(sb.maximum())
-        else:
-            if hasattr(self, 'log_dialog'):
-                pass
-            else:
-                pass
+        self._push_log_lines([f"[{timestamp}] {msg}"])
 
     def _show_log_dialog(self):
         """显示生成日志弹窗 (非模态)"""
@@ -913,11 +1050,12 @@ class MainWindow(QMainWindow):
         
         layout = QVBoxLayout(self.log_dialog)
         
-        self.log_text_edit = QTextEdit()
+        self.log_text_edit = QPlainTextEdit()
         self.log_text_edit.setReadOnly(True)
+        self.log_text_edit.setMaximumBlockCount(self.LOG_MAX_LINES)
         self.log_text_edit.setPlainText(self.last_gen_logs if self.last_gen_logs else "暂无日志...")
         self.log_text_edit.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1e1e1e;
                 color: #d4d4d4;
                 font-family: Consolas, "Courier New", monospace;
@@ -958,10 +1096,9 @@ class MainWindow(QMainWindow):
     def _on_gallery_image_selected(self, path):
         """处理画廊选中的图片：定位并加载"""
         # 在主列表中找到索引并选中
-        for i in range(self.thumbnail_list.image_model.rowCount()):
-            if self.thumbnail_list.image_model.get_path(i) == path:
-                self.thumbnail_list.setCurrentRow(i)
-                break
+        row = self.thumbnail_list.image_model.row_of(path)
+        if row >= 0:
+            self.thumbnail_list.setCurrentRow(row)
         self.on_image_selected(path)
 
     def _on_gallery_compare_selected(self, paths):
@@ -1046,7 +1183,7 @@ class MainWindow(QMainWindow):
 
     def _ensure_compare_dialog(self) -> ComparePopupDialog:
         if not self.compare_dialog:
-            self.compare_dialog = ComparePopupDialog(self)
+            self.compare_dialog = ComparePopupDialog(self, thumb_cache=self.thumb_cache)
         return self.compare_dialog
 
     def _get_latest_gallery_image_path(self) -> str:
@@ -1186,7 +1323,17 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "提交失败", "对比任务数据不完整。")
             return
 
-        if not self._ensure_comfy_ready_for_submit():
+        # 固定种子重跑时，与已有结果完全相同的变体直接复用，不再提交
+        reused: Dict[int, str] = {}
+        for idx, workflow in enumerate(workflows):
+            existing = self._existing_outputs(workflow)
+            if existing:
+                reused[idx] = existing[0]
+        if reused and not self._confirm_reuse_outputs(
+                f"{len(reused)}/{len(workflows)} 个变体的工作流 (含种子) 与已有结果完全相同，直接复用这些结果？"):
+            reused = {}
+
+        if len(reused) < len(workflows) and not self._ensure_comfy_ready_for_submit():
             QMessageBox.warning(self, "ComfyUI 未就绪", "检测到 ComfyUI 未连接，已尝试自动启动，请稍后重试。")
             return
 
@@ -1224,8 +1371,16 @@ class MainWindow(QMainWindow):
         self._refresh_compare_dialog_for_session(session)
         self.open_compare_popup()
 
-        self.comfy_client.submit_workflow_batch(workflows, contexts)
-        self.statusBar().showMessage(f"已提交 LoRA 对比任务: {expected_count} 个", 5000)
+        padded = [(contexts[idx] if idx < len(contexts) else {}) or {} for idx in range(len(workflows))]
+        for idx, path in reused.items():
+            variant_id = str(padded[idx].get("variant_id") or "")
+            if variant_id:
+                self._set_compare_item_done(session, variant_id, path)
+        submit = [idx for idx in range(len(workflows)) if idx not in reused]
+        if submit:
+            self.comfy_client.submit_workflow_batch([workflows[i] for i in submit], [padded[i] for i in submit])
+        reused_text = f"，复用已有结果 {len(reused)} 个" if reused else ""
+        self.statusBar().showMessage(f"已提交 LoRA 对比任务: {len(submit)} 个{reused_text}", 5000)
 
     def _on_prompt_submitted_with_context(self, prompt_id: str, context: Dict[str, Any]):
         session_id = str(context.get("session_id") or "")
@@ -1238,6 +1393,11 @@ class MainWindow(QMainWindow):
         item = session.items.get(variant_id)
         if not item:
             return
+        if "batch_index" in context:
+            # 合并提交：整批共用一个种子，用 batch_index 区分
+            meta = item.setdefault("meta", {})
+            meta["seed"] = context.get("seed", meta.get("seed"))
+            meta["batch_index"] = context["batch_index"]
         if item.get("status") == "queued":
             item["status"] = "submitted"
         self._save_last_compare_session()
@@ -1259,31 +1419,6 @@ class MainWindow(QMainWindow):
                 }
             )
 
-    def _resolve_comfy_image_path(self, image_info: Dict[str, Any]) -> str:
-        filename = str(image_info.get("filename") or "")
-        if not filename:
-            return ""
-        subfolder = str(image_info.get("subfolder") or "")
-        img_type = str(image_info.get("type") or "output")
-        comfy_root = str(self.settings.value("comfy_root", "", type=str) or "").strip()
-
-        candidates = []
-        if comfy_root:
-            candidates.append(os.path.normpath(os.path.join(comfy_root, img_type, subfolder, filename)))
-            candidates.append(os.path.normpath(os.path.join(comfy_root, "output", subfolder, filename)))
-            if os.path.basename(comfy_root).lower() == "models":
-                root_parent = os.path.dirname(comfy_root)
-                candidates.append(os.path.normpath(os.path.join(root_parent, "output", subfolder, filename)))
-                candidates.append(os.path.normpath(os.path.join(root_parent, img_type, subfolder, filename)))
-        if self.current_folder:
-            candidates.append(os.path.normpath(os.path.join(self.current_folder, subfolder, filename)))
-            candidates.append(os.path.normpath(os.path.join(self.current_folder, filename)))
-
-        for path in candidates:
-            if path and os.path.exists(path):
-                return path
-        return candidates[0] if candidates else ""
-
     def _set_compare_item_done(
         self,
         session: CompareSession,
@@ -1321,42 +1456,35 @@ class MainWindow(QMainWindow):
                 }
             )
 
-    def _resolve_compare_image_with_retry(
-        self,
-        session_id: str,
-        variant_id: str,
-        image_info: Dict[str, Any],
-        retry: int = 0
-    ) -> None:
-        session = self.compare_sessions.get(session_id)
-        if not session:
-            return
-        path = self._resolve_comfy_image_path(image_info)
-        if path and os.path.exists(path):
-            self._set_compare_item_done(session, variant_id, path, unresolved=False)
-            return
-        if retry < 3:
-            QTimer.singleShot(
-                500 * (retry + 1),
-                lambda: self._resolve_compare_image_with_retry(session_id, variant_id, image_info, retry + 1),
-            )
-            return
-        self._set_compare_item_done(session, variant_id, path, unresolved=True)
+    def _on_output_fetched(self, prompt_id: str, image_info: Dict[str, Any], data: bytes, context: Dict[str, Any]):
+        """/view 取回的输出交给后台保存并入索引；本地 ComfyUI 自己写出的副本不再由监视器重复入库"""
+        original = self.output_library.comfy_output_path(image_info)
+        if original:
+            self.file_controller.mark_ingested(original)
+        if data:
+            self.output_ingestor.submit(prompt_id, data, image_info, context)
+        else:
+            self._on_output_ingested(prompt_id, None, image_info, context)
+
+    def _on_output_ingested(self, prompt_id: str, result: Any, image_info: Dict[str, Any], context: Dict[str, Any]):
+        """入库完成 (UI 线程)：显示新图，对比任务随即标记完成"""
+        path = ""
+        if result:
+            path, meta, thumb = result
+            self.file_controller.add_generated_image(path, meta, thumb)
+            if context.get("workflow_hash"):
+                self.db_manager.add_provenance(prompt_id, context["workflow_hash"], path,
+                                               context.get("batch_index", 0), self.comfy_pool.backend_address(prompt_id))
 
-    def _on_prompt_executed_images(self, prompt_id: str, images: List[Dict[str, Any]], context: Dict[str, Any]):
         session_id = str(context.get("session_id") or "")
-        variant_id = str(context.get("variant_id") or "")
         session = self.compare_sessions.get(session_id)
         if not session:
             return
-        if not variant_id:
-            variant_id = session.prompt_to_variant.get(prompt_id, "")
-        if not variant_id:
-            return
-        if not images:
-            return
-        image_info = images[0]
-        self._resolve_compare_image_with_retry(session_id, variant_id, image_info, retry=0)
+        variant_id = str(context.get("variant_id") or "") or session.prompt_to_variant.get(prompt_id, "")
+        item = session.items.get(variant_id) if variant_id else None
+        if not item or item.get("status") == "done":
+            return   # 一个变体输出多张图时只取第一张
+        self._set_compare_item_done(session, variant_id, path, unresolved=not path)
 
     def apply_theme(self):
         """应用界面主题 (Windows 11 Fluent Design 风格)"""
@@ -1875,7 +2003,7 @@ class MainWindow(QMainWindow):
         from src.ui.widgets.queue_dialog import QueueDialog
         
         if not hasattr(self, 'queue_dialog') or self.queue_dialog is None:
-            self.queue_dialog = QueueDialog(self.comfy_client, self)
+            self.queue_dialog = QueueDialog(self.comfy_pool, self)
         
         self.queue_dialog.show()
         self.queue_dialog.raise_()
@@ -1901,7 +2029,7 @@ class MainWindow(QMainWindow):
             self.progress_bar.setMaximum(safe_total)
             self.progress_bar.setValue(safe_current)
             self.progress_bar.setFormat(self._format_progress_text(safe_current, safe_total))
-            self._save_progress_snapshot(safe_current, safe_total)
+            self._snapshot_writer.submit("snapshot", self._save_progress_snapshot, safe_current, safe_total)
 
     def _on_comfy_progress_detail(self, detail: Dict[str, Any]):
         """处理 ComfyUI 进度详情（ETA）。"""
@@ -1928,10 +2056,19 @@ class MainWindow(QMainWindow):
 
     def _format_progress_text(self, current: int, total: int) -> str:
         eta_text = self._format_eta(self._progress_eta_seconds)
+        queue_eta = self._remaining_queue_eta_seconds()
+        if eta_text and isinstance(queue_eta, (int, float)) and queue_eta > self._progress_eta_seconds + 1:
+            return f"生成中... {current}/{total} (%p%) 预计 {eta_text} · 队列 {self._format_eta(queue_eta)}"
         if eta_text:
             return f"生成中... {current}/{total} (%p%) 预计 {eta_text}"
         return f"生成中... {current}/{total} (%p%)"
 
+    def _remaining_queue_eta_seconds(self) -> Any:
+        """队列整体剩余时间：在队列变化时估算一次，之后按流逝时间递减"""
+        if not isinstance(self._queue_eta_seconds, (int, float)):
+            return None
+        return max(self._queue_eta_seconds - (time.time() - self._queue_eta_at), 0.0)
+
     def _reset_progress_eta_tracking(self) -> None:
         self._progress_timing_started_at = None
         self._progress_timing_last_ts = None
@@ -1946,6 +2083,11 @@ class MainWindow(QMainWindow):
         if current >= total:
             return 0.0
 
+        # 优先使用持久化的耗时统计 (本次实测步速 + 历史开销)
+        tracked = self.step_timings.running_remaining_seconds(self.comfy_pool.running_prompt_ids())
+        if tracked is not None:
+            return tracked
+
         now = time.time()
         if (
             self._progress_timing_started_at is None
@@ -2013,6 +2155,8 @@ class MainWindow(QMainWindow):
         self.settings.setValue(self.COMFY_PROGRESS_SNAPSHOT_KEY, json.dumps(payload, ensure_ascii=False))
 
     def _clear_progress_snapshot(self) -> None:
+        # 丢弃尚未写回的快照，避免清除后又被旧值覆盖
+        self._snapshot_writer.cancel("snapshot")
         self.settings.remove(self.COMFY_PROGRESS_SNAPSHOT_KEY)
 
     def _recover_progress_from_snapshot(self, prompt_id: str, current: int, total: int) -> int:
@@ -2147,14 +2291,10 @@ class MainWindow(QMainWindow):
     def _on_prompt_submitted(self, prompt_id):
         """处理任务提交成功"""
         self.statusBar().showMessage(f"任务已提交: {prompt_id[:8]}...", 5000)
-        # 如果队列窗口打开，刷新它
-        if hasattr(self, 'queue_dialog') and self.queue_dialog and self.queue_dialog.isVisible():
-            self.queue_dialog.refresh_queue()
-        # 同时触发主界面的队列查询以更新计数
-        self.comfy_client.get_queue()
 
     def _update_queue_button(self, data):
         """更新状态栏队列按钮的任务计数"""
+        self._progress_coalescer.flush() # 先投递积压的进度，保证与队列状态的先后顺序
         running = data.get('queue_running', [])
         pending = data.get('queue_pending', [])
         current_running_prompt_id = ""
@@ -2162,7 +2302,14 @@ class MainWindow(QMainWindow):
             current_running_prompt_id = self._extract_prompt_id_from_running_task(running[0])
         if current_running_prompt_id:
             self._running_prompt_id = current_running_prompt_id
-        total = len(running) + len(pending)
+        # 本地调度器中尚未提交的任务也计入
+        total = len(running) + len(pending) + self.generation_scheduler.pending_count()
+        self._queue_eta_seconds = (
+            self.comfy_pool.estimate_queue_seconds(self.generation_scheduler.pending_workflows()) if total > 0 else None
+        )
+        self._queue_eta_at = time.time()
+        queue_eta_text = self._format_eta(self._queue_eta_seconds)
+        self.queue_btn.setToolTip(f"预计全部完成还需 {queue_eta_text}" if queue_eta_text else "")
         
         if total > 0:
             self.queue_btn.setText(f"📋 队列 ({total})")
@@ -2179,12 +2326,7 @@ class MainWindow(QMainWindow):
             self.queue_btn.setText("📋 队列")
             self.queue_btn.setStyleSheet("") # 恢复默认样式
 
-        if total > 0:
-            if not self.queue_sync_timer.isActive():
-                self.queue_sync_timer.start()
-        else:
-            if self.queue_sync_timer.isActive():
-                self.queue_sync_timer.stop()
+        if total <= 0:
             self._has_realtime_progress = False
             self._progress_eta_seconds = None
             self._reset_progress_eta_tracking()
@@ -2219,7 +2361,8 @@ class MainWindow(QMainWindow):
                 self.progress_bar.setFormat(
                     self._format_progress_text(self.progress_bar.value(), self.progress_bar.maximum())
                 )
-                self._save_progress_snapshot(self.progress_bar.value(), self.progress_bar.maximum())
+                self._snapshot_writer.submit("snapshot", self._save_progress_snapshot,
+                                             self.progress_bar.value(), self.progress_bar.maximum())
             else:
                 # 不使用 maximum=0，避免某些平台样式下文字不可见
                 self.progress_bar.setMaximum(1)
@@ -2229,6 +2372,7 @@ class MainWindow(QMainWindow):
 
     def _on_comfy_node_start(self, node_id, node_type):
         """处理节点开始执行"""
+        self._progress_coalescer.flush()
         if hasattr(self, 'progress_bar'):
             self._has_realtime_progress = True
             self._progress_eta_seconds = None
@@ -2261,8 +2405,30 @@ class MainWindow(QMainWindow):
                 
         self.statusBar().showMessage(f"正在执行: {node_type} ({node_id})")
 
+    def _on_live_preview(self, prompt_id: str, image: QImage, context: Dict[str, Any]):
+        """对比任务的预览显示在对比弹窗对应变体上；其余任务显示在主看图区 (同一时间只跟随一个任务)"""
+        session = self.compare_sessions.get(str(context.get("session_id") or ""))
+        if session:
+            variant_id = str(context.get("variant_id") or "") or session.prompt_to_variant.get(prompt_id, "")
+            if self.compare_dialog and variant_id:
+                self.compare_dialog.show_live_preview(variant_id, image)
+            return
+        if self._live_preview_prompt_id and self._live_preview_prompt_id != prompt_id:
+            return
+        self._live_preview_prompt_id = prompt_id
+        self.viewer.show_frame(image)
+
     def _on_comfy_done(self, result=None):
         """处理执行完成"""
+        self._progress_coalescer.flush()
+        if self._live_preview_prompt_id:
+            # 预览结束，恢复显示当前选中的图片 (新图入库后会自动选中)
+            self._live_preview_prompt_id = ""
+            self._progress_coalescer.cancel("preview")
+            if self._pending_selection_path:
+                self.viewer.load_image(self._pending_selection_path)
+            else:
+                self.viewer.clear_view()
         self._has_realtime_progress = False
         self._progress_eta_seconds = None
         self._reset_progress_eta_tracking()
@@ -2277,6 +2443,12 @@ class MainWindow(QMainWindow):
 
         if hasattr(self, "log_poll_timer") and self.log_poll_timer.isActive():
             self.log_poll_timer.stop()
+        if hasattr(self, "_snapshot_writer"):
+            self._snapshot_writer.flush() # 退出前写回最新的进度快照
+        if hasattr(self, "generation_scheduler"):
+            self.generation_scheduler.flush_journal()
+        if hasattr(self, "output_ingestor"):
+            self.output_ingestor.shutdown()
 
         if hasattr(self, "queue_dialog") and self.queue_dialog:
             self.queue_dialog.close()
@@ -2284,10 +2456,18 @@ class MainWindow(QMainWindow):
         if hasattr(self, "watcher"):
             self.watcher.stop_monitoring()
 
-        if hasattr(self, "search_controller") and hasattr(self.search_controller, "search_loader"):
-            if self.search_controller.search_loader.isRunning():
-                self.search_controller.search_loader.stop()
-                self.search_controller.search_loader.wait()
+        if hasattr(self, "thumb_cache_manager"):
+            self.thumb_cache_manager.stop()
+
+        if hasattr(self, "metadata_loader"):
+            self.metadata_loader.stop()
+            self.metadata_loader.wait()
+        ImageDecoder.shared().shutdown()
+        if self.compare_dialog:
+            self.compare_dialog.shutdown()
+
+        if hasattr(self, "search_controller"):
+            self.search_controller.shutdown()
 
         if hasattr(self, "file_controller") and self.file_controller.loader_thread:
             if self.file_controller.loader_thread.isRunning():
@@ -2314,8 +2494,9 @@ class MainWindow(QMainWindow):
             if self.comfy_client.reconnect_timer.isActive():
                 self.comfy_client.reconnect_timer.stop()
             self.comfy_client.ws.close()
-        if hasattr(self, "queue_sync_timer") and self.queue_sync_timer.isActive():
-            self.queue_sync_timer.stop()
+            self.comfy_client.preview_decoder.shutdown()
+        if hasattr(self, "comfy_pool"):
+            self.comfy_pool.shutdown()
 
         if hasattr(self, "web_service"):
             self.web_service.stop_server()
@@ -1,6 +1,28 @@
-from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QWidget,
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QWidget, QSpinBox,
                              QComboBox, QCheckBox, QPushButton, QGroupBox, QFormLayout, QLineEdit, QFileDialog)
-from PyQt6.QtCore import Qt, QSettings
+from PyQt6.QtCore import Qt, QSettings, QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _SweepSignals(QObject):
+    finished = pyqtSignal(dict, dict)  # (清理结果, 清理后的缓存统计)
+
+
+class _SweepTask(QRunnable):
+    """在后台线程执行缩略图缓存清理 (遍历目录、比对数据库、删除文件)"""
+    def __init__(self, manager):
+        super().__init__()
+        self.manager = manager
+        self.signals = _SweepSignals()
+
+    def run(self):
+        try:
+            result = self.manager.sweep()
+            stats = self.manager.get_stats()
+        except Exception as e:
+            print(f"[Settings] 缓存清理失败: {e}")
+            result, stats = {}, {}
+        self.signals.finished.emit(result, stats)
+
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -41,6 +63,25 @@ class SettingsDialog(QDialog):
                           self.settings.value("scan_recursive", False, type=bool)
         self.check_include_subfolders.setChecked(include_default)
         form_layout.addRow("", self.check_include_subfolders)
+
+        # 缩略图缓存预算
+        self.spin_thumb_cache_mb = QSpinBox()
+        self.spin_thumb_cache_mb.setRange(64, 65536)
+        self.spin_thumb_cache_mb.setSingleStep(256)
+        self.spin_thumb_cache_mb.setSuffix(" MB")
+        self.spin_thumb_cache_mb.setValue(self.settings.value("thumb_cache_max_mb", 1024, type=int))
+        cache_row = QWidget()
+        cache_layout = QHBoxLayout(cache_row)
+        cache_layout.setContentsMargins(0, 0, 0, 0)
+        cache_layout.addWidget(self.spin_thumb_cache_mb, 1)
+        self.btn_sweep = QPushButton("立即清理")
+        self.btn_sweep.clicked.connect(self._sweep_thumb_cache)
+        cache_layout.addWidget(self.btn_sweep)
+        form_layout.addRow("缩略图缓存上限:", cache_row)
+        self.label_cache_stats = QLabel("")
+        self.label_cache_stats.setStyleSheet("color: #6b7280; font-size: 10px;")
+        form_layout.addRow("", self.label_cache_stats)
+        self._update_cache_stats()
         
         # AI 提示词优化 - 配置
         self.edit_ai_base_url = QLineEdit()
@@ -73,6 +114,12 @@ class SettingsDialog(QDialog):
         self.edit_comfy_addr.setText(self.settings.value("comfy_address", "127.0.0.1:8188"))
         form_layout.addRow("ComfyUI 地址:", self.edit_comfy_addr)
 
+        self.edit_comfy_extra_addrs = QLineEdit()
+        self.edit_comfy_extra_addrs.setPlaceholderText("可选，多个用逗号分隔，例如: 127.0.0.1:8190, 192.168.1.20:8188")
+        self.edit_comfy_extra_addrs.setToolTip("批量/对比任务会分派到负载最低且具备所需模型的后端；某个后端断线时任务自动改投其他后端")
+        self.edit_comfy_extra_addrs.setText(self.settings.value("comfy_extra_addresses", ""))
+        form_layout.addRow("额外 ComfyUI 后端:", self.edit_comfy_extra_addrs)
+
         self.edit_comfy_root = QLineEdit()
         self.edit_comfy_root.setPlaceholderText("例如: D:\\ComfyUI (里面包含 models 目录)")
         self.edit_comfy_root.setText(self.settings.value("comfy_root", ""))
@@ -97,6 +144,32 @@ class SettingsDialog(QDialog):
         comfy_run_layout.addWidget(btn_browse_run)
         form_layout.addRow("ComfyUI 启动路径:", comfy_run_row)
 
+        self.edit_output_library = QLineEdit()
+        self.edit_output_library.setPlaceholderText("留空则使用 ComfyUI 目录下的 output；未设置 ComfyUI 目录时为程序目录下的 comfy_outputs")
+        self.edit_output_library.setToolTip("生成完成后通过 ComfyUI /view 取回图片保存到此目录并立即入库 (远程后端同样适用)；"
+                                            "设为 ComfyUI 的 output 目录时不会重复保存")
+        self.edit_output_library.setText(self.settings.value("output_library_dir", ""))
+        output_library_row = QWidget()
+        output_library_layout = QHBoxLayout(output_library_row)
+        output_library_layout.setContentsMargins(0, 0, 0, 0)
+        output_library_layout.addWidget(self.edit_output_library, 1)
+        btn_browse_output = QPushButton("浏览")
+        btn_browse_output.clicked.connect(self._browse_output_library)
+        output_library_layout.addWidget(btn_browse_output)
+        form_layout.addRow("生成结果保存目录:", output_library_row)
+
+        self.check_comfy_seed_batch = QCheckBox("批量生成合并为一次提交 (仅种子不同的任务使用 batch_size)")
+        self.check_comfy_seed_batch.setToolTip("减少 ComfyUI 每个任务的校验与调度开销；同一批次共用一个种子，按 batch_index 区分")
+        self.check_comfy_seed_batch.setChecked(self.settings.value("comfy_collapse_seed_batch", False, type=bool))
+        form_layout.addRow("", self.check_comfy_seed_batch)
+
+        self.spin_comfy_queue_depth = QSpinBox()
+        self.spin_comfy_queue_depth.setRange(0, 64)
+        self.spin_comfy_queue_depth.setSpecialValueText("不限制")
+        self.spin_comfy_queue_depth.setToolTip("其余任务留在本地队列按优先级依次提交，单次生成可插到批量对比之前；0 为一次全部提交")
+        self.spin_comfy_queue_depth.setValue(self.settings.value("comfy_queue_depth", 2, type=int))
+        form_layout.addRow("ComfyUI 队列深度:", self.spin_comfy_queue_depth)
+
         # Web 服务访问控制
         self.combo_web_bind = QComboBox()
         self.combo_web_bind.addItem("仅本机 (推荐)", "127.0.0.1")
@@ -146,18 +219,64 @@ class SettingsDialog(QDialog):
         include_sub = self.check_include_subfolders.isChecked()
         self.settings.setValue("watch_recursive", include_sub)
         self.settings.setValue("scan_recursive", include_sub)
+        self.settings.setValue("thumb_cache_max_mb", self.spin_thumb_cache_mb.value())
         self.settings.setValue("ai_base_url", self.edit_ai_base_url.text().strip())
         self.settings.setValue("ai_model_name", self.edit_ai_model.text().strip())
         self.settings.setValue("glm_api_key", self.edit_glm_api_key.text().strip())
         self.settings.setValue("comfy_address", self.edit_comfy_addr.text().strip())
+        self.settings.setValue("comfy_extra_addresses", self.edit_comfy_extra_addrs.text().strip())
         self.settings.setValue("comfy_root", self.edit_comfy_root.text().strip())
         self.settings.setValue("comfy_run_path", self.edit_comfy_run_path.text().strip())
+        self.settings.setValue("output_library_dir", self.edit_output_library.text().strip())
+        self.settings.setValue("comfy_collapse_seed_batch", self.check_comfy_seed_batch.isChecked())
+        self.settings.setValue("comfy_queue_depth", self.spin_comfy_queue_depth.value())
         self.settings.setValue("web_bind", self.combo_web_bind.currentData())
         self.settings.setValue("web_auth_code", self.edit_web_auth_code.text().strip().upper())
         self.settings.setValue("web_auto_open_browser", self.check_web_auto_open.isChecked())
         
         self.accept()
 
+    def _cache_manager(self):
+        return getattr(self.parent(), "thumb_cache_manager", None)
+
+    def _update_cache_stats(self):
+        manager = self._cache_manager()
+        if manager is None:
+            self.label_cache_stats.setText("")
+            return
+        self._show_cache_stats(manager.get_stats())
+
+    def _show_cache_stats(self, stats):
+        if not stats:
+            return
+        self.label_cache_stats.setText(
+            f"当前 {stats['size_bytes'] / 1024 / 1024:.1f} MB / {stats['entry_count']} 个条目，"
+            f"本次运行命中率 {stats['hit_rate'] * 100:.0f}%"
+        )
+
+    def _sweep_thumb_cache(self):
+        manager = self._cache_manager()
+        if manager is None:
+            return
+        manager.set_budget_mb(self.spin_thumb_cache_mb.value())
+        self.btn_sweep.setEnabled(False)
+        self.btn_sweep.setText("清理中...")
+        # 大缓存清理可能耗时数秒，放到后台线程执行，完成后经信号回到 UI 线程
+        self._sweep_task = _SweepTask(manager)
+        self._sweep_task.setAutoDelete(False)
+        self._sweep_task.signals.finished.connect(self._on_sweep_finished)
+        QThreadPool.globalInstance().start(self._sweep_task)
+
+    def _on_sweep_finished(self, result, stats):
+        self.btn_sweep.setEnabled(True)
+        self.btn_sweep.setText("立即清理")
+        self._show_cache_stats(stats)
+        parent = self.parent()
+        if result and parent and hasattr(parent, "statusBar"):
+            parent.statusBar().showMessage(
+                f"缓存清理完成: 回收 {result['orphans_removed']} 个孤儿条目，淘汰 {result['evicted']} 个", 3000
+            )
+
     def _browse_comfy_root(self):
         path = QFileDialog.getExistingDirectory(self, "选择 ComfyUI 根目录(包含 models)", self.edit_comfy_root.text().strip() or "")
         if path:
@@ -166,6 +285,11 @@ class SettingsDialog(QDialog):
             if parent and hasattr(parent, "statusBar"):
                 parent.statusBar().showMessage(f"已选择 ComfyUI 目录: {path}", 3000)
 
+    def _browse_output_library(self):
+        path = QFileDialog.getExistingDirectory(self, "选择生成结果保存目录", self.edit_output_library.text().strip() or "")
+        if path:
+            self.edit_output_library.setText(path)
+
     def _browse_comfy_run_path(self):
         path, _ = QFileDialog.getOpenFileName(self, "选择 ComfyUI 启动脚本", self.edit_comfy_run_path.text().strip() or "", "Executables (*.bat *.exe *.sh);;All Files (*)")
         if path:
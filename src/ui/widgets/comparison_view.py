@@ -31,6 +31,11 @@ class ComparisonView(QWidget):
         self._reference_aspect_ratio = 1.0
         self._sync_retry_count = 0
 
+    def set_preview_source(self, source):
+        """两侧视图共用缩略图预览来源 (见 ImageViewer.preview_source)"""
+        self.viewer_left.preview_source = source
+        self.viewer_right.preview_source = source
+
     def set_reference_aspect_ratio(self, ratio: float | None):
         if ratio is None:
             return
@@ -92,8 +97,8 @@ class ComparisonView(QWidget):
         QTimer.singleShot(80, self._sync_after_load)
 
     def _sync_after_load(self):
-        left_ready = not self.viewer_left.pixmap_item.pixmap().isNull()
-        right_ready = not self.viewer_right.pixmap_item.pixmap().isNull()
+        left_ready = self.viewer_left.has_image()
+        right_ready = self.viewer_right.has_image()
 
         if not (left_ready and right_ready):
             self._sync_retry_count += 1
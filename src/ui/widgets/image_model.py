@@ -1,68 +1,380 @@
-from PyQt6.QtCore import QAbstractListModel, Qt, QSize, pyqtSignal, QModelIndex
-from PyQt6.QtGui import QImage, QPixmap, QIcon
-import os
+from array import array
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractListModel, Qt, pyqtSignal, QModelIndex, QTimer
+from PyQt6.QtGui import QImage, QPixmap
+
+from src.core.placeholder import decode_placeholder
 
 class ImageModel(QAbstractListModel):
     """
-    高性能图片列表模型，仅在需要时加载数据。
+    高性能虚拟图片列表模型。
+    - 行数据为紧凑的并行数组：目录前缀 id (array) + 文件名，目录前缀去重共享
+    - 缩略图以 QPixmap 放在有上限的 LRU 中，被淘汰的行在重新可见时按需再请求
+    - 通过 canFetchMore/fetchMore 分页暴露行，10 万级结果也能瞬时重置
     """
+    PAGE_SIZE = 256
+    PIXMAP_EDGE = 192            # 缓存 pixmap 的最长边，覆盖主列表和图库视图的图标尺寸
+    MAX_PIXMAPS = 800            # 约 800 * 192 * 192 * 4B ≈ 110MB 上限
+    MAX_PLACEHOLDERS = 4096
+    EAGER_PIXMAP_ROWS = 128      # 批量加载时立即缓存缩略图的前若干行
+    # 可见行缺少缩略图时批量发出 (路径列表)，由控制器交给后台线程加载
+    thumbnails_requested = pyqtSignal(list)
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.image_data = [] # 存储字典: {'path': str, 'name': str, 'thumb': QImage}
+        self._prefixes = []          # 去重后的目录前缀 (含末尾分隔符)
+        self._prefix_ids = {}        # prefix -> id
+        self._dirs = array('I')      # 每行的目录前缀 id
+        self._names = []             # 每行的文件名
+        self._row_of = {}            # 文件名 -> 行键 (row + _row_base)，重名 (不同目录) 时为行键列表
+        self._row_base = 0           # 行键偏移：插入 / 删除时较短一侧的行逐个平移，另一侧只改偏移
+        self._loaded = 0             # 已暴露给视图的行数
+        self._pixmaps = OrderedDict()       # path -> QPixmap (LRU)
+        self._placeholders = OrderedDict()  # path -> base64 str / QPixmap (LRU)
+        self._requested = set()      # 已请求、尚未送达的路径 (避免重复请求)
+        self._pending_requests = []
+        self._request_timer = QTimer(self)
+        self._request_timer.setSingleShot(True)
+        self._request_timer.timeout.connect(self._flush_requests)
+        # 可选：分页时批量读取占位图的回调 (paths -> {path: base64})
+        self.placeholder_source = None
 
+    # ---- 紧凑行存储 ----
+    @staticmethod
+    def _split(path):
+        cut = max(path.rfind('/'), path.rfind('\\')) + 1
+        return path[:cut], path[cut:]
+
+    def _prefix_id(self, prefix):
+        pid = self._prefix_ids.get(prefix)
+        if pid is None:
+            pid = len(self._prefixes)
+            self._prefixes.append(prefix)
+            self._prefix_ids[prefix] = pid
+        return pid
+
+    def _index_row(self, name, row):
+        key = row + self._row_base
+        current = self._row_of.get(name)
+        if current is None:
+            self._row_of[name] = key
+        elif isinstance(current, list):
+            current.append(key)
+        else:
+            self._row_of[name] = [current, key]
+
+    def _unindex_row(self, name, row):
+        key = row + self._row_base
+        current = self._row_of.get(name)
+        if isinstance(current, list):
+            current.remove(key)
+            if len(current) == 1:
+                self._row_of[name] = current[0]
+        elif current == key:
+            del self._row_of[name]
+
+    def _shift_rows(self, start, stop, delta):
+        """行 [start, stop) 的行键整体加 delta"""
+        for row in range(start, stop):
+            name = self._names[row]
+            key = row + self._row_base
+            current = self._row_of[name]
+            if isinstance(current, list):
+                current[current.index(key)] = key + delta
+            else:
+                self._row_of[name] = key + delta
+
+    def _rebuild_index(self):
+        self._row_of = {}
+        self._row_base = 0
+        for row, name in enumerate(self._names):
+            self._index_row(name, row)
+
+    def get_path(self, index):
+        if 0 <= index < len(self._names):
+            return self._prefixes[self._dirs[index]] + self._names[index]
+        return None
+
+    def get_name(self, index):
+        if 0 <= index < len(self._names):
+            return self._names[index]
+        return None
+
+    def row_of(self, path):
+        prefix, name = self._split(path)
+        rows = self._row_of.get(name)
+        if rows is None:
+            return -1
+        pid = self._prefix_ids.get(prefix)
+        for key in (rows if isinstance(rows, list) else (rows,)):
+            row = key - self._row_base
+            if self._dirs[row] == pid:
+                return row
+        return -1
+
+    def total_count(self):
+        """结果总数 (包含尚未分页暴露的行)"""
+        return len(self._names)
+
+    # ---- Qt 模型接口 ----
     def rowCount(self, parent=None):
-        return len(self.image_data)
+        if parent is not None and parent.isValid():
+            return 0
+        return self._loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._loaded < len(self._names)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        start = self._loaded
+        end = min(start + self.PAGE_SIZE, len(self._names))
+        if end <= start:
+            return
+        self._load_placeholders([self.get_path(i) for i in range(start, end)])
+        self.beginInsertRows(QModelIndex(), start, end - 1)
+        self._loaded = end
+        self.endInsertRows()
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        if not index.isValid() or index.row() >= len(self.image_data):
+        if not index.isValid() or index.row() >= self._loaded:
             return None
 
-        item = self.image_data[index.row()]
+        row = index.row()
 
         if role == Qt.ItemDataRole.DisplayRole:
-            return item['name']
-        
+            return self._names[row]
+
         if role == Qt.ItemDataRole.DecorationRole:
-            thumb = item.get('thumb')
-            if thumb:
-                return QIcon(QPixmap.fromImage(thumb))
-            return None # 也可以返回一个占位图标
+            path = self.get_path(row)
+            pixmap = self._pixmaps.get(path)
+            if pixmap is not None:
+                self._pixmaps.move_to_end(path)
+                return pixmap
+            self._request_thumbnail(path)
+            # 缩略图未就绪时先显示索引中的低清占位图 (按需解码一次)
+            data = self._placeholders.get(path)
+            if isinstance(data, str):
+                image = decode_placeholder(data, self.PIXMAP_EDGE)
+                data = QPixmap.fromImage(image) if image is not None else None
+                self._placeholders[path] = data
+            return data
 
         if role == Qt.ItemDataRole.UserRole:
-            return item['path']
+            return self.get_path(row)
 
         return None
 
-    def add_image(self, path, thumb=None, index=None):
+    # ---- 缩略图 / 占位图 ----
+    def _load_placeholders(self, paths):
+        if not self.placeholder_source or not paths:
+            return
+        missing = [p for p in paths if p not in self._placeholders and p not in self._pixmaps]
+        if not missing:
+            return
+        try:
+            for path, data in self.placeholder_source(missing).items():
+                self._store_placeholder(path, data)
+        except Exception as e:
+            print(f"[Model] 读取占位图失败: {e}")
+
+    def _store_placeholder(self, path, data):
+        if not data:
+            return
+        self._placeholders[path] = data
+        while len(self._placeholders) > self.MAX_PLACEHOLDERS:
+            self._placeholders.popitem(last=False)
+
+    def _store_pixmap(self, path, thumb):
+        if isinstance(thumb, QImage):
+            if thumb.isNull():
+                return
+            if max(thumb.width(), thumb.height()) > self.PIXMAP_EDGE:
+                thumb = thumb.scaled(self.PIXMAP_EDGE, self.PIXMAP_EDGE, Qt.AspectRatioMode.KeepAspectRatio,
+                                     Qt.TransformationMode.SmoothTransformation)
+            thumb = QPixmap.fromImage(thumb)
+        self._pixmaps[path] = thumb
+        self._pixmaps.move_to_end(path)
+        self._placeholders.pop(path, None)
+        self._requested.discard(path)
+        while len(self._pixmaps) > self.MAX_PIXMAPS:
+            self._pixmaps.popitem(last=False)
+
+    def _request_thumbnail(self, path):
+        if path in self._requested:
+            return
+        self._requested.add(path)
+        self._pending_requests.append(path)
+        if not self._request_timer.isActive():
+            self._request_timer.start(0) # 合并同一轮绘制中的请求
+
+    def _flush_requests(self):
+        paths = [p for p in self._pending_requests if p not in self._pixmaps]
+        self._pending_requests = []
+        if paths:
+            self.thumbnails_requested.emit(paths)
+
+    # ---- 数据操作 ----
+    def set_images(self, paths, placeholders=None):
+        """批量重置为新的结果集 (一次 reset，而非逐行插入)"""
+        self.beginResetModel()
+        self._prefixes = []
+        self._prefix_ids = {}
+        self._dirs = array('I')
+        self._names = []
+        for path in paths:
+            prefix, name = self._split(path)
+            self._dirs.append(self._prefix_id(prefix))
+            self._names.append(name)
+        self._rebuild_index()
+        self._pixmaps.clear()
+        self._placeholders.clear()
+        self._requested.clear()
+        self._pending_requests = []
+        for path, data in (placeholders or {}).items():
+            self._store_placeholder(path, data)
+        self._loaded = 0
+        self.endResetModel()
+        # 立即暴露首屏
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def append_images(self, paths):
+        """在末尾追加一批行 (流式搜索的后续分页)，不重置视图"""
+        for path in paths:
+            prefix, name = self._split(path)
+            self._index_row(name, len(self._names))
+            self._dirs.append(self._prefix_id(prefix))
+            self._names.append(name)
+        # 首屏还没填满时直接暴露，其余等视图滚动到底再 fetchMore
+        if self._loaded < self.PAGE_SIZE and self.canFetchMore():
+            self.fetchMore()
+
+    def add_image(self, path, thumb=None, index=None, placeholder=None):
         """添加图片到模型"""
-        name = os.path.basename(path)
-        new_item = {'path': path, 'name': name, 'thumb': thumb}
-        
-        if index is None:
-            index = len(self.image_data)
-            self.beginInsertRows(QModelIndex(), index, index)
-            self.image_data.append(new_item)
-            self.endInsertRows()
+        if self.row_of(path) >= 0:
+            if thumb is not None:
+                self.update_thumbnail(path, thumb)
+            return
+        # 批量追加时 LRU 已满就不再缓存 (否则会挤掉首屏)，滚动到时再按需请求
+        if thumb is not None and (index is not None or len(self._pixmaps) < self.MAX_PIXMAPS):
+            self._store_pixmap(path, thumb)
+        if placeholder:
+            self._store_placeholder(path, placeholder)
+
+        prefix, name = self._split(path)
+        pid = self._prefix_id(prefix)
+        if index is None or index >= len(self._names):
+            row = len(self._names)
+            self._dirs.append(pid)
+            self._names.append(name)
+            self._index_row(name, row)
+            # 仍有未暴露的分页时，新行排在末尾等待 fetchMore
+            if self._loaded == row:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._loaded += 1
+                self.endInsertRows()
+            return
+
+        # 插入位置必须在已暴露区域内
+        index = min(max(0, index), self._loaded)
+        self.beginInsertRows(QModelIndex(), index, index)
+        # 通常插在头部：前面的行逐个前移并整体偏移，O(1)；插在后半部分时只平移其后的行
+        if index < len(self._names) - index:
+            self._shift_rows(0, index, -1)
+            self._row_base -= 1
         else:
-            self.beginInsertRows(QModelIndex(), index, index)
-            self.image_data.insert(index, new_item)
+            self._shift_rows(index, len(self._names), 1)
+        self._dirs.insert(index, pid)
+        self._names.insert(index, name)
+        self._index_row(name, index)
+        self._loaded += 1
+        self.endInsertRows()
+
+    def add_images(self, items):
+        """批量追加 [(path, thumb 或 None), ...]：整批一次 beginInsertRows，而不是逐行插入"""
+        new_paths = []
+        seen = set()
+        for path, thumb in items:
+            if path in seen or self.row_of(path) >= 0:
+                if thumb is not None:
+                    self.update_thumbnail(path, thumb)
+                continue
+            seen.add(path)
+            new_paths.append(path)
+            # 只为首屏附近的行立即转换 pixmap (缩放 + 上传在 UI 线程进行)，其余滚动到时再按需请求
+            if thumb is not None and len(self._names) + len(new_paths) <= self.EAGER_PIXMAP_ROWS:
+                self._store_pixmap(path, thumb)
+        if not new_paths:
+            return
+
+        start = len(self._names)
+        for path in new_paths:
+            prefix, name = self._split(path)
+            self._index_row(name, len(self._names))
+            self._dirs.append(self._prefix_id(prefix))
+            self._names.append(name)
+        # 已全部暴露时新批次直接可见；仍有未暴露的分页时排在末尾等待 fetchMore
+        if self._loaded == start:
+            self.beginInsertRows(QModelIndex(), start, len(self._names) - 1)
+            self._loaded = len(self._names)
             self.endInsertRows()
 
+    def remove_row(self, row):
+        """删除一行"""
+        if not (0 <= row < len(self._names)):
+            return
+        path = self.get_path(row)
+        visible = row < self._loaded
+        if visible:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        self._pixmaps.pop(path, None)
+        self._placeholders.pop(path, None)
+        self._requested.discard(path)
+        self._unindex_row(self._names[row], row)
+        if row < len(self._names) - 1 - row:
+            self._shift_rows(0, row, 1)
+            self._row_base += 1
+        else:
+            self._shift_rows(row + 1, len(self._names), -1)
+        self._dirs.pop(row)
+        self._names.pop(row)
+        if visible:
+            self._loaded -= 1
+            self.endRemoveRows()
+
     def update_thumbnail(self, path, thumb):
-        """更新已存在项的缩略图"""
-        for i, item in enumerate(self.image_data):
-            if item['path'] == path:
-                item['thumb'] = thumb
-                idx = self.index(i)
-                self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DecorationRole])
-                break
+        """更新已存在项的缩略图 (O(1))"""
+        row = self.row_of(path)
+        if row < 0:
+            return
+        self._store_pixmap(path, thumb)
+        if row < self._loaded:
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DecorationRole])
+
+    def update_thumbnails(self, items):
+        """批量更新缩略图 [(path, thumb), ...]，合并为一次 dataChanged"""
+        rows = []
+        for path, thumb in items:
+            row = self.row_of(path)
+            if row < 0:
+                continue
+            self._store_pixmap(path, thumb)
+            if row < self._loaded:
+                rows.append(row)
+        if rows:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)), [Qt.ItemDataRole.DecorationRole])
 
     def clear(self):
-        self.beginResetModel()
-        self.image_data = []
-        self.endResetModel()
-        
-    def get_path(self, index):
-        if 0 <= index < len(self.image_data):
-            return self.image_data[index]['path']
-        return None
+        self.set_images([])
+
+    def ensure_row_loaded(self, row):
+        """确保某一行已暴露给视图 (键盘导航/程序定位到尚未分页的行时使用)"""
+        while row >= self._loaded and self.canFetchMore():
+            self.fetchMore()
+        return row < self._loaded
@@ -1,25 +1,17 @@
 from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPixmapItem
-from PyQt6.QtCore import Qt, pyqtSignal, QThread
-from PyQt6.QtGui import QPixmap, QWheelEvent, QColor, QBrush, QPainter, QImage
+from PyQt6.QtCore import Qt, pyqtSignal, QRectF
+from PyQt6.QtGui import QPixmap, QWheelEvent, QColor, QBrush, QPainter, QImage, QImageReader, QTransform
 
-class AsyncImageLoader(QThread):
-    """异步加载图片的线程"""
-    loaded = pyqtSignal(QImage, str) # image, path
-    
-    def __init__(self, path):
-        super().__init__()
-        self.path = path
-        
-    def run(self):
-        # 即使在线程中，QImage 加载也是比较快的，主要是解码大图耗时
-        image = QImage(self.path)
-        if not self.isInterruptionRequested():
-            self.loaded.emit(image, self.path)
+from src.core.image_decoder import ImageDecoder
+from src.ui.widgets.tiled_image_item import TiledImageItem
 
 class ImageViewer(QGraphicsView):
     """
     基于 QGraphicsView 的图片查看器。支持自动适配窗口。
+    - 渐进显示：全图解码完成前先把缓存缩略图放大铺满原图尺寸
+    - 超大图 (≥ TILED_MIN_PIXELS) 改用分块 mipmap 渲染，只上传可见图块
     """
+    TILED_MIN_PIXELS = 4096 * 4096
     navigate_request = pyqtSignal(int) # -1: Prev, 1: Next
     view_changed = pyqtSignal(object, object) # transform, (h_val, v_val)
     
@@ -48,13 +40,19 @@ class ImageViewer(QGraphicsView):
         self.pixmap_item = QGraphicsPixmapItem()
         self.pixmap_item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
         self.scene.addItem(self.pixmap_item)
+        self.tiled_item = None
+        self._image_size = None # 原图尺寸 (预览阶段也按原图尺寸布局场景)
         
         self._zoom_factor = 1.15
         self.auto_fit = True 
         self._is_syncing = False # 防止信号环路
         
-        # 异步加载器
-        self._current_loader = None
+        # 共享解码器 (线程池 + 全图 LRU 缓存)，按路径匹配当前待显示的图片
+        self._decoder = ImageDecoder.shared()
+        self._decoder.decoded.connect(self._on_image_decoded)
+        self._pending_path = None
+        # 可选：返回缓存缩略图的回调 (path -> QImage)，用于全图解码前的预览
+        self.preview_source = None
 
     def set_background_color(self, color_str):
         """设置视图背景色"""
@@ -80,19 +78,23 @@ class ImageViewer(QGraphicsView):
 
     def clear_view(self):
         """清空显示并重置状态"""
+        self._pending_path = None
+        self._ensure_items()
+        self._remove_tiled_item()
         self.pixmap_item.setPixmap(QPixmap())
+        self._image_size = None
         self.auto_fit = True
         self.resetTransform()
 
-    def load_image(self, file_path):
-        """加载显示图片 (异步)"""
-        # 取消当前的加载任务
-        if self._current_loader and self._current_loader.isRunning():
-            self._current_loader.requestInterruption()
-            self._current_loader.wait(50) # 等待一小会儿，避免僵尸线程，但不阻塞太久
-            self._current_loader.deleteLater()
-            self._current_loader = None
-            
+    def has_image(self):
+        """是否有内容在显示 (预览或全图)"""
+        return self._image_size is not None
+
+    def image_size(self):
+        """当前图片的原图尺寸 (QSize)，无图片时为 None"""
+        return self._image_size
+
+    def _ensure_items(self):
         # 如果 pixmap_item 被意外删除（例如通过 scene.clear()），重新创建
         try:
             self.pixmap_item.isVisible()
@@ -100,46 +102,93 @@ class ImageViewer(QGraphicsView):
             self.pixmap_item = QGraphicsPixmapItem()
             self.pixmap_item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
             self.scene.addItem(self.pixmap_item)
+            self.tiled_item = None
 
-        # 启动新加载
-        self._current_loader = AsyncImageLoader(file_path)
-        self._current_loader.loaded.connect(self._on_image_loaded)
-        self._current_loader.start()
-        
-    def _on_image_loaded(self, image, path):
-        """异步加载完成回调"""
-        # 再次检查当前加载器是否匹配 (虽然我们在 load_image 里取消了旧的，但以防万一)
-        # 实际上因为每次 load_image 都会替换 _current_loader，
-        # 并 disconnect 信号 (如果对象被销毁)，这里基本安全。
-        # 为了极度严谨，可以检查 sender() == self._current_loader
-        
+    def _remove_tiled_item(self):
+        if self.tiled_item is not None:
+            try:
+                self.scene.removeItem(self.tiled_item)
+            except RuntimeError:
+                pass
+            self.tiled_item = None
+
+    def load_image(self, file_path):
+        """加载显示图片 (命中解码缓存时同步显示，否则先显示缩略图预览，全图交给后台线程池)"""
+        self._ensure_items()
+        self._pending_path = file_path
+        image = self._decoder.request(file_path)
+        if image is not None:
+            self._show_image(image)
+        else:
+            self._show_preview(file_path)
+
+    def _show_preview(self, file_path):
+        """把缓存缩略图按原图尺寸铺开，全图到达后原位替换，缩放和滚动位置保持不变"""
+        if self.preview_source is None:
+            return
+        try:
+            thumb = self.preview_source(file_path)
+        except Exception as e:
+            print(f"[Viewer] 读取预览失败: {e}")
+            return
+        if thumb is None or thumb.isNull():
+            return
+        size = QImageReader(file_path).size() # 只读文件头
+        if not size.isValid():
+            return
+        self._remove_tiled_item()
+        self.pixmap_item.setPixmap(QPixmap.fromImage(thumb))
+        self.pixmap_item.setTransform(QTransform.fromScale(size.width() / thumb.width(),
+                                                           size.height() / thumb.height()))
+        self._set_image_size(size)
+
+    def show_frame(self, image):
+        """显示不对应文件的图像 (如采样中的实时预览)，沿用当前的适配窗口/缩放状态"""
+        self._show_image(image)
+
+    def prefetch(self, paths):
+        """预解码即将浏览的图片 (列表中的前后若干张)"""
+        self._decoder.prefetch(paths)
+
+    def _on_image_decoded(self, path, image):
+        """后台解码完成：只处理本视图正在等待的那一张"""
+        if path != self._pending_path:
+            return
+        self._show_image(image)
+
+    def _show_image(self, image):
+        self._pending_path = None
         if image.isNull():
             return
-            
-        pixmap = QPixmap.fromImage(image)
-        self.pixmap_item.setPixmap(pixmap)
-        self.setSceneRect(self.pixmap_item.boundingRect()) 
+
+        self._ensure_items()
+        self._remove_tiled_item()
+        self.pixmap_item.setTransform(QTransform())
+        if image.width() * image.height() >= self.TILED_MIN_PIXELS:
+            self.pixmap_item.setPixmap(QPixmap())
+            self.tiled_item = TiledImageItem(image)
+            self.scene.addItem(self.tiled_item)
+        else:
+            self.pixmap_item.setPixmap(QPixmap.fromImage(image))
+        self._set_image_size(image.size())
+
+    def _set_image_size(self, size):
+        self._image_size = size
+        self.setSceneRect(QRectF(0, 0, size.width(), size.height()))
         if self.auto_fit:
             self.fit_to_window()
-        
-        # 清理
-        sender = self.sender()
-        if sender:
-            sender.deleteLater()
-        if sender == self._current_loader:
-            self._current_loader = None
 
     def fit_to_window(self):
         """适应窗口 (完整显示并居中)"""
         self.auto_fit = True
-        if not self.pixmap_item.pixmap().isNull():
-            self.fitInView(self.pixmap_item, Qt.AspectRatioMode.KeepAspectRatio)
+        if self.has_image():
+            self.fitInView(self.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
             
     def toggle_fill_mode(self):
         """铺满窗口 (Crop模式，消除所有黑边)"""
         self.auto_fit = True
-        if not self.pixmap_item.pixmap().isNull():
-            self.fitInView(self.pixmap_item, Qt.AspectRatioMode.KeepAspectRatioByExpanding)
+        if self.has_image():
+            self.fitInView(self.sceneRect(), Qt.AspectRatioMode.KeepAspectRatioByExpanding)
             
     def fit_to_original(self):
         """1:1 原始大小"""
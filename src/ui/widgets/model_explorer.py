@@ -93,6 +93,20 @@ class ModelExplorer(QWidget):
             self.combo_lora.setCurrentIndex(0)
         self.combo_lora.blockSignals(False)
 
+    def merge_counts(self, models, loras):
+        """把新入库图片的模型/LoRA 计数 ({name: 增量}) 合并进当前列表，不查询数据库"""
+        if not models and not loras:
+            return
+        self.update_models(self._merge(self.raw_models, models), self._merge(self.raw_loras, loras))
+
+    @staticmethod
+    def _merge(items, delta):
+        counts = {name: count for name, count in items}
+        for name, count in (delta or {}).items():
+            counts[name] = counts.get(name, 0) + count
+        # 与数据库聚合一致：按数量降序
+        return sorted(counts.items(), key=lambda x: x[1], reverse=True)
+
     def _on_model_selected(self, index):
         if index < 0: return
         name = self.combo_model.itemData(index)
@@ -16,6 +16,10 @@ import re
 import uuid
 from datetime import datetime
 from src.assets.default_workflows import DEFAULT_T2I_WORKFLOW
+from src.core.coalescer import LatestValueCoalescer, LogRingBuffer
+from src.core.model_catalog import ModelFileCatalog
+from src.core.model_resolver import ModelNameResolver
+from src.core.workflow_template import WorkflowTemplate
 
 
 def parse_compare_weights_expression(text: str) -> List[float]:
@@ -482,8 +486,8 @@ class ParameterPanel(QWidget):
     remote_gen_requested = pyqtSignal(dict, int, bool) # 请求远程生成 (带workflow, 批次数量, 是否随机seed)
     compare_generate_requested = pyqtSignal(dict) # LoRA 对比生成请求
     
-    # 日志系统:使用简单的列表,不用信号
-    generation_logs = []  # 类变量,存储所有生成日志
+    # 日志系统:有上限的环形缓冲区,不用信号 (主窗口按序号增量读取)
+    generation_logs = LogRingBuffer(2000)  # 类变量,存储所有生成日志
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -496,6 +500,9 @@ class ParameterPanel(QWidget):
         self.current_loras = {} # 存储当前选中的LoRA {name: weight}
         self.current_lora_meta = {} # 存储LoRA附加信息 {name: {note, prompt, auto_use_prompt}}
         self._ai_is_processing = False # AI处理并发锁
+        # 流式输出按帧合并：token 先攒在缓冲里，每帧最多写一次输入框
+        self._stream_coalescer = LatestValueCoalescer(33, self)
+        self._stream_chunks = {}
         self._img_prompt_processing = False
         self._img_prompt_loading_button = None
         self._img_original_prompt = None
@@ -804,6 +811,23 @@ class ParameterPanel(QWidget):
         finally:
             self.resolution_combo.blockSignals(False)
 
+    def merge_history(self, resolutions, samplers, schedulers):
+        """把新图片用到的分辨率/采样器/调度器并入下拉框，只有出现新取值时才重建"""
+        history = list(getattr(self, "last_history_res", []))
+        new_res = [r for r in resolutions if r not in history]
+        if new_res:
+            self._populate_resolutions(getattr(self, "last_preset_res", []), sorted(history + new_res))
+        for combo, values in ((self.sampler_combo, samplers), (self.scheduler_combo, schedulers)):
+            missing = [v for v in values if v and combo.findText(v) < 0]
+            if not missing:
+                continue
+            combo.blockSignals(True)
+            try:
+                for value in missing:
+                    combo.addItem(value)
+            finally:
+                combo.blockSignals(False)
+
     def _open_resolution_manager(self):
         """打开分辨率管理对话框"""
         from src.ui.dialogs.resolution_manager_dialog import ResolutionManagerDialog
@@ -1948,16 +1972,14 @@ class ParameterPanel(QWidget):
     def _get_all_loras(self):
         main_window = self.window()
         all_loras = []
+        seen = set()
         comfy_loras = self._get_comfyui_loras()
-        if comfy_loras is not None and len(comfy_loras) >= 0:
-            for name in comfy_loras:
-                if name and name not in all_loras:
-                    all_loras.append(name)
-            if self.settings.value("comfy_root", "", type=str):
-                return all_loras
         for name in comfy_loras:
-            if name and name not in all_loras:
+            if name and name not in seen:
+                seen.add(name)
                 all_loras.append(name)
+        if self.settings.value("comfy_root", "", type=str):
+            return all_loras
         comfy_basenames = set()
         for name in comfy_loras:
             base = os.path.basename(name).lower()
@@ -1975,7 +1997,8 @@ class ParameterPanel(QWidget):
                     base_no = os.path.splitext(base)[0]
                     if base in comfy_basenames or base_no in comfy_basenames:
                         continue
-                if name and name not in all_loras:
+                if name and name not in seen:
+                    seen.add(name)
                     all_loras.append(name)
         return all_loras
 
@@ -2008,15 +2031,11 @@ class ParameterPanel(QWidget):
             target_path = lora_dir if lora_dir else os.path.join(base, "models", "loras")
             self._last_comfyui_lora_status = f"未找到目录: {target_path}"
             return []
-        results = []
         exts = (".safetensors", ".ckpt", ".pt", ".sft")
-        for root, _, files in os.walk(lora_dir):
-            for fname in files:
-                if fname.lower().endswith(exts):
-                    full_path = os.path.join(root, fname)
-                    rel_path = os.path.relpath(full_path, lora_dir).replace("\\", "/")
-                    if rel_path not in results:
-                        results.append(rel_path)
+        # 目录 mtime 未变时直接复用上次的清单，不再每次打开选择器都 os.walk
+        catalog = ModelFileCatalog.shared()
+        results = catalog.list_files(lora_dir, exts)
+        results = self._stable_asset_list("lora", (lora_dir, catalog.version), results)
         self.available_loras = results
         if results:
             self._last_comfyui_lora_status = f"已读取 {len(results)} 个 LoRA"
@@ -2045,22 +2064,22 @@ class ParameterPanel(QWidget):
         }
         dir_candidates = alias_map.get(subdir, [subdir])
         results = []
+        seen = set()
         exts = (".safetensors", ".ckpt", ".pt", ".sft", ".pth", ".bin", ".gguf")
         searched_dirs = []
         existing_dirs = []
+        catalog = ModelFileCatalog.shared()
         for name in dir_candidates:
             target_dir = os.path.join(models_root, name)
             searched_dirs.append(target_dir)
             if not os.path.isdir(target_dir):
                 continue
             existing_dirs.append(target_dir)
-            for root, _, files in os.walk(target_dir):
-                for fname in files:
-                    if fname.lower().endswith(exts):
-                        full_path = os.path.join(root, fname)
-                        rel_path = os.path.relpath(full_path, target_dir).replace("\\", "/")
-                        if rel_path not in results:
-                            results.append(rel_path)
+            for rel_path in catalog.list_files(target_dir, exts):
+                if rel_path not in seen:
+                    seen.add(rel_path)
+                    results.append(rel_path)
+        results = self._stable_asset_list(subdir, (models_root, catalog.version), results)
         if not hasattr(self, "_last_comfyui_model_status"):
             self._last_comfyui_model_status = {}
         if results:
@@ -2072,6 +2091,19 @@ class ParameterPanel(QWidget):
                 self._last_comfyui_model_status[subdir] = f"目录为空: {existing_dirs[0]}"
         return results
 
+    def _stable_asset_list(self, kind: str, key: tuple, results: List[str]) -> List[str]:
+        """
+        同一目录且 ModelFileCatalog.version 未变时清单内容不变，沿用上次返回的列表对象，
+        名称解析索引 (_name_resolver) 按对象即可判定命中
+        """
+        if not hasattr(self, "_asset_lists"):
+            self._asset_lists = {}
+        cached = self._asset_lists.get(kind)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        self._asset_lists[kind] = (key, results)
+        return results
+
     def _refresh_comfyui_assets(self):
         self.available_loras = self._get_comfyui_loras()
         self.available_checkpoints = self._get_comfyui_models("checkpoints")
@@ -2354,6 +2386,7 @@ class ParameterPanel(QWidget):
             lora_guidance=self._build_lora_guidance_payload(),
         )
         self._img_stream_started = False
+        self._drop_stream("img")
         self.current_img_worker.stream_update.connect(self._on_img_stream_update)
         self.current_img_worker.finished.connect(lambda s, r: self._on_image_prompt_finished(s, r, original_prompt))
         self.current_img_worker.start()
@@ -2380,6 +2413,7 @@ class ParameterPanel(QWidget):
             self.current_img_worker.is_cancelled = True
         self._img_prompt_processing = False
         self.current_img_worker = None
+        self._drop_stream("img")
         if self._img_stream_started and self._img_original_prompt is not None:
             self.prompt_edit.setPlainText(self._img_original_prompt)
         self._img_stream_started = False
@@ -2387,13 +2421,31 @@ class ParameterPanel(QWidget):
         self._reset_image_prompt_ui()
         self._temp_notify("🚫 已取消识图")
 
+    def _queue_stream_chunk(self, key, chunk, callback, *args):
+        self._stream_chunks.setdefault(key, []).append(chunk)
+        self._stream_coalescer.submit(key, callback, *args)
+
+    def _take_stream_text(self, key):
+        return "".join(self._stream_chunks.pop(key, []))
+
+    def _drop_stream(self, key):
+        """丢弃尚未写入输入框的流式内容 (任务结束/取消时)"""
+        self._stream_coalescer.cancel(key)
+        self._stream_chunks.pop(key, None)
+
     def _on_img_stream_update(self, chunk):
         if not self._img_prompt_processing:
             return
+        self._queue_stream_chunk("img", chunk, self._flush_img_stream)
+
+    def _flush_img_stream(self):
+        text = self._take_stream_text("img")
+        if not self._img_prompt_processing or not text:
+            return
         if not hasattr(self, "_img_stream_started") or not self._img_stream_started:
             self.prompt_edit.clear()
             self._img_stream_started = True
-        self.prompt_edit.insertPlainText(chunk)
+        self.prompt_edit.insertPlainText(text)
         cursor = self.prompt_edit.textCursor()
         cursor.movePosition(cursor.MoveOperation.End)
         self.prompt_edit.setTextCursor(cursor)
@@ -2401,6 +2453,7 @@ class ParameterPanel(QWidget):
     def _on_image_prompt_finished(self, success, result, original_prompt):
         if not self._img_prompt_processing:
             return
+        self._drop_stream("img")
         self._img_prompt_processing = False
         self._reset_image_prompt_ui()
         self.current_img_worker = None
@@ -2646,8 +2699,13 @@ class ParameterPanel(QWidget):
         target_edit.setPlainText(text)
 
     def _on_ai_stream_update(self, chunk, is_negative):
-        """处理AI流式输出更新"""
+        """处理AI流式输出更新 (按帧合并后写入)"""
         if not self._ai_is_processing: return
+        self._queue_stream_chunk("ai", chunk, self._flush_ai_stream, is_negative)
+
+    def _flush_ai_stream(self, is_negative):
+        text = self._take_stream_text("ai")
+        if not self._ai_is_processing or not text: return
         
         target_edit = self.neg_prompt_edit if is_negative else self.prompt_edit
         
@@ -2656,7 +2714,7 @@ class ParameterPanel(QWidget):
             target_edit.clear()
             self._ai_stream_started = True
             
-        target_edit.insertPlainText(chunk)
+        target_edit.insertPlainText(text)
         # 滚动到底部
         cursor = target_edit.textCursor()
         cursor.movePosition(cursor.MoveOperation.End)
@@ -2674,6 +2732,7 @@ class ParameterPanel(QWidget):
             return
 
         self._ai_is_processing = False
+        self._drop_stream("ai")
         target_btn.setText("AI")
         target_btn.setEnabled(True)
         self.current_ai_worker = None
@@ -2723,6 +2782,7 @@ class ParameterPanel(QWidget):
             
             # Reset UI
             self._ai_is_processing = False
+            self._drop_stream("ai")
             target_btn.setText("AI")
             # status_label.setText("🚫 已取消") # Label removed
             if hasattr(self, '_temp_notify'): self._temp_notify("🚫 已取消")
@@ -2810,6 +2870,7 @@ class ParameterPanel(QWidget):
         
         # 连接流式更新信号
         self._ai_stream_started = False
+        self._drop_stream("ai")
         self.current_ai_worker.stream_update.connect(lambda chunk: self._on_ai_stream_update(chunk, is_negative))
         
         self.current_ai_worker.start()
@@ -3504,47 +3565,28 @@ class ParameterPanel(QWidget):
         numeric_ids = [int(k) for k in workflow.keys() if str(k).isdigit()]
         return str((max(numeric_ids) if numeric_ids else 0) + 1)
 
-    def _find_prompt_node_ids_for_workflow(self, workflow: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
-        # 首选 KSampler 的 positive/negative 回链
-        for _, node in workflow.items():
-            ctype = str(node.get("class_type", "")).lower()
-            if "ksampler" not in ctype:
-                continue
-            inputs = node.get("inputs", {})
-            pos_link = inputs.get("positive")
-            neg_link = inputs.get("negative")
-            pos_id = str(pos_link[0]) if isinstance(pos_link, list) and pos_link else None
-            neg_id = str(neg_link[0]) if isinstance(neg_link, list) and neg_link else None
-            return pos_id, neg_id
-        return None, None
-
     def _apply_compare_loras(
         self,
         workflow: Dict[str, Any],
-        lora_items: List[Tuple[str, float]]
+        lora_items: List[Tuple[str, float]],
+        template: WorkflowTemplate
     ) -> List[str]:
         missing_loras: List[str] = []
-        lora_nodes = []
-        for nid, node in workflow.items():
-            ctype = str(node.get("class_type", "")).lower()
-            if "loraloader" in ctype:
-                try:
-                    sort_id = int(nid)
-                except Exception:
-                    sort_id = 10**9
-                lora_nodes.append((sort_id, str(nid)))
-        lora_nodes.sort(key=lambda x: x[0])
+        chain_ids = list(template.slots.lora_loaders)
 
-        if not lora_nodes:
+        if not chain_ids:
             return [name for name, _ in lora_items]
 
-        first_id = lora_nodes[0][1]
+        first_id = chain_ids[0]
         first_node = workflow.get(first_id, {})
         first_inputs = first_node.get("inputs", {})
-        chain_ids = [nid for _, nid in lora_nodes]
 
         # 如果节点数量不足，则按首个 LoRA 节点链式扩容
         if len(lora_items) > len(chain_ids) and "model" in first_inputs:
+            # 需要改写任意节点的连线，先整体深拷贝
+            template.materialize(workflow)
+            first_node = workflow[first_id]
+            first_inputs = first_node.get("inputs", {})
             prev_id = first_id
             appended_ids = []
             for _ in range(len(lora_items) - len(chain_ids)):
@@ -3575,12 +3617,11 @@ class ParameterPanel(QWidget):
                         elif value[1] == 1 and "clip" in first_inputs:
                             inputs[key] = [final_id, 1]
 
-                chain_ids = [nid for _, nid in lora_nodes] + appended_ids
+                chain_ids = chain_ids + appended_ids
 
         # baseline 或多余节点都要静音
         for idx, nid in enumerate(chain_ids):
-            node = workflow.get(nid, {})
-            inputs = node.get("inputs", {})
+            inputs = template.inputs_for_write(workflow, nid) if nid in workflow else {}
             if idx < len(lora_items):
                 lora_name, lora_weight = lora_items[idx]
                 resolved = self._find_best_lora_match(lora_name)
@@ -3602,18 +3643,27 @@ class ParameterPanel(QWidget):
 
         return sorted(set(missing_loras))
 
+    def _default_workflow_template(self) -> WorkflowTemplate:
+        """标准模板的注入点只分析一次"""
+        if getattr(self, "_t2i_template", None) is None:
+            self._t2i_template = WorkflowTemplate.compile(DEFAULT_T2I_WORKFLOW)
+        return self._t2i_template
+
     def _build_compare_workflow(self, variant: Dict[str, Any], seed_mode: str) -> Dict[str, Any]:
-        workflow = copy.deepcopy(DEFAULT_T2I_WORKFLOW)
+        # 只复制被修改的节点，其余节点与模板共享
+        template = self._default_workflow_template()
+        slots = template.slots
+        workflow = template.render()
 
         prompt_text = self.prompt_edit.toPlainText().strip()
         neg_text = self.neg_prompt_edit.toPlainText().strip()
         prompt_text, _ = self._merge_prompt_with_lora_extras(prompt_text)
 
-        pos_id, neg_id = self._find_prompt_node_ids_for_workflow(workflow)
+        pos_id, neg_id = slots.sampler_prompts
         if pos_id and pos_id in workflow:
-            workflow[pos_id].setdefault("inputs", {})["text"] = prompt_text
+            template.inputs_for_write(workflow, pos_id)["text"] = prompt_text
         if neg_id and neg_id in workflow:
-            workflow[neg_id].setdefault("inputs", {})["text"] = neg_text
+            template.inputs_for_write(workflow, neg_id)["text"] = neg_text
 
         res_data = self.resolution_combo.currentData()
         user_width, user_height = res_data if res_data else (1200, 1600)
@@ -3626,60 +3676,47 @@ class ParameterPanel(QWidget):
         if seed_mode == "random" and seed_value is None:
             seed_value = random.SystemRandom().randint(10**17, 18446744073709551614)
 
-        for node_id, node in workflow.items():
-            class_type = str(node.get("class_type", "")).lower()
-            inputs = node.setdefault("inputs", {})
-
-            if "ksampler" in class_type:
-                if "seed" in inputs and seed_value is not None:
-                    inputs["seed"] = int(seed_value)
-                if "steps" in inputs:
-                    inputs["steps"] = user_steps
-                if "cfg" in inputs:
-                    inputs["cfg"] = user_cfg
-                if "sampler_name" in inputs and user_sampler:
-                    inputs["sampler_name"] = user_sampler
-                if "scheduler" in inputs and user_scheduler:
-                    inputs["scheduler"] = user_scheduler
-
-            if "latentimage" in class_type and "empty" in class_type:
-                if "width" in inputs:
-                    inputs["width"] = user_width
-                if "height" in inputs:
-                    inputs["height"] = user_height
-                if "batch_size" in inputs:
-                    inputs["batch_size"] = 1
-
-            if "checkpointloader" in class_type and "ckpt_name" in inputs:
-                selected_model = self.model_combo.currentText() if hasattr(self, "model_combo") else ""
-                if selected_model and selected_model != "自动":
-                    resolved_model = self._find_best_model_match(selected_model)
-                    if resolved_model:
-                        inputs["ckpt_name"] = resolved_model
-
-            if "unetloader" in class_type and "unet_name" in inputs:
-                selected_unet = self.unet_combo.currentText() if hasattr(self, "unet_combo") else ""
-                if selected_unet and selected_unet != "自动":
-                    resolved_unet = self._find_best_unet_match(selected_unet)
-                    if resolved_unet:
-                        inputs["unet_name"] = resolved_unet
-
-            if "vaeloader" in class_type and "vae_name" in inputs:
-                selected_vae = self.vae_combo.currentText() if hasattr(self, "vae_combo") else ""
-                if selected_vae and selected_vae != "自动":
-                    resolved_vae = self._find_best_vae_match(selected_vae)
-                    if resolved_vae:
-                        inputs["vae_name"] = resolved_vae
-
-            if "cliploader" in class_type and "clip_name" in inputs:
-                selected_clip = self.clip_combo.currentText() if hasattr(self, "clip_combo") else ""
-                if selected_clip and selected_clip != "自动":
-                    resolved_clip = self._find_best_clip_match(selected_clip)
-                    if resolved_clip:
-                        inputs["clip_name"] = resolved_clip
+        for node_id in slots.samplers:
+            inputs = template.inputs_for_write(workflow, node_id)
+            if "seed" in inputs and seed_value is not None:
+                inputs["seed"] = int(seed_value)
+            if "steps" in inputs:
+                inputs["steps"] = user_steps
+            if "cfg" in inputs:
+                inputs["cfg"] = user_cfg
+            if "sampler_name" in inputs and user_sampler:
+                inputs["sampler_name"] = user_sampler
+            if "scheduler" in inputs and user_scheduler:
+                inputs["scheduler"] = user_scheduler
+
+        for node_id in slots.latents:
+            inputs = template.inputs_for_write(workflow, node_id)
+            if "width" in inputs:
+                inputs["width"] = user_width
+            if "height" in inputs:
+                inputs["height"] = user_height
+            if "batch_size" in inputs:
+                inputs["batch_size"] = 1
+
+        loader_slots = (
+            (slots.checkpoint_loaders, "ckpt_name", "model_combo", self._find_best_model_match),
+            (slots.unet_loaders, "unet_name", "unet_combo", self._find_best_unet_match),
+            (slots.vae_loaders, "vae_name", "vae_combo", self._find_best_vae_match),
+            (slots.clip_loaders, "clip_name", "clip_combo", self._find_best_clip_match),
+        )
+        for node_ids, input_key, combo_name, resolve in loader_slots:
+            for node_id in node_ids:
+                if input_key not in workflow[node_id].get("inputs", {}):
+                    continue
+                combo = getattr(self, combo_name, None)
+                selected = combo.currentText() if combo is not None else ""
+                if selected and selected != "自动":
+                    resolved = resolve(selected)
+                    if resolved:
+                        template.inputs_for_write(workflow, node_id)[input_key] = resolved
 
         lora_items = variant.get("lora_items", [])
-        missing_loras = self._apply_compare_loras(workflow, lora_items)
+        missing_loras = self._apply_compare_loras(workflow, lora_items, template)
         if missing_loras:
             self._temp_notify(f"⚠️ LoRA 未匹配到: {'、'.join(missing_loras)}")
         return workflow
@@ -3808,15 +3845,10 @@ class ParameterPanel(QWidget):
         
         # 始终使用标准模板workflow (不再参照图片)
         self._log("[Main] 使用<标准模版>工作流")
-        raw_workflow = DEFAULT_T2I_WORKFLOW
 
-        # 深拷贝以防污染原始数据
-        try:
-            workflow = copy.deepcopy(raw_workflow)
-        except Exception as e:
-            self._log(f"Workflow 深拷贝失败: {e}")
-            _restore_btn()
-            return
+        # 只复制被修改的节点，原始模板不会被污染
+        template = self._default_workflow_template()
+        workflow = template.render()
         self._refresh_comfyui_assets()
             
         params = self.current_meta.get('params', {}) if self.current_meta else {} 
@@ -3827,72 +3859,6 @@ class ParameterPanel(QWidget):
         self._log(f"[Comfy] 已附加 LoRA 提示词: {lora_prompt_count} 条")
         
         # 1. 注入提示词 (智能追踪版)
-        def find_prompt_nodes_by_tracing(wf):
-            """
-            通过遍历图结构寻找提示词节点 (KSampler -> positive/negative -> CLIPTextEncode)
-            返回: (pos_id, neg_id)
-            """
-            ks_nodes = []
-            # 1. 找 所有 KSampler
-            for nid, node in wf.items():
-                ctype = node.get('class_type', '').lower()
-                if 'ksampler' in ctype:
-                    ks_nodes.append(node)
-            
-            if not ks_nodes: return None, None
-            
-            # 使用第一个 KSampler 进行追踪
-            ks_node = ks_nodes[0]
-            
-            def trace_back(current_node_id, visited=None):
-                if visited is None: visited = set()
-                if current_node_id in visited: return None
-                visited.add(current_node_id)
-                
-                curr_node = wf.get(str(current_node_id))
-                if not curr_node: return None
-                
-                ctype = curr_node.get('class_type', '').lower()
-                
-                # 找到目标
-                if 'cliptextencode' in ctype:
-                    return str(current_node_id)
-                
-                # 🛑 阻断逻辑：遇到 ZeroOut/SetArea/Avg 等修改/衍生 Conditioning 的节点，停止回溯
-                # 这些节点通常意味着当前的 conditioning 是从另一个 conditioning 衍生出来的（例如把正向转为负向）
-                # 我们不希望追踪到原始的 source (即正向提示词节点)
-                if 'zeroout' in ctype or 'setarea' in ctype or 'combine' in ctype or 'average' in ctype:
-                    return None
-                    
-                # 穿透逻辑 (Conditioning 传递)
-                # 检查 inputs 中是否有连接到其他节点的 conditioning/positive/negative
-                inputs = curr_node.get('inputs', {})
-                for k, v in inputs.items():
-                    # 常见的穿透键名
-                    if k in ['conditioning', 'positive', 'negative', 'clip', 'samples'] or True: # 激进策略：检查所有输入
-                        if isinstance(v, list) and len(v) >= 1:
-                            source_id = str(v[0])
-                            # 递归寻找
-                            res = trace_back(source_id, visited)
-                            if res: return res
-                return None
-
-            # 从 KSampler 的 inputs 开始回溯
-            pos_id = None
-            neg_id = None
-            
-            inputs = ks_node.get('inputs', {})
-            
-            # 找 positive
-            if 'positive' in inputs and isinstance(inputs['positive'], list):
-                pos_id = trace_back(str(inputs['positive'][0]))
-                
-            # 找 negative
-            if 'negative' in inputs and isinstance(inputs['negative'], list):
-                neg_id = trace_back(str(inputs['negative'][0]))
-                
-            return pos_id, neg_id
-
         # 优先使用 Metadata ID
         pos_node_id = self.current_meta.get('prompt_node_id')
         neg_node_id = self.current_meta.get('negative_prompt_node_id')
@@ -3901,7 +3867,7 @@ class ParameterPanel(QWidget):
         if not pos_node_id or not neg_node_id or pos_node_id == neg_node_id or \
            pos_node_id not in workflow or neg_node_id not in workflow:
             self._log("[Comfy] ⚠️ Prompt ID 无效或冲突(相同)，尝试智能图追踪...")
-            found_pos, found_neg = find_prompt_nodes_by_tracing(workflow)
+            found_pos, found_neg = template.slots.traced_prompts
             
             if found_pos:
                 pos_node_id = found_pos
@@ -3915,13 +3881,13 @@ class ParameterPanel(QWidget):
         
         # 执行注入
         if pos_node_id and pos_node_id in workflow:
-            workflow[pos_node_id]['inputs']['text'] = new_prompt
+            template.inputs_for_write(workflow, pos_node_id)['text'] = new_prompt
             self._log(f"[Comfy] -> 正向提示词注入节点: {pos_node_id} (CLIPTextEncode)")
         else:
             self._log(f"[Comfy] ⚠️ 注入失败: 未找到正向提示词节点")
 
         if neg_node_id and neg_node_id in workflow:
-            workflow[neg_node_id]['inputs']['text'] = new_neg
+            template.inputs_for_write(workflow, neg_node_id)['text'] = new_neg
             self._log(f"[Comfy] -> 反向提示词注入节点: {neg_node_id} (CLIPTextEncode)")
         else:
             self._log(f"[Comfy] ⚠️ 注入失败: 未找到反向提示词节点")
@@ -3978,9 +3944,10 @@ class ParameterPanel(QWidget):
         self._log(f"\n[Comfy] 开始遍历workflow节点...")
         modified_nodes = []
         
-        for node_id, node in workflow.items():
+        for node_id in template.slots.injectable:
+            node = workflow[node_id]
             class_type = node.get('class_type', '').lower()
-            inputs = node.get('inputs', {})
+            inputs = template.inputs_for_write(workflow, node_id)
             
             # print(f"[Comfy] 检查节点 {node_id}: {node.get('class_type')} ({class_type})")
             
@@ -4119,20 +4086,8 @@ class ParameterPanel(QWidget):
         # --- 专门处理 LoRA 注入 (更健壮的逻辑) ---
         if self.current_loras:
             missing_loras = set()
-            # 1. 找到所有 LoraLoader 和 LoraLoaderModelOnly 节点
-            lora_nodes = []
-            for nid, node in workflow.items():
-                node_class = node.get('class_type', '').lower()
-                if 'loraloader' in node_class:  # 匹配 LoraLoader 和 LoraLoaderModelOnly
-                    # 尝试将ID转为整数以便正确排序 ('9' < '10')
-                    try:
-                        nid_int = int(nid)
-                    except:
-                        nid_int = 999999
-                    lora_nodes.append((nid_int, nid, node))
-            
-            # 2. 按ID排序，确保顺序一致
-            lora_nodes.sort(key=lambda x: x[0])
+            # 1. 所有 LoraLoader 和 LoraLoaderModelOnly 节点 (模板中已按ID数值排序，'9' < '10')
+            lora_nodes = [(nid, workflow[nid]) for nid in template.slots.lora_loaders]
             
             # 3. 按顺序注入
             lora_list = list(self.current_loras.items())
@@ -4229,6 +4184,8 @@ class ParameterPanel(QWidget):
 
                 # 目前只支持注入第一个 LoRA (多 LoRA 链式注入太复杂)
                 if lora_list:
+                    # 自动注入会改写任意节点的连线，先整体深拷贝
+                    template.materialize(workflow)
                     first_lora_name, first_lora_weight = lora_list[0]
                     if try_inject_lora_node(workflow, first_lora_name, first_lora_weight):
                         self._temp_notify("✨ 已自动为您即时修补工作流以支持 LoRA")
@@ -4247,8 +4204,8 @@ class ParameterPanel(QWidget):
             if not lora_nodes:
                  pass # 已处理 (要么注入成功，要么失败)
             else:
-                for i, (nid_int, nid, node) in enumerate(lora_nodes):
-                    inputs = node.get('inputs', {})
+                for i, (nid, node) in enumerate(lora_nodes):
+                    inputs = template.inputs_for_write(workflow, nid)
                     if i < len(lora_list):
                         lora_name, lora_weight = lora_list[i]
                         resolved_lora_name = self._find_best_lora_match(lora_name)
@@ -4297,6 +4254,16 @@ class ParameterPanel(QWidget):
         self.available_models = models
         # print(f"[UI] 已接收可用模型列表: {len(models)} 个")
 
+    def _name_resolver(self, kind: str, names: List[str]) -> ModelNameResolver:
+        """按类别缓存名称解析索引，列表对象变化时才重建 (未变的类别不受影响)"""
+        if not hasattr(self, "_name_resolvers"):
+            self._name_resolvers = {}
+        resolver = self._name_resolvers.get(kind)
+        if resolver is None or not resolver.matches(names):
+            resolver = ModelNameResolver(names, previous=resolver)
+            self._name_resolvers[kind] = resolver
+        return resolver
+
     def _find_best_model_match(self, ui_name: str) -> str:
         """在可用模型列表中寻找最佳匹配 (优先精准，后包含)"""
         available = []
@@ -4306,127 +4273,29 @@ class ParameterPanel(QWidget):
             available = self.available_checkpoints
         if not available:
             return None
-            
-        # 0. 预处理：移除潜在的 "🎨 " 前缀 (防守性编程)
-        clean_name = ui_name.replace("🎨 ", "").strip()
-        
-        # 1. 精确匹配
-        if clean_name in available:
-            return clean_name
-            
-        # 2. 尝试加上 .safetensors 或 .ckpt 后匹配
-        for ext in ['.safetensors', '.ckpt', '.pt', '.sft']:
-            if clean_name + ext in available:
-                return clean_name + ext
-        
-        # 3. 忽略路径匹配 (ui_name = "model.safetensors", available = "SDXL/model.safetensors")
-        for m in available:
-            if m.endswith(clean_name) or m.endswith(clean_name + ".safetensors"):
-                return m
-                
-        # 4. 模糊包含匹配 (最宽松 - 慎用，但在不匹配时好过没有)
-        # ui_name = "turbo_bf16" -> "z_image_turbo_bf16.safetensors"
-        for m in available:
-            if clean_name in m:
-                return m
-                
-        return None
+        # 精确 → 补扩展名 → 忽略路径 (后缀) → 模糊包含，见 ModelNameResolver
+        return self._name_resolver("model", available).resolve(ui_name)
 
     def _find_best_lora_match(self, ui_name: str) -> str:
         if not hasattr(self, 'available_loras') or not self.available_loras:
             return None
-        
         # ui_name 可能是绝对路径 (来自新选择器) 也可能是相对路径/文件名 (来自旧保存/输入)
-        clean_name = ui_name.replace("🎨 ", "").strip()
-        clean_lower = clean_name.lower().replace("\\", "/") # 归一化查找
-        
-        # 1. 尝试直接匹配 (精确)
-        if clean_name in self.available_loras:
-            return clean_name
-        
-        # 2. 尝试匹配相对路径 (如果 ui_name 是绝对路径)
-        # 遍历 available_loras (它们通常是相对路径)，看是否 ui_name 以它结尾
-        # 例如: ui_name = "D:/ComfyUI/models/loras/style/anime.safetensors"
-        # available = "style/anime.safetensors"
-        # -> ui_name.endswith(available) -> True
-        for m in self.available_loras:
-            m_norm = m.replace("\\", "/")
-            if clean_lower.endswith(m_norm.lower()):
-                 return m
-        
-        # 3. 尝试扩展名匹配
-        for ext in ['.safetensors', '.ckpt', '.pt', '.sft']:
-            if clean_name + ext in self.available_loras:
-                return clean_name + ext
-        
-        # 4. 尝试文件名匹配 (最宽松)
-        base_clean = os.path.basename(clean_name).lower()
-        base_no_ext = os.path.splitext(base_clean)[0]
-        
-        candidates = []
-        for m in self.available_loras:
-            base = os.path.basename(m).lower()
-            base_no = os.path.splitext(base)[0]
-            if base == base_clean or base_no == base_no_ext:
-                candidates.append(m)
-        
-        if len(candidates) >= 1:
-            # 如果有多个候选 (比如不同文件夹下同名)，优先选最短的(通常是根目录)? 或者选第一个
-            # 这里简单选第一个
-            return candidates[0]
-            
-        return None
+        return self._name_resolver("lora", self.available_loras).resolve_lora(ui_name)
 
     def _find_best_unet_match(self, ui_name: str) -> str:
         if not hasattr(self, 'available_unets') or not self.available_unets:
             return None
-        clean_name = ui_name.replace("🎨 ", "").strip()
-        if clean_name in self.available_unets:
-            return clean_name
-        for ext in ['.safetensors', '.ckpt', '.pt', '.sft']:
-            if clean_name + ext in self.available_unets:
-                return clean_name + ext
-        for m in self.available_unets:
-            if m.endswith(clean_name) or m.endswith(clean_name + ".safetensors"):
-                return m
-        for m in self.available_unets:
-            if clean_name in m:
-                return m
-        return None
+        return self._name_resolver("unet", self.available_unets).resolve(ui_name)
 
     def _find_best_vae_match(self, ui_name: str) -> str:
         if not hasattr(self, 'available_vaes') or not self.available_vaes:
             return None
-        clean_name = ui_name.replace("🎨 ", "").strip()
-        if clean_name in self.available_vaes:
-            return clean_name
-        for ext in ['.safetensors', '.ckpt', '.pt', '.sft']:
-            if clean_name + ext in self.available_vaes:
-                return clean_name + ext
-        for m in self.available_vaes:
-            if m.endswith(clean_name) or m.endswith(clean_name + ".safetensors"):
-                return m
-        for m in self.available_vaes:
-            if clean_name in m:
-                return m
-        return None
+        return self._name_resolver("vae", self.available_vaes).resolve(ui_name)
 
     def _find_best_clip_match(self, ui_name: str) -> str:
         if not hasattr(self, 'available_clips') or not self.available_clips:
             return None
-        clean_name = ui_name.replace("🎨 ", "").strip()
-        if clean_name in self.available_clips:
-            return clean_name
-        for ext in ['.safetensors', '.ckpt', '.pt', '.sft']:
-            if clean_name + ext in self.available_clips:
-                return clean_name + ext
-        for m in self.available_clips:
-            if m.endswith(clean_name) or m.endswith(clean_name + ".safetensors"):
-                return m
-        for m in self.available_clips:
-            if clean_name in m:
-                return m
-        return None
+        return self._name_resolver("clip", self.available_clips).resolve(ui_name)
 
     def _clear_layout(self, layout):
         """递归清空布局"""
@@ -15,10 +15,9 @@ class QueueDialog(QDialog):
         
         self.setup_ui()
         self.setup_connections()
-        self.setup_timer()
         
-        # 立即刷新一次
-        self.refresh_queue()
+        # 队列状态由客户端按 WebSocket 事件维护，打开时直接使用当前快照
+        self.on_queue_updated(self.comfy_client.queue_snapshot())
     
     def setup_ui(self):
         """设置UI"""
@@ -69,14 +68,8 @@ class QueueDialog(QDialog):
         self.comfy_client.task_cancelled.connect(self.on_task_cancelled)
         self.comfy_client.operation_failed.connect(self.on_operation_failed)
     
-    def setup_timer(self):
-        """设置定时器，每2秒自动刷新"""
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.refresh_queue)
-        self.timer.start(2000)  # 2秒
-    
     def refresh_queue(self):
-        """刷新队列状态"""
+        """手动与 ComfyUI 核对队列状态"""
         self.comfy_client.get_queue()
     
     def on_queue_updated(self, data):
@@ -124,7 +117,7 @@ class QueueDialog(QDialog):
         # 更新状态
         total = len(running) + len(pending)
         self.summary_label.setText(f"总任务 {total} · 执行中 {len(running)} · 等待 {len(pending)}")
-        self.status_label.setText("已刷新队列")
+        self.status_label.setText("队列已更新")
     
     def _create_task_item(self, task, is_running):
         """创建任务列表项"""
@@ -194,7 +187,7 @@ class QueueDialog(QDialog):
 
         if is_running:
             btn = QPushButton("中断")
-            btn.clicked.connect(lambda: self.comfy_client.interrupt_current())
+            btn.clicked.connect(lambda _, pid=prompt_id: self.comfy_client.interrupt_current(pid))
         else:
             btn = QPushButton("取消")
             btn.clicked.connect(lambda _, pid=prompt_id: self.comfy_client.cancel_task(pid))
@@ -223,12 +216,10 @@ class QueueDialog(QDialog):
     def on_queue_cleared(self):
         """队列已清空"""
         self.status_label.setText("队列已清空")
-        self.refresh_queue()
     
     def on_task_cancelled(self, prompt_id):
         """任务已取消"""
         self.status_label.setText(f"已取消任务: {prompt_id[:12]}...")
-        self.refresh_queue()
     
     def on_operation_failed(self, error):
         """操作失败"""
@@ -236,8 +227,3 @@ class QueueDialog(QDialog):
         self.status_label.setStyleSheet("color: red; font-size: 11px;")
         # 3秒后恢复默认颜色
         QTimer.singleShot(3000, lambda: self.status_label.setStyleSheet("color: gray; font-size: 11px;"))
-    
-    def closeEvent(self, event):
-        """关闭对话框时停止定时器"""
-        self.timer.stop()
-        super().closeEvent(event)
@@ -1,8 +1,73 @@
-from PyQt6.QtWidgets import QListView, QAbstractItemView
-from PyQt6.QtCore import Qt, QSize, pyqtSignal
-from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtWidgets import QListView, QAbstractItemView, QStyledItemDelegate, QStyle, QApplication
+from PyQt6.QtCore import Qt, QSize, QRect, pyqtSignal
+from PyQt6.QtGui import QIcon, QPixmap, QPalette
 from src.ui.widgets.image_model import ImageModel
 
+
+class ThumbnailDelegate(QStyledItemDelegate):
+    """
+    直接绘制缓存 pixmap 的轻量委托：
+    不构造 QIcon、不做逐项文字换行排版，文件名省略结果按宽度缓存，
+    视口外的行直接跳过。
+    """
+    TEXT_HEIGHT = 20
+    MAX_ELIDED = 4096
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._elided = {}
+        self._elided_key = None
+
+    def _elide(self, option, name, width):
+        key = (width, option.font.key())
+        if key != self._elided_key or len(self._elided) > self.MAX_ELIDED:
+            self._elided = {}
+            self._elided_key = key
+        text = self._elided.get(name)
+        if text is None:
+            text = option.fontMetrics.elidedText(name, Qt.TextElideMode.ElideMiddle, width)
+            self._elided[name] = text
+        return text
+
+    def paint(self, painter, option, index):
+        widget = option.widget
+        if widget is not None and not option.rect.intersects(widget.viewport().rect()):
+            return
+        style = widget.style() if widget is not None else QApplication.style()
+        # 背景/选中/悬停仍交给样式绘制，保持与样式表一致
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, widget)
+
+        rect = option.rect.adjusted(4, 4, -4, -4)
+        icon_size = widget.iconSize() if widget is not None else QSize(128, 128)
+        icon_h = min(icon_size.height(), rect.height() - self.TEXT_HEIGHT)
+        icon_rect = QRect(rect.left(), rect.top(), rect.width(), max(icon_h, 0))
+
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        if isinstance(pixmap, QPixmap) and not pixmap.isNull():
+            # 按比例放入图标区域，交给 drawPixmap 缩放，避免每帧生成新 pixmap
+            target = QSize(pixmap.width(), pixmap.height()).scaled(
+                min(icon_rect.width(), icon_size.width()), icon_rect.height(), Qt.AspectRatioMode.KeepAspectRatio)
+            x = icon_rect.left() + (icon_rect.width() - target.width()) // 2
+            y = icon_rect.top() + (icon_rect.height() - target.height()) // 2
+            painter.drawPixmap(QRect(x, y, target.width(), target.height()), pixmap)
+
+        name = index.data(Qt.ItemDataRole.DisplayRole) or ""
+        text_rect = QRect(rect.left(), icon_rect.bottom() + 2, rect.width(), self.TEXT_HEIGHT)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        role = QPalette.ColorRole.HighlightedText if selected else QPalette.ColorRole.Text
+        painter.save()
+        painter.setPen(option.palette.color(role))
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop,
+                         self._elide(option, name, text_rect.width()))
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        widget = option.widget
+        if widget is not None and widget.gridSize().isValid():
+            return widget.gridSize()
+        return QSize(140, 190)
+
+
 class ThumbnailList(QListView):
     """
     显示图片缩略图的列表组件 (高性能 QListView 版)。
@@ -27,6 +92,10 @@ class ThumbnailList(QListView):
         self.setIconSize(QSize(128, 128))
         self.setGridSize(QSize(140, 190)) # 固定紧凑网格 (宽140=128+12, 高190确保文件名显示)
         
+        # 所有项尺寸一致，布局时无需逐行询问 sizeHint
+        self.setUniformItemSizes(True)
+        self.setItemDelegate(ThumbnailDelegate(self))
+        
         # 初始化模型
         self.image_model = ImageModel(self)
         self.setModel(self.image_model)
@@ -44,9 +113,23 @@ class ThumbnailList(QListView):
             if path:
                 self.image_selected.emit(path)
 
-    def add_image(self, path, index=None, thumbnail=None):
+    def add_image(self, path, index=None, thumbnail=None, placeholder=None):
         """代理模型添加图片"""
-        self.image_model.add_image(path, thumb=thumbnail, index=index)
+        self.image_model.add_image(path, thumb=thumbnail, index=index, placeholder=placeholder)
+
+    def add_images(self, items):
+        """批量添加 [(path, thumb), ...] (文件夹加载)"""
+        self.image_model.add_images(items)
+
+    def set_images(self, paths, placeholders=None):
+        """一次性替换整个列表 (搜索结果等大批量场景)"""
+        self.image_model.set_images(paths, placeholders)
+
+    def append_images(self, paths):
+        self.image_model.append_images(paths)
+
+    def remove_row(self, row):
+        self.image_model.remove_row(row)
     
     def update_image_icon(self, index, icon):
         """更新指定索引的图片图标 (代理给 Model)"""
@@ -80,13 +163,14 @@ class ThumbnailList(QListView):
         
     def setCurrentRow(self, row):
         """兼容旧接口"""
-        if 0 <= row < self.image_model.rowCount():
+        # 目标行可能还在未分页的部分，先让模型暴露到该行
+        if self.image_model.ensure_row_loaded(row) and 0 <= row < self.image_model.rowCount():
             idx = self.image_model.index(row)
             self.setCurrentIndex(idx)
             
     def count(self):
-        """兼容旧接口"""
-        return self.image_model.rowCount()
+        """兼容旧接口 (返回结果总数，含尚未分页暴露的行)"""
+        return self.image_model.total_count()
 
     def item(self, row):
         """兼容旧接口，返回一个模拟对象"""
@@ -0,0 +1,122 @@
+import math
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QRect, QRectF, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap, QPainter
+from PyQt6.QtWidgets import QGraphicsItem, QGraphicsObject, QStyleOptionGraphicsItem
+
+
+class _LevelTask(QRunnable):
+    def __init__(self, item, level, base):
+        super().__init__()
+        self.item = item
+        self.level = level
+        self.base = base
+
+    def run(self):
+        image = TiledImageItem.build_level(self.base, self.level)
+        try:
+            self.item.level_ready.emit(self.level, image)
+        except RuntimeError:
+            pass # 图片已切换，item 已被销毁
+
+
+class TiledImageItem(QGraphicsObject):
+    """
+    超大图片的分块 + mipmap 渲染项。
+    - 按当前缩放选择金字塔层级 (每级边长减半)，缩小查看时不再对整张原图做平滑缩放
+    - 层级在线程池中生成，就绪前先用已有的最接近层级绘制，缩放时不卡 UI
+    - 只为可见区域内的图块生成 QPixmap，图块放在有上限的 LRU 中
+    - 坐标系始终是原图像素，切换层级不影响视图的变换与滚动位置
+    """
+    TILE_SIZE = 512
+    MAX_TILES = 96           # 约 96 * 512 * 512 * 4B ≈ 96MB 上限
+    level_ready = pyqtSignal(int, QImage)
+
+    def __init__(self, image: QImage, parent=None):
+        super().__init__(parent)
+        self._levels = {0: image}
+        self._building = set()
+        self.level_ready.connect(self._on_level_ready)
+        # 最粗一级很小 (长边约 1K)，同步生成，保证任何缩放下都有可立即绘制的低清层级
+        top = self._max_level()
+        if top > 0:
+            self._levels[top] = self.build_level(image, top)
+        self._tiles = OrderedDict()  # (level, tx, ty) -> QPixmap (LRU)
+        self._rect = QRectF(0, 0, image.width(), image.height())
+        # 需要 exposedRect 才能只绘制可见图块
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption, True)
+
+    def image_size(self):
+        return self._levels[0].size()
+
+    def boundingRect(self):
+        return self._rect
+
+    @staticmethod
+    def build_level(base, level):
+        w = max(1, base.width() >> level)
+        h = max(1, base.height() >> level)
+        # 直接由原图缩放：比逐级减半更快，也不会累积模糊
+        return base.scaled(w, h, Qt.AspectRatioMode.IgnoreAspectRatio,
+                           Qt.TransformationMode.SmoothTransformation)
+
+    def _available_level(self, level):
+        """返回可立即绘制的层级：目标层级未就绪时后台生成，先用更粗的已有层级 (图块少，绘制快)"""
+        if level in self._levels:
+            return level
+        if level not in self._building:
+            self._building.add(level)
+            QThreadPool.globalInstance().start(_LevelTask(self, level, self._levels[0]))
+        coarser = [k for k in self._levels if k > level]
+        return min(coarser) if coarser else max(self._levels)
+
+    def _on_level_ready(self, level, image):
+        self._building.discard(level)
+        self._levels[level] = image
+        self.update()
+
+    def _max_level(self):
+        base = self._levels[0]
+        return max(0, int(math.log2(max(base.width(), base.height()) / self.TILE_SIZE)))
+
+    def _tile(self, level, tx, ty):
+        key = (level, tx, ty)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+        image = self._levels[level]
+        rect = QRect(tx * self.TILE_SIZE, ty * self.TILE_SIZE, self.TILE_SIZE, self.TILE_SIZE) & image.rect()
+        pixmap = QPixmap.fromImage(image.copy(rect))
+        self._tiles[key] = pixmap
+        while len(self._tiles) > self.MAX_TILES:
+            self._tiles.popitem(last=False)
+        return pixmap
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None):
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if lod <= 0:
+            return
+        # 选择不低于屏幕分辨率的最粗层级 (放大查看时为原图)
+        level = min(self._max_level(), max(0, int(math.floor(math.log2(1.0 / lod)))))
+        level = self._available_level(level)
+        image = self._levels[level]
+        # 该层级一个像素对应的原图像素 (按实际尺寸算，避免右/下边缘取整缝隙)
+        sx = self._rect.width() / image.width()
+        sy = self._rect.height() / image.height()
+        span_x, span_y = self.TILE_SIZE * sx, self.TILE_SIZE * sy
+
+        exposed = option.exposedRect & self._rect
+        if exposed.isEmpty():
+            return
+        tx0, ty0 = int(exposed.left() // span_x), int(exposed.top() // span_y)
+        tx1, ty1 = int(math.ceil(exposed.right() / span_x)), int(math.ceil(exposed.bottom() / span_y))
+
+        for ty in range(ty0, ty1):
+            for tx in range(tx0, tx1):
+                pixmap = self._tile(level, tx, ty)
+                if pixmap.isNull():
+                    continue
+                target = QRectF(tx * span_x, ty * span_y, pixmap.width() * sx, pixmap.height() * sy)
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
@@ -0,0 +1,33 @@
+from src.core.comfy_queue import ComfyQueueState
+
+
+def _ids(tasks):
+    return [task[1] for task in tasks]
+
+
+def test_follows_execution_events_and_detects_gaps():
+    state = ComfyQueueState()
+    state.add_pending("b", 2, {"3": {}})
+    state.add_pending("a", 1)
+    state.remaining = 2
+    assert state.in_sync()
+    assert _ids(state.snapshot()["queue_pending"]) == ["a", "b"]
+
+    assert state.start("a")
+    assert _ids(state.snapshot()["queue_running"]) == ["a"]
+    assert state.finish("a")
+    state.remaining = 2   # 其他客户端提交了一个任务
+    assert not state.in_sync()
+
+    state.reset({"queue_running": [[2, "b", {}]], "queue_pending": [[3, "x", {}]]})
+    assert state.in_sync() and state.count() == 2
+
+
+def test_late_submit_response_and_stale_reconcile_do_not_resurrect_finished_prompts():
+    state = ComfyQueueState()
+    assert not state.start("p")          # 执行事件先于提交响应到达
+    state.finish("p")
+    assert not state.add_pending("p", 1)
+
+    state.reset({"queue_running": [[1, "p", {}]], "queue_pending": []})   # 请求在途期间 p 已完成
+    assert state.count() == 0
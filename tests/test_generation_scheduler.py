@@ -0,0 +1,131 @@
+import json
+
+from PyQt6.QtCore import QCoreApplication, QObject, pyqtSignal
+
+from src.core.generation_scheduler import PRIORITY_INTERACTIVE, GenerationScheduler
+
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class FakeClient(QObject):
+    prompt_queued = pyqtSignal(str, dict)
+    prompt_failed = pyqtSignal(dict, bool)
+    prompt_history_checked = pyqtSignal(str, bool)
+    queue_updated = pyqtSignal(dict)
+    queue_cleared = pyqtSignal()
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self, address="127.0.0.1:8188", models=None):
+        super().__init__()
+        self.server_address = address
+        self.model_inventory = models
+        self.connected = True
+        self.sent = []
+        self.history_checks = []
+        self.cancelled = []
+        self.interrupted = []
+
+    def is_connected(self):
+        return self.connected
+
+    def send_prompt(self, workflow, context=None):
+        prompt_id = f"{self.server_address}/p{len(self.sent)}" if self.server_address != "127.0.0.1:8188" else f"p{len(self.sent)}"
+        self.sent.append((workflow["name"], prompt_id))
+        self.prompt_queued.emit(prompt_id, context)
+
+    def check_prompt_history(self, prompt_id):
+        self.history_checks.append(prompt_id)
+
+    def cancel_task(self, prompt_id):
+        self.cancelled.append(prompt_id)
+
+    def interrupt_current(self, prompt_id=None):
+        self.interrupted.append(prompt_id)
+
+
+def _queue(*prompt_ids):
+    return {"queue_running": [[0, prompt_ids[0], {}]] if prompt_ids else [],
+            "queue_pending": [[i, pid, {}] for i, pid in enumerate(prompt_ids[1:], 1)]}
+
+
+def test_keeps_queue_shallow_and_lets_interactive_jobs_jump_ahead():
+    client = FakeClient()
+    scheduler = GenerationScheduler(client, max_depth=2)
+    scheduler.ACCEPT_GRACE_SECONDS = 0
+
+    scheduler.enqueue_many([({"name": f"sweep{i}"}, None) for i in range(5)])
+    assert [name for name, _ in client.sent] == ["sweep0", "sweep1"]
+    assert scheduler.pending_count() == 3
+
+    scheduler.enqueue({"name": "single"}, priority=PRIORITY_INTERACTIVE)
+    client.queue_updated.emit(_queue("p1"))   # p0 已完成
+    assert [name for name, _ in client.sent] == ["sweep0", "sweep1", "single"]
+
+    client.queue_updated.emit(_queue())
+    assert [name for name, _ in client.sent][3:] == ["sweep2", "sweep3"]
+
+
+def test_journal_resubmits_pending_and_lost_jobs_after_restart(tmp_path):
+    journal = str(tmp_path / GenerationScheduler.JOURNAL_NAME)
+    client = FakeClient()
+    scheduler = GenerationScheduler(client, journal, max_depth=1)
+    scheduler.enqueue_many([({"name": "a"}, {"session_id": "s"}), ({"name": "b"}, None)])
+    scheduler.flush_journal()
+    saved = json.load(open(journal, encoding="utf-8"))
+    assert [(e["workflow"]["name"], e["prompt_id"]) for e in saved] == [("a", "p0"), ("b", None)]
+
+    restarted = FakeClient()
+    scheduler = GenerationScheduler(restarted, journal, max_depth=1)
+    scheduler.ACCEPT_GRACE_SECONDS = 0
+    restarted.queue_updated.emit(_queue())
+    assert restarted.history_checks == ["p0"] and restarted.sent == []
+
+    restarted.prompt_history_checked.emit("p0", False)   # ComfyUI 重启后丢失
+    assert [name for name, _ in restarted.sent] == ["a"]
+    restarted.queue_updated.emit(_queue())
+    restarted.queue_updated.emit(_queue())
+    assert scheduler.pending_count() == 0
+
+
+def test_prefers_jobs_with_the_loaded_model_state():
+    client = FakeClient()
+    scheduler = GenerationScheduler(client, max_depth=0)
+
+    def job(name, unet, lora):
+        return ({"name": name,
+                 "1": {"class_type": "UNETLoader", "inputs": {"unet_name": unet}},
+                 "2": {"class_type": "LoraLoaderModelOnly", "inputs": {"lora_name": lora, "model": ["1", 0]}}}, None)
+
+    scheduler.enqueue_many([job("a1", "a", "x"), job("b1", "b", "x"), job("a2", "a", "y"),
+                            job("b2", "b", "x"), job("a3", "a", "x")])
+    assert [name for name, _ in client.sent] == ["a1", "a3", "a2", "b1", "b2"]
+
+
+def test_spreads_jobs_over_backends_by_load_and_models_and_fails_over():
+    a = FakeClient("a", models={"base.safetensors", "style.safetensors"})
+    b = FakeClient("b", models={"base.safetensors"})
+    scheduler = GenerationScheduler([a, b], max_depth=2)
+    scheduler.ACCEPT_GRACE_SECONDS = 0
+    scheduler.FAILOVER_SECONDS = 0
+
+    def job(name, lora):
+        return ({"name": name,
+                 "1": {"class_type": "UNETLoader", "inputs": {"unet_name": "base.safetensors"}},
+                 "2": {"class_type": "LoraLoaderModelOnly", "inputs": {"lora_name": lora}}}, None)
+
+    scheduler.enqueue_many([job("styled", "style.safetensors"), job("plain1", "base.safetensors"),
+                            job("plain2", "base.safetensors"), job("plain3", "base.safetensors")])
+    assert [name for name, _ in a.sent] == ["styled", "plain3"]   # 只有 a 有 style LoRA
+    assert [name for name, _ in b.sent] == ["plain1", "plain2"]
+
+    b.connected = False
+    b.connection_changed.emit(False)
+    app.processEvents()
+    a.queue_updated.emit(_queue())   # a 上的任务完成，腾出位置给 b 的任务
+    assert [name for name, _ in a.sent][2:] == ["plain1", "plain2"]
+
+    b.connected = True
+    b.queue_updated.emit(_queue("b/p0", "b/p1"))
+    # 已改投的任务从 b 的队列删除、正在执行的中断，避免重复生成
+    assert b.cancelled == ["b/p1"] and b.interrupted == ["b/p0"]
@@ -0,0 +1,21 @@
+from src.core.database import DatabaseManager
+
+
+def test_facets_match_folder_aggregates(tmp_path):
+    folder = str(tmp_path).replace("\\", "/")
+    path = f"{folder}/a.png"
+    meta = {
+        "params": {"Model": "sdxl_base", "Sampler": "euler", "scheduler": "karras"},
+        "tech_info": {"resolution": "832 x 1216"},
+        "loras": ["detail (0.8)", "style"],
+    }
+    db = DatabaseManager(str(tmp_path / "meta.db"))
+    db.add_image(path, meta)
+
+    facets = DatabaseManager.image_facets(meta)
+    # 增量更新的取值必须与全量聚合查询得到的一致
+    assert [(facets["model"], 1)] == [tuple(r) for r in db.get_unique_models(folder)]
+    assert sorted(facets["loras"]) == sorted(name for name, _ in db.get_unique_loras(folder))
+    assert [facets["resolution"]] == db.get_unique_resolutions(folder)
+    assert [facets["sampler"]] == db.get_unique_samplers(folder)
+    assert [facets["scheduler"]] == db.get_unique_schedulers(folder)
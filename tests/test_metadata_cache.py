@@ -0,0 +1,48 @@
+import json
+import os
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from src.core.database import DatabaseManager
+from src.core.metadata import MetadataParser
+from src.core.metadata_cache import MetadataCache
+
+
+def _save_png(path, key, text):
+    info = PngInfo()
+    info.add_text(key, text)
+    Image.new("RGB", (64, 48), "white").save(path, pnginfo=info)
+    return str(path).replace("\\", "/")
+
+
+def test_prefetch_rebuilds_parse_image_result_from_index(tmp_path):
+    a1111 = _save_png(tmp_path / "a.png", "parameters",
+                      "1girl <lora:detail:0.8>\nNegative prompt: lowres\nSteps: 20, Sampler: Euler a, CFG scale: 7, Seed: 42")
+    comfy = _save_png(tmp_path / "c.png", "prompt", json.dumps({
+        "3": {"class_type": "KSampler", "inputs": {"seed": 7, "steps": 30, "cfg": 5.5}},
+        "6": {"class_type": "CLIPTextEncode", "inputs": {"text": "a castle"}},
+    }))
+    db = DatabaseManager(str(tmp_path / "meta.db"))
+    expected = {p: MetadataParser.parse_image(p) for p in (a1111, comfy)}
+    db.add_images_batch(list(expected.items()))
+
+    cache = MetadataCache(db)
+    assert cache.get(a1111) is None
+    assert cache.prefetch([a1111, comfy]) == 2
+    for path, meta in expected.items():
+        assert cache.get(path) == meta
+
+
+def test_stale_index_entry_falls_back_to_file_parse(tmp_path):
+    path = _save_png(tmp_path / "a.png", "parameters", "old\nSteps: 1, Sampler: Euler, Seed: 1")
+    db = DatabaseManager(str(tmp_path / "meta.db"))
+    db.add_images_batch([(path, MetadataParser.parse_image(path))])
+
+    _save_png(tmp_path / "a.png", "parameters", "new\nSteps: 2, Sampler: Euler, Seed: 2")
+    os.utime(path, (1_000_000, 1_000_000))
+
+    cache = MetadataCache(db)
+    assert cache.prefetch([path]) == 0
+    assert cache.load(path)["prompt"] == "new"
+    assert cache.get(path)["prompt"] == "new"
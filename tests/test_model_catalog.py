@@ -0,0 +1,25 @@
+import os
+
+from src.core.model_catalog import ModelFileCatalog
+
+
+def test_list_files_reuses_scan_until_a_directory_changes(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.safetensors").write_bytes(b"")
+    (tmp_path / "sub" / "b.safetensors").write_bytes(b"")
+    (tmp_path / "notes.txt").write_bytes(b"")
+    catalog = ModelFileCatalog()
+
+    first = catalog.list_files(str(tmp_path), (".safetensors",))
+    assert sorted(first) == ["a.safetensors", "sub/b.safetensors"]
+    version = catalog.version
+
+    assert catalog.list_files(str(tmp_path), (".safetensors",)) == first
+    assert catalog.version == version
+
+    (tmp_path / "sub" / "c.safetensors").write_bytes(b"")
+    stat = os.stat(tmp_path / "sub")
+    os.utime(tmp_path / "sub", (stat.st_atime, stat.st_mtime + 5))
+
+    assert "sub/c.safetensors" in catalog.list_files(str(tmp_path), (".safetensors",))
+    assert catalog.version == version + 1
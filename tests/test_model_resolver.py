@@ -0,0 +1,33 @@
+from src.core.model_resolver import ModelNameResolver
+
+
+def test_resolve_keeps_match_order_of_linear_scan():
+    resolver = ModelNameResolver([
+        "SDXL/base.safetensors",
+        "z_image_turbo_bf16.safetensors",
+        "other/base.safetensors",
+        "flux.ckpt",
+    ])
+
+    assert resolver.resolve("🎨 flux.ckpt") == "flux.ckpt"
+    assert resolver.resolve("flux") == "flux.ckpt"
+    assert resolver.resolve("base") == "SDXL/base.safetensors"
+    assert resolver.resolve("turbo_bf16") == "z_image_turbo_bf16.safetensors"
+    assert resolver.resolve("missing") is None
+
+
+def test_resolve_lora_accepts_absolute_paths_and_stems():
+    resolver = ModelNameResolver(["style/anime.safetensors", "detail.safetensors", "x/detail.pt"])
+
+    assert resolver.resolve_lora("D:\\ComfyUI\\models\\loras\\style\\Anime.safetensors") == "style/anime.safetensors"
+    assert resolver.resolve_lora("detail") == "detail.safetensors"
+    assert resolver.resolve_lora("elsewhere/DETAIL.bin") == "detail.safetensors"
+    assert resolver.resolve_lora("nothing") is None
+
+
+def test_matches_is_identity_only():
+    names = ["a.safetensors", "b.safetensors"]
+    resolver = ModelNameResolver(names)
+
+    assert resolver.matches(names)
+    assert not resolver.matches(list(names))   # 内容相同的新列表也视为变化，不做 O(n) 比较
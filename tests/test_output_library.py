@@ -0,0 +1,49 @@
+import io
+import json
+
+from PIL import Image, PngImagePlugin
+
+from src.core.cache import ThumbnailCache
+from src.core.database import DatabaseManager
+from src.core.output_library import OutputLibrary
+
+
+def _png(color, prompt):
+    info = PngImagePlugin.PngInfo()
+    info.add_text("prompt", json.dumps(prompt))
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buf, "PNG", pnginfo=info)
+    return buf.getvalue()
+
+
+def test_ingest_stores_bytes_indexes_from_memory_and_avoids_name_clashes(tmp_path):
+    db = DatabaseManager(str(tmp_path / "index.db"))
+    library = OutputLibrary(db, ThumbnailCache(str(tmp_path / "thumbs")), str(tmp_path / "library"))
+    prompt = {"3": {"class_type": "KSampler", "inputs": {"seed": 7, "steps": 9}}}
+    info = {"filename": "ComfyUI_00001_.png", "subfolder": "batch", "type": "output"}
+
+    path, meta, thumb = library.ingest(_png("red", prompt), info)
+    assert path == str(tmp_path / "library" / "batch" / "ComfyUI_00001_.png")
+    assert meta["tool"] == "ComfyUI" and meta["tech_info"]["resolution"] == "64 x 48"
+    assert db.get_image_info(path) and thumb.width() == 128
+
+    # 同一内容再次取回复用原文件；另一后端的同名不同内容文件追加序号
+    assert library.ingest(_png("red", prompt), info)[0] == path
+    other = library.ingest(_png("blue", prompt), info)[0]
+    assert other.endswith("ComfyUI_00001__1.png")
+
+
+def test_default_root_is_comfy_output_so_local_outputs_are_reused_in_place(tmp_path):
+    db = DatabaseManager(str(tmp_path / "index.db"))
+    comfy_root = tmp_path / "ComfyUI"
+    library = OutputLibrary(db, ThumbnailCache(str(tmp_path / "thumbs")), "", str(comfy_root))
+    info = {"filename": "ComfyUI_00002_.png", "subfolder": "", "type": "output"}
+    data = _png("green", {})
+    original = library.comfy_output_path(info)
+    (comfy_root / "output").mkdir(parents=True)
+    with open(original, "wb") as f:
+        f.write(data)   # 本地 ComfyUI 已写出同一文件
+
+    assert library.ingest(data, info)[0] == original
+    assert sorted(p.name for p in (comfy_root / "output").iterdir()) == ["ComfyUI_00002_.png"]
+    assert library.comfy_output_path(dict(info, type="temp")) is None
@@ -0,0 +1,24 @@
+from PIL import Image
+
+from src.core.database import DatabaseManager
+from src.core.placeholder import decode_placeholder, make_placeholder
+
+
+def test_placeholder_is_stored_and_kept_on_reindex(tmp_path):
+    image = tmp_path / "img.png"
+    Image.new("RGB", (1024, 768), "blue").save(image)
+    path = str(image).replace("\\", "/")
+
+    data = make_placeholder(path)
+    assert data and len(data) < 1024
+    decoded = decode_placeholder(data, 128)
+    assert decoded is not None and decoded.width() == 128
+
+    db = DatabaseManager(str(tmp_path / "meta.db"))
+    db.add_images_batch([(path, {"placeholder": data})])
+    assert db.get_images_batch_info([path])[path]["placeholder"] == data
+
+    # 重新解析时若没有新占位图，不应覆盖已有值
+    db.add_images_batch([(path, {"prompt": "again"})])
+    assert db.get_placeholders([path]) == {path: data}
+    assert db.get_paths_missing_placeholder() == set()
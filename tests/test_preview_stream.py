@@ -0,0 +1,16 @@
+import json
+import struct
+
+from src.core.preview_stream import PREVIEW_IMAGE, PREVIEW_IMAGE_WITH_METADATA, parse_preview_frame
+
+
+def test_parses_legacy_and_metadata_preview_frames():
+    assert parse_preview_frame(struct.pack(">II", PREVIEW_IMAGE, 2) + b"png") == ({}, b"png", "image/png")
+
+    meta = json.dumps({"prompt_id": "p1", "image_type": "image/webp"}).encode("utf-8")
+    frame = struct.pack(">II", PREVIEW_IMAGE_WITH_METADATA, len(meta)) + meta + b"data"
+    assert parse_preview_frame(frame) == ({"prompt_id": "p1", "image_type": "image/webp"}, b"data", "image/webp")
+
+    # 截断的元数据、未知事件类型都不是预览帧
+    assert parse_preview_frame(frame[:12]) is None
+    assert parse_preview_frame(struct.pack(">II", 3, 0)) is None
@@ -0,0 +1,49 @@
+import copy
+
+from src.assets.default_workflows import DEFAULT_T2I_WORKFLOW
+from src.core.seed_batch import collapse_seed_batch, plan_seed_batches, split_batch_images
+
+
+def _with_seed(seed, steps=9):
+    workflow = copy.deepcopy(DEFAULT_T2I_WORKFLOW)
+    workflow["3"]["inputs"]["seed"] = seed
+    workflow["3"]["inputs"]["steps"] = steps
+    return workflow
+
+
+def test_collapse_sets_batch_size_without_touching_source():
+    batched = collapse_seed_batch(DEFAULT_T2I_WORKFLOW, 4, seed=123)
+
+    assert batched["5"]["inputs"]["batch_size"] == 4
+    assert batched["3"]["inputs"]["seed"] == 123
+    assert DEFAULT_T2I_WORKFLOW["5"]["inputs"]["batch_size"] == 1
+    assert batched["6"] is DEFAULT_T2I_WORKFLOW["6"]
+
+
+def test_plan_merges_only_random_seed_variants_and_maps_images_back():
+    workflows = [_with_seed(1), _with_seed(2), _with_seed(3), _with_seed(3, steps=20), _with_seed(3, steps=20)]
+    contexts = [{"variant_id": f"v{i}", "seed": i, "seed_mode": "random"} for i in range(5)]
+
+    planned = plan_seed_batches(workflows, contexts)
+
+    assert len(planned) == 3
+    batched, context = planned[0]
+    assert batched["5"]["inputs"]["batch_size"] == 3
+    assert [c["variant_id"] for c in context["batch_contexts"]] == ["v0", "v1", "v2"]
+    # 相同种子的两个任务保持独立提交
+    assert [c["variant_id"] for _, c in planned[1:]] == ["v3", "v4"]
+
+    split = split_batch_images([{"filename": "a"}, {"filename": "b"}, {"filename": "c"}], context)
+    assert [(imgs[0]["filename"], ctx["variant_id"], ctx["batch_index"]) for imgs, ctx in split] == [
+        ("a", "v0", 0), ("b", "v1", 1), ("c", "v2", 2),
+    ]
+
+
+def test_plan_keeps_caller_specified_seeds():
+    workflows = [_with_seed(1), _with_seed(2), _with_seed(3)]
+    contexts = [{"variant_id": "v0", "seed_mode": "fixed"}, None, {"variant_id": "v2"}]
+
+    planned = plan_seed_batches(workflows, contexts)
+
+    assert [w["3"]["inputs"]["seed"] for w, _ in planned] == [1, 2, 3]
+    assert all(w["5"]["inputs"]["batch_size"] == 1 for w, _ in planned)
@@ -0,0 +1,72 @@
+from src.core.database import DatabaseManager
+from src.core.step_timing import StepTimingTracker, timing_key
+
+
+def _workflow(steps=20, width=1024, height=1024, loras=1):
+    workflow = {
+        "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "sdxl.safetensors"}},
+        "5": {"class_type": "EmptyLatentImage", "inputs": {"width": width, "height": height, "batch_size": 1}},
+        "3": {"class_type": "KSampler", "inputs": {"steps": steps, "sampler_name": "euler", "model": ["4", 0]}},
+    }
+    for i in range(loras):
+        workflow[f"l{i}"] = {"class_type": "LoraLoader", "inputs": {"lora_name": f"l{i}.safetensors", "strength_model": 0.8}}
+    return workflow
+
+
+def _run(tracker, prompt_id, workflow, steps, per_step, pre=3.0, post=1.0):
+    tracker.start(prompt_id, workflow, "gpu0", now=100.0)
+    tracker.node(prompt_id, "KSampler")
+    for step in range(1, steps + 1):
+        tracker.progress(prompt_id, step, steps, now=100.0 + pre + step * per_step)
+    tracker.node(prompt_id, "VAEDecode")
+    return tracker.finish(prompt_id, now=100.0 + pre + steps * per_step + post)
+
+
+def test_records_step_time_and_overhead_and_survives_restart(tmp_path):
+    db = DatabaseManager(str(tmp_path / "index.db"))
+    tracker = StepTimingTracker(db)
+    record = _run(tracker, "p1", _workflow(), 20, 0.5)
+    assert abs(record["seconds_per_step"] - 0.5) < 1e-9
+    assert abs(record["pre_seconds"] - 3.0) < 1e-9 and abs(record["post_seconds"] - 1.0) < 1e-9
+
+    restarted = StepTimingTracker(db)
+    assert abs(restarted.estimate_seconds(_workflow()) - (3.0 + 20 * 0.5 + 1.0)) < 1e-9
+    # 不同步数沿用每步耗时；像素数翻倍时每步耗时按比例换算
+    assert abs(restarted.estimate_seconds(_workflow(steps=30)) - (3.0 + 30 * 0.5 + 1.0)) < 1e-9
+    assert abs(restarted.estimate_seconds(_workflow(width=2048)) - (3.0 + 20 * 1.0 + 1.0)) < 1e-9
+
+    # 执行中：先用历史估算，有采样进度后改用本次实测步速
+    restarted.start("p2", _workflow(), now=200.0)
+    assert abs(restarted.remaining_seconds("p2", now=201.0) - 13.0) < 1e-9
+    restarted.node("p2", "KSampler")
+    restarted.progress("p2", 1, 20, now=203.0)
+    restarted.progress("p2", 2, 20, now=204.0)
+    assert abs(restarted.remaining_seconds("p2", now=204.0) - (18 * 1.0 + 1.0)) < 1e-9
+
+    (span, model, its, count), = restarted.throughput()
+    assert model == "sdxl.safetensors" and abs(its - 2.0) < 1e-9 and count == 1
+
+
+def test_timing_key_ignores_disabled_loras_and_non_sampler_progress():
+    workflow = _workflow(loras=2)
+    workflow["l1"]["inputs"]["strength_model"] = 0
+    assert timing_key(workflow) == ("sdxl.safetensors", 16, "euler", 20, 1)
+
+    tracker = StepTimingTracker()
+    tracker.start("p", workflow, now=0.0)
+    tracker.node("p", "UpscaleModelLoader")
+    tracker.progress("p", 1, 4, now=1.0)
+    tracker.progress("p", 4, 4, now=9.0)
+    assert tracker.finish("p", now=10.0) is None
+
+    # 漏掉结束事件的残留任务不在执行列表中，不参与 ETA
+    for prompt_id in ("stale", "live"):
+        tracker.start(prompt_id, _workflow(), now=0.0)
+    tracker.node("stale", "KSampler")
+    tracker.progress("stale", 1, 20, now=1.0)
+    tracker.progress("stale", 2, 20, now=2.0)
+    tracker.node("live", "KSampler")
+    tracker.progress("live", 19, 20, now=19.0)
+    tracker.progress("live", 20, 20, now=20.0)
+    assert tracker.running_remaining_seconds(["stale", "live"], now=20.0) == 18.0
+    assert tracker.running_remaining_seconds(["live"], now=20.0) == 0.0
@@ -0,0 +1,80 @@
+import os
+
+from src.core.cache import ThumbnailCache
+from src.core.cache_manager import ThumbnailCacheManager
+
+
+class _FakeDB:
+    def __init__(self, mtime_map):
+        self.mtime_map = mtime_map
+
+    def get_file_mtime_map(self, folder_path=None):
+        return dict(self.mtime_map)
+
+
+def _write_entry(path, size, access_time):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    os.utime(path, (access_time, access_time))
+
+
+def test_enforce_budget_evicts_least_recently_accessed(tmp_path):
+    cache = ThumbnailCache(str(tmp_path))
+    manager = ThumbnailCacheManager(cache, max_mb=0)
+    names = [f"{i:032x}_1.webp" for i in range(4)]
+    for i, name in enumerate(names):
+        _write_entry(tmp_path / name, 1000, 1_000_000 + i)
+
+    removed, freed = manager.enforce_budget(max_bytes=2500)
+
+    assert removed == 2
+    assert freed == 2000
+    assert sorted(os.listdir(tmp_path)) == names[2:]
+
+
+def test_collect_orphans_removes_deleted_and_stale_versions(tmp_path):
+    image = tmp_path / "img.png"
+    image.write_bytes(b"png")
+    mtime = int(os.path.getmtime(image))
+    image_path = str(image).replace("\\", "/")
+
+    cache_dir = tmp_path / "thumbs"
+    cache = ThumbnailCache(str(cache_dir))
+    h = ThumbnailCache.path_hash(image_path)
+    current = cache_dir / f"{h}_{mtime}.webp"
+    variant = cache_dir / f"{h}_{mtime}_w768.webp"
+    stale = cache_dir / f"{h}_{mtime - 10}.webp"
+    deleted = cache_dir / f"{ThumbnailCache.path_hash('/gone.png')}_1_w256.webp"
+    for p in (current, variant, stale, deleted):
+        p.write_bytes(b"x")
+
+    manager = ThumbnailCacheManager(cache, _FakeDB({image_path: float(mtime)}))
+    assert manager.collect_orphans() == 2
+    assert sorted(os.listdir(cache_dir)) == sorted([current.name, variant.name])
+
+    stats = manager.get_stats()
+    assert stats["entry_count"] == 2
+    assert stats["variant_count"] == 1
+
+
+def test_writes_trigger_throttled_budget_enforcement(tmp_path):
+    import time
+    from PyQt6.QtGui import QImage
+
+    cache = ThumbnailCache(str(tmp_path))
+    manager = ThumbnailCacheManager(cache, max_mb=0)
+    manager.max_bytes = 3000
+    manager.WRITE_CHECK_RATIO = manager.WRITE_CHECK_INTERVAL = 0
+    for i in range(4):
+        _write_entry(tmp_path / f"{i:032x}_1.webp", 1000, 1_000_000 + i)
+
+    image = QImage(64, 64, QImage.Format.Format_RGB32)
+    image.fill(0)
+    cache.save_thumbnail(str(tmp_path / "new.png"), image)
+    deadline = time.time() + 5
+    while (manager._write_check_running or len(os.listdir(tmp_path)) > 3) and time.time() < deadline:
+        time.sleep(0.01)
+    # 最早访问的条目被淘汰，刚写入的缩略图保留
+    assert len(os.listdir(tmp_path)) <= 3
+    assert f"{0:032x}_1.webp" not in os.listdir(tmp_path)
+    assert any(name.startswith(ThumbnailCache.path_hash(str(tmp_path / "new.png"))) for name in os.listdir(tmp_path))
@@ -0,0 +1,38 @@
+import os
+
+from PIL import Image
+
+from src.core.cache import ThumbnailCache
+from src.core.prewarmer import ThumbnailPrewarmer
+
+
+def test_enqueue_dedupes_and_journal_survives_restart(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "thumbs"))
+    prewarmer = ThumbnailPrewarmer(cache, idle_check=lambda: False)
+
+    assert prewarmer.enqueue(["/a.png", "/b.png", "/a.png"]) == 2
+    assert prewarmer.enqueue(["/b.png"]) == 0
+    assert not os.path.exists(prewarmer.journal_path)   # 延迟写入，合并多批入队
+    prewarmer.flush_journal()
+
+    resumed = ThumbnailPrewarmer(cache)
+    assert resumed.pending_count() == 2
+
+    resumed.cancel(clear_queue=True)
+    assert not os.path.exists(resumed.journal_path)
+
+
+def test_process_one_renders_missing_variants_only(tmp_path):
+    image = tmp_path / "img.png"
+    Image.new("RGB", (1024, 512), "red").save(image)
+    cache = ThumbnailCache(str(tmp_path / "thumbs"))
+    prewarmer = ThumbnailPrewarmer(cache, sizes=(256,))
+
+    prewarmer._process_one(str(image))
+    prewarmer._process_one(str(image))
+
+    variant = cache.get_variant_path(str(image), 256)
+    with Image.open(variant) as thumb:
+        assert max(thumb.size) == 256
+    assert prewarmer.generated == 1
+    assert prewarmer.skipped == 1
@@ -0,0 +1,47 @@
+import copy
+
+from src.assets.default_workflows import DEFAULT_T2I_WORKFLOW
+from src.core.database import DatabaseManager
+from src.core.workflow_hash import workflow_hash
+
+
+def _renumber(workflow, offset=100):
+    mapping = {node_id: str(int(node_id) + offset) for node_id in workflow}
+    renumbered = {}
+    for node_id, node in workflow.items():
+        node = copy.deepcopy(node)
+        for name, value in node.get("inputs", {}).items():
+            if isinstance(value, list) and len(value) == 2 and str(value[0]) in mapping:
+                node["inputs"][name] = [mapping[str(value[0])], value[1]]
+        renumbered[mapping[node_id]] = node
+    return dict(reversed(list(renumbered.items())))
+
+
+def _sampler_id(workflow):
+    return next(node_id for node_id, node in workflow.items() if node.get("class_type") == "KSampler")
+
+
+def test_hash_ignores_node_ids_and_meta_but_not_parameters():
+    base = copy.deepcopy(DEFAULT_T2I_WORKFLOW)
+    digest = workflow_hash(base)
+
+    renamed = _renumber(base)
+    for node in renamed.values():
+        node["_meta"] = {"title": "renamed"}
+    assert workflow_hash(renamed) == digest
+
+    reseeded = copy.deepcopy(base)
+    reseeded[_sampler_id(reseeded)]["inputs"]["seed"] = 12345
+    assert workflow_hash(reseeded) != digest
+
+
+def test_provenance_links_prompt_hash_and_outputs(tmp_path):
+    db = DatabaseManager(str(tmp_path / "index.db"))
+    db.add_provenance("p1", "h", "C:\\out\\a.png", 1, "gpu0")
+    db.add_provenance("p1", "h", "C:\\out\\a.png", 1, "gpu0")
+    db.add_provenance("p2", "h", "/out/b.png")
+    assert [r["file_path"] for r in db.find_outputs_by_workflow_hash("h")] == ["/out/b.png", "C:/out/a.png"]
+    assert db.get_provenance("C:/out/a.png")["prompt_id"] == "p1"
+
+    db.delete_images(["/out/b.png"])
+    assert [r["prompt_id"] for r in db.find_outputs_by_workflow_hash("h")] == ["p1"]
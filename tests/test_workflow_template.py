@@ -0,0 +1,29 @@
+import copy
+
+from src.assets.default_workflows import DEFAULT_T2I_WORKFLOW
+from src.core.workflow_template import WorkflowTemplate
+
+
+def test_render_copies_only_written_nodes():
+    original = copy.deepcopy(DEFAULT_T2I_WORKFLOW)
+    template = WorkflowTemplate.compile(DEFAULT_T2I_WORKFLOW)
+    sampler_id = template.slots.samplers[0]
+
+    workflow = template.render()
+    template.inputs_for_write(workflow, sampler_id)["seed"] = 1
+
+    assert workflow[sampler_id]["inputs"]["seed"] == 1
+    assert DEFAULT_T2I_WORKFLOW == original
+    untouched = [nid for nid in workflow if nid != sampler_id]
+    assert all(workflow[nid] is DEFAULT_T2I_WORKFLOW[nid] for nid in untouched)
+
+
+def test_slots_are_shared_by_graphs_with_the_same_structure():
+    variant = copy.deepcopy(DEFAULT_T2I_WORKFLOW)
+    variant[WorkflowTemplate.compile(variant).slots.samplers[0]]["inputs"]["steps"] = 40
+
+    first = WorkflowTemplate.compile(DEFAULT_T2I_WORKFLOW)
+    second = WorkflowTemplate.compile(variant)
+
+    assert first.slots is second.slots
+    assert first.slots.traced_prompts == first.slots.sampler_prompts
@@ -1,10 +1,36 @@
+import base64
+import copy
+import hashlib
+import io
+import json
 import os
+import shutil
+import tempfile
+import threading
 import time
 import sqlite3
+import struct
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from src.core.database import DatabaseManager
 from src.core.cache import ThumbnailCache
 from src.core.metadata import MetadataParser
-from PyQt6.QtGui import QImage
+from src.core.workflow_template import WorkflowTemplate
+from src.core.seed_batch import collapse_seed_batch
+from src.core.model_affinity import affinity_rank, loader_signature
+from src.core.comfy_client import ComfyClient
+from src.core.comfy_pool import ComfyBackendPool
+from src.core.generation_scheduler import GenerationScheduler
+from src.core.output_library import OutputLibrary
+from src.core.coalescer import LatestValueCoalescer
+from src.core.preview_stream import PREVIEW_IMAGE_WITH_METADATA
+from src.core.step_timing import StepTimingTracker
+from src.core.workflow_hash import workflow_hash
+from src.assets.default_workflows import DEFAULT_T2I_WORKFLOW
+from PyQt6.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtNetwork import QNetworkRequest
 from PyQt6.QtWidgets import QApplication
 import sys
 
@@ -52,6 +78,33 @@ def verify_all():
     # 3. 验证元数据解析
     print("[Meta] 验证解析逻辑...")
     # 这里可以使用真实图片测试，或者跳过
+
+    # 4. 工作流模板渲染
+    bench_workflow_templates()
+
+    # 5. 仅种子不同的批量任务合并提交
+    bench_seed_batch()
+
+    # 6. 按模型状态分组提交
+    bench_model_affinity()
+
+    # 7. 多后端分派
+    bench_backend_pool()
+
+    # 8. 事件驱动的队列状态
+    bench_queue_events()
+
+    # 9. 经 /view 取回输出并入库
+    bench_output_fetch()
+
+    # 10. 采样实时预览
+    bench_live_preview()
+
+    # 11. 持久化步速统计的 ETA 精度
+    bench_step_eta()
+
+    # 12. 按工作流哈希复用已有结果
+    bench_workflow_dedup()
     
     print("\n✅ 所有核心组件验证通过！")
     
@@ -63,5 +116,667 @@ def verify_all():
         os.rmdir(".test_thumbs")
     except: pass
 
+def _patch_variant(workflow, inputs_of, slots, seed):
+    for nid in slots.samplers:
+        inputs = inputs_of(workflow, nid)
+        inputs["seed"] = seed
+        inputs["steps"] = 20
+    for nid in slots.latents:
+        inputs = inputs_of(workflow, nid)
+        inputs["width"], inputs["height"] = 832, 1216
+    for i, nid in enumerate(slots.lora_loaders):
+        inputs = inputs_of(workflow, nid)
+        inputs["strength_model"] = inputs["strength_clip"] = 0.1 * i
+
+
+def bench_workflow_templates(count=1000):
+    """渲染 count 个对比变体：深拷贝 + 全图扫描 vs 预编译模板 + 写时复制"""
+    start = time.perf_counter()
+    for i in range(count):
+        wf = copy.deepcopy(DEFAULT_T2I_WORKFLOW)
+        lora_ids = sorted((nid for nid, n in wf.items() if "loraloader" in n["class_type"].lower()), key=int)
+        slots = type("Slots", (), {
+            "samplers": [nid for nid, n in wf.items() if "ksampler" in n["class_type"].lower()],
+            "latents": [nid for nid, n in wf.items() if "latentimage" in n["class_type"].lower()],
+            "lora_loaders": lora_ids,
+        })
+        _patch_variant(wf, lambda w, nid: w[nid]["inputs"], slots, i)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    template = WorkflowTemplate.compile(DEFAULT_T2I_WORKFLOW)
+    compile_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for i in range(count):
+        wf = template.render()
+        _patch_variant(wf, template.inputs_for_write, template.slots, i)
+    compiled = time.perf_counter() - start
+
+    print(f"[Workflow] 渲染 {count} 个变体: 深拷贝+扫描 {legacy*1000:.1f}ms, "
+          f"预编译模板 {compiled*1000:.1f}ms (编译一次 {compile_ms:.2f}ms)")
+    assert DEFAULT_T2I_WORKFLOW["3"]["inputs"]["seed"] != count - 1, "模板被修改"
+
+def _comfy_stand_in(prompt_overhead, per_image):
+    """模拟 ComfyUI：每个 prompt 固定开销 (校验/缓存检查/解码准备) + 每张图的采样耗时，串行执行"""
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            batch = max(int(n["inputs"].get("batch_size", 1)) for n in body["prompt"].values()
+                        if "latentimage" in n["class_type"].lower())
+            with lock:
+                time.sleep(prompt_overhead + per_image * batch)
+            payload = json.dumps({"prompt_id": str(uuid.uuid4())}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_seed_batch(count=8, prompt_overhead=0.05, per_image=0.02):
+    """逐个提交 count 个随机种子任务 vs 合并为一个 batch_size=count 的任务"""
+    server = _comfy_stand_in(prompt_overhead, per_image)
+    url = f"http://127.0.0.1:{server.server_address[1]}/prompt"
+
+    def post(workflow):
+        data = json.dumps({"prompt": workflow, "client_id": "bench"}).encode("utf-8")
+        request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as reply:
+            return json.loads(reply.read())["prompt_id"]
+
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            workflow = copy.deepcopy(DEFAULT_T2I_WORKFLOW)
+            workflow["3"]["inputs"]["seed"] = i
+            post(workflow)
+        separate = time.perf_counter() - start
+
+        start = time.perf_counter()
+        post(collapse_seed_batch(DEFAULT_T2I_WORKFLOW, count, seed=1))
+        batched = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(f"[Comfy] {count} 个仅种子不同的任务 (模拟每任务开销 {prompt_overhead*1000:.0f}ms): "
+          f"逐个提交 {separate*1000:.0f}ms, 合并提交 {batched*1000:.0f}ms")
+
+
+class _SchedulerClientStandIn(QObject):
+    """只记录提交顺序的 ComfyClient 替身：任务立即受理，由调用方发出空队列快照表示执行完毕"""
+    prompt_queued = pyqtSignal(str, dict)
+    prompt_failed = pyqtSignal(dict, bool)
+    prompt_history_checked = pyqtSignal(str, bool)
+    queue_updated = pyqtSignal(dict)
+    queue_cleared = pyqtSignal()
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self):
+        super().__init__()
+        self.server_address = "stand-in"
+        self.model_inventory = None
+        self.sent = []
+
+    def is_connected(self):
+        return True
+
+    def send_prompt(self, workflow, context=None):
+        self.sent.append(workflow)
+        self.prompt_queued.emit(f"p{len(self.sent)}", context or {})
+
+    def check_prompt_history(self, prompt_id):
+        pass
+
+    def cancel_task(self, prompt_id):
+        pass
+
+    def interrupt_current(self, prompt_id=None):
+        pass
+
+
+def bench_model_affinity(base_load=6.0, lora_patch=0.8, per_image=2.0):
+    """
+    混合批次 (3 个 UNET x 4 个 LoRA x 2 个权重 x 2 个种子，按种子优先的声明顺序) 交给 GenerationScheduler
+    (队列深度 1，每完成一个补充一个)，按实际提交顺序模拟 ComfyUI 切换基础模型 base_load 秒、
+    切换 LoRA/权重 lora_patch 秒、每张图 per_image 秒
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    template = WorkflowTemplate.compile(DEFAULT_T2I_WORKFLOW)
+    workflows = []
+    for seed in range(2):
+        for unet in ("a.safetensors", "b.safetensors", "c.safetensors"):
+            for lora in range(4):
+                for weight in (0.6, 1.0):
+                    wf = template.render()
+                    template.inputs_for_write(wf, "16")["unet_name"] = unet
+                    lora_inputs = template.inputs_for_write(wf, "28")
+                    lora_inputs["lora_name"], lora_inputs["strength_model"] = f"style_{lora}.safetensors", weight
+                    template.inputs_for_write(wf, "3")["seed"] = seed
+                    workflows.append(wf)
+
+    def simulated_seconds(submitted):
+        total, current = 0.0, None
+        for wf in submitted:
+            signature = loader_signature(wf)
+            rank = affinity_rank(signature, current)
+            total += per_image + (base_load + lora_patch if rank == 2 else lora_patch if rank == 1 else 0.0)
+            current = signature
+        return total
+
+    client = _SchedulerClientStandIn()
+    scheduler = GenerationScheduler(client, max_depth=1)
+    scheduler.ACCEPT_GRACE_SECONDS = 0
+    start = time.perf_counter()
+    scheduler.enqueue_many([(wf, {"variant_index": i}) for i, wf in enumerate(workflows)])
+    while len(client.sent) < len(workflows):
+        client.queue_updated.emit({"queue_running": [], "queue_pending": []})
+    schedule_ms = (time.perf_counter() - start) * 1000
+    app.processEvents()
+    assert len(client.sent) == len(workflows)
+    declared = simulated_seconds(workflows)
+    grouped = simulated_seconds(client.sent)
+    print(f"[Affinity] {len(workflows)} 个混合任务 (模拟加载 {base_load:g}s / LoRA {lora_patch:g}s / 出图 {per_image:g}s): "
+          f"声明顺序 {declared:.0f}s, 调度器按模型分组 {grouped:.0f}s (调度合计 {schedule_ms:.2f}ms)")
+
+
+class _ComfyWsStandIn:
+    """
+    带 WebSocket 的 ComfyUI 模拟后端：/prompt 入队后由工作线程串行执行 (每个 prompt 耗时 per_prompt 秒)，
+    通过 /ws 推送 status / execution_start / executing / executed 消息；支持 /queue、/history/<id>、/object_info/<节点>、
+    /view (返回一张带 ComfyUI 元数据的 PNG)。
+    preview_frames > 0 时执行期间均匀推送该数量的二进制预览帧 (PREVIEW_IMAGE_WITH_METADATA, JPEG)。
+    queue_gets / queue_bytes 统计 GET /queue 的次数与响应字节数
+    """
+    WS_MAGIC = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+    def __init__(self, per_prompt: float, models=(), preview_frames: int = 0):
+        self.per_prompt = per_prompt
+        self.models = list(models)
+        self.preview_frames = preview_frames
+        self.preview_jpeg = self._make_jpeg() if preview_frames else b""
+        self.lock = threading.Condition()
+        self.pending = []      # [(number, prompt_id, prompt)]
+        self.running = None
+        self.history = {}
+        self.sockets = []
+        self.counter = 0
+        self.queue_gets = 0
+        self.queue_bytes = 0
+        self.png = self._make_png()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/ws":
+                    return stand_in._serve_ws(self)
+                if path == "/queue":
+                    with stand_in.lock:
+                        running = [list(stand_in.running)] if stand_in.running else []
+                        pending = [list(t) for t in stand_in.pending]
+                        stand_in.queue_gets += 1
+                        stand_in.queue_bytes += len(json.dumps({"queue_running": running, "queue_pending": pending}))
+                    return self._reply({"queue_running": running, "queue_pending": pending})
+                if path.startswith("/history/"):
+                    prompt_id = path.rsplit("/", 1)[1]
+                    with stand_in.lock:
+                        entry = stand_in.history.get(prompt_id)
+                    return self._reply({prompt_id: entry} if entry else {})
+                if path == "/view":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "image/png")
+                    self.send_header("Content-Length", str(len(stand_in.png)))
+                    self.end_headers()
+                    self.wfile.write(stand_in.png)
+                    return
+                if path.startswith("/object_info/"):
+                    node = path.rsplit("/", 1)[1]
+                    return self._reply({node: {"input": {"required": {"name": [stand_in.models, {}]}}}})
+                self._reply({}, 404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                if self.path == "/prompt":
+                    with stand_in.lock:
+                        stand_in.counter += 1
+                        prompt_id = str(uuid.uuid4())
+                        stand_in.pending.append((stand_in.counter, prompt_id, body.get("prompt", {})))
+                        stand_in.lock.notify_all()
+                    stand_in._broadcast_status()
+                    return self._reply({"prompt_id": prompt_id, "number": stand_in.counter})
+                if self.path == "/queue":
+                    with stand_in.lock:
+                        if body.get("clear"):
+                            stand_in.pending.clear()
+                        delete = set(body.get("delete") or [])
+                        stand_in.pending = [t for t in stand_in.pending if t[1] not in delete]
+                    return self._reply({})
+                self._reply({})
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.address = f"127.0.0.1:{self.server.server_address[1]}"
+        self._stopped = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    @staticmethod
+    def _make_png(size=1024):
+        from PIL import Image, PngImagePlugin
+        info = PngImagePlugin.PngInfo()
+        info.add_text("prompt", json.dumps(DEFAULT_T2I_WORKFLOW))
+        buf = io.BytesIO()
+        Image.merge("RGB", [Image.effect_noise((size, size), 40) for _ in range(3)]).save(buf, "PNG", pnginfo=info)
+        return buf.getvalue()
+
+    @staticmethod
+    def _make_jpeg(size=512):
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.merge("RGB", [Image.effect_noise((size, size), 40) for _ in range(3)]).save(buf, "JPEG", quality=85)
+        return buf.getvalue()
+
+    def _serve_ws(self, handler):
+        accept = base64.b64encode(hashlib.sha1((handler.headers["Sec-WebSocket-Key"] + self.WS_MAGIC).encode()).digest())
+        handler.send_response(101)
+        handler.send_header("Upgrade", "websocket")
+        handler.send_header("Connection", "Upgrade")
+        handler.send_header("Sec-WebSocket-Accept", accept.decode())
+        handler.end_headers()
+        handler.wfile.flush()
+        with self.lock:
+            self.sockets.append(handler.wfile)
+        self._broadcast_status()
+        try:
+            while handler.rfile.read(1):   # 只等待客户端断开
+                pass
+        except OSError:
+            pass
+        with self.lock:
+            if handler.wfile in self.sockets:
+                self.sockets.remove(handler.wfile)
+        handler.close_connection = True
+
+    def _send(self, message):
+        self._send_frame(0x81, json.dumps(message).encode("utf-8"))
+
+    def _send_binary(self, data):
+        self._send_frame(0x82, data)
+
+    def _send_frame(self, opcode, data):
+        if len(data) < 126:
+            length = bytes([len(data)])
+        elif len(data) < 65536:
+            length = bytes([126]) + struct.pack(">H", len(data))
+        else:
+            length = bytes([127]) + struct.pack(">Q", len(data))
+        header = bytes([opcode]) + length
+        with self.lock:
+            sockets = list(self.sockets)
+        for wfile in sockets:
+            try:
+                wfile.write(header + data)
+                wfile.flush()
+            except OSError:
+                pass
+
+    def _broadcast_status(self):
+        with self.lock:
+            remaining = len(self.pending) + (1 if self.running else 0)
+        self._send({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": remaining}}}})
+
+    def _worker(self):
+        while not self._stopped:
+            with self.lock:
+                while not self.pending and not self._stopped:
+                    self.lock.wait(0.1)
+                if self._stopped:
+                    return
+                self.running = self.pending.pop(0)
+            prompt_id = self.running[1]
+            self._send({"type": "execution_start", "data": {"prompt_id": prompt_id}})
+            if self.preview_frames:
+                meta = json.dumps({"prompt_id": prompt_id, "image_type": "image/jpeg"}).encode("utf-8")
+                frame = struct.pack(">II", PREVIEW_IMAGE_WITH_METADATA, len(meta)) + meta + self.preview_jpeg
+                for _ in range(self.preview_frames):
+                    time.sleep(self.per_prompt / self.preview_frames)
+                    self._send_binary(frame)
+            else:
+                time.sleep(self.per_prompt)
+            images = [{"filename": f"{prompt_id}.png", "subfolder": "", "type": "output"}]
+            with self.lock:
+                self.history[prompt_id] = {"outputs": {"9": {"images": images}}}
+            self._send({"type": "executed", "data": {"node": "9", "prompt_id": prompt_id, "output": {"images": images}}})
+            with self.lock:
+                self.running = None
+            self._send({"type": "executing", "data": {"node": None, "prompt_id": prompt_id}})
+            self._broadcast_status()
+
+    def stop(self):
+        self._stopped = True
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def bench_backend_pool(jobs=24, per_prompt=0.05, timeout=30.0):
+    """同一批任务分别交给 1 个和 3 个模拟后端，测量全部出图的墙钟时间"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {}
+    for count in (1, 3):
+        stand_ins = [_ComfyWsStandIn(per_prompt) for _ in range(count)]
+        primary = ComfyClient(stand_ins[0].address)
+        pool = ComfyBackendPool(primary)
+        pool.set_extra_addresses([s.address for s in stand_ins[1:]])
+        scheduler = GenerationScheduler(pool.backends(), max_depth=2)
+        primary.scheduler = scheduler
+        primary.connect_server()
+        received = []
+        pool.prompt_executed_images.connect(lambda prompt_id, images, ctx: received.append(ctx.get("variant_index")))
+
+        deadline = time.time() + 5
+        while not all(c.is_connected() for c in pool.backends()) and time.time() < deadline:
+            app.processEvents()
+            time.sleep(0.005)
+        start = time.perf_counter()
+        primary.submit_workflow_batch(
+            [copy.deepcopy(DEFAULT_T2I_WORKFLOW) for _ in range(jobs)],
+            [{"variant_index": i} for i in range(jobs)],
+        )
+        deadline = time.time() + timeout
+        while len(received) < jobs and time.time() < deadline:
+            app.processEvents()
+            time.sleep(0.002)
+        results[count] = time.perf_counter() - start
+        assert sorted(received) == list(range(jobs)), f"{count} 个后端: 结果缺失 {len(received)}/{jobs}"
+        for client in pool.backends():
+            client.reconnect_timer.stop()
+            client.system_stats_timer.stop()
+            client.ws.close()
+        for stand_in in stand_ins:
+            stand_in.stop()
+
+    print(f"[Pool] {jobs} 个任务 (模拟每个 {per_prompt*1000:.0f}ms, 队列深度 2): "
+          f"1 个后端 {results[1]*1000:.0f}ms, 3 个后端 {results[3]*1000:.0f}ms")
+
+
+def bench_queue_events(jobs=24, per_prompt=0.1, timeout=30.0):
+    """
+    直接提交一批任务 (不经调度器，ComfyUI 队列较深) 直到全部完成，统计 GET /queue 的次数与字节数。
+    轮询模式按旧逻辑模拟：每秒一次，每次提交额外 2 次，每次执行完成 (队列余量变化) 1 次。
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {}
+    for mode in ("poll", "events"):
+        stand_in = _ComfyWsStandIn(per_prompt)
+        client = ComfyClient(stand_in.address)
+        client.connect_server()
+        deadline = time.time() + 5
+        while not client.is_connected() and time.time() < deadline:
+            app.processEvents()
+            time.sleep(0.005)
+        app.processEvents()
+        time.sleep(0.2)
+        app.processEvents()
+        base_gets, base_bytes = stand_in.queue_gets, stand_in.queue_bytes
+        done = []
+        client.prompt_executed_images.connect(lambda prompt_id, images, ctx: done.append(prompt_id))
+        timer = None
+        if mode == "poll":
+            def poll():
+                reply = client.nam.get(QNetworkRequest(QUrl(f"http://{client.server_address}/queue")))
+                reply.finished.connect(reply.deleteLater)
+            timer = QTimer()
+            timer.timeout.connect(poll)
+            timer.start(1000)
+            client.prompt_submitted.connect(lambda _: (poll(), poll()))
+            client.execution_done.connect(lambda _: poll())
+        client.submit_workflow_batch(
+            [copy.deepcopy(DEFAULT_T2I_WORKFLOW) for _ in range(jobs)],
+            [{"variant_index": i} for i in range(jobs)],
+        )
+        deadline = time.time() + timeout
+        while (len(done) < jobs or client.queue_state.count()) and time.time() < deadline:
+            app.processEvents()
+            time.sleep(0.002)
+        assert len(done) == jobs and client.queue_state.count() == 0, f"{mode}: 队列状态未归零"
+        if timer:
+            timer.stop()
+        results[mode] = (stand_in.queue_gets - base_gets, stand_in.queue_bytes - base_bytes)
+        client.reconnect_timer.stop()
+        client.system_stats_timer.stop()
+        client.ws.close()
+        stand_in.stop()
+
+    print(f"[Queue] {jobs} 个任务 (模拟每个 {per_prompt*1000:.0f}ms): "
+          f"轮询 {results['poll'][0]} 次 /queue ({results['poll'][1]/1024:.0f}KB), "
+          f"事件驱动 {results['events'][0]} 次 ({results['events'][1]/1024:.0f}KB)")
+
+
+
+def bench_output_fetch(jobs=8, per_prompt=0.02, timeout=30.0):
+    """executed 消息到达 → /view 取回 → 写入库目录、解析元数据、生成缩略图并入索引，测量每张图的延迟"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    work_dir = tempfile.mkdtemp(prefix="output_fetch_")
+    stand_in = _ComfyWsStandIn(per_prompt)
+    client = ComfyClient(stand_in.address)
+    library = OutputLibrary(DatabaseManager(os.path.join(work_dir, "index.db")),
+                            ThumbnailCache(os.path.join(work_dir, ".thumbs")), os.path.join(work_dir, "library"))
+    executed_at, latencies = {}, []
+
+    def on_fetched(prompt_id, image_info, data, context):
+        result = library.ingest(data, image_info)
+        assert result and result[1].get("tool") == "ComfyUI" and not result[2].isNull()
+        latencies.append(time.perf_counter() - executed_at[prompt_id])
+
+    client.prompt_executed_images.connect(lambda prompt_id, images, ctx: executed_at.setdefault(prompt_id, time.perf_counter()))
+    client.output_fetched.connect(on_fetched)
+    client.connect_server()
+    deadline = time.time() + 5
+    while not client.is_connected() and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    for _ in range(jobs):
+        client.send_prompt(copy.deepcopy(DEFAULT_T2I_WORKFLOW))
+    deadline = time.time() + timeout
+    while len(latencies) < jobs and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.002)
+    assert len(latencies) == jobs, f"取回 {len(latencies)}/{jobs}"
+    client.reconnect_timer.stop()
+    client.system_stats_timer.stop()
+    client.ws.close()
+    stand_in.stop()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    latencies.sort()
+    print(f"[Output] {jobs} 张 1024px PNG ({len(stand_in.png)/1024:.0f}KB): executed → 入库 "
+          f"中位 {latencies[len(latencies)//2]*1000:.0f}ms, 最慢 {latencies[-1]*1000:.0f}ms "
+          f"(旧逻辑按路径猜测，文件未就绪时每次重试等待 0.5~1.5s，远程后端 3s 后仍无法定位)")
+
+
+def bench_live_preview(frames=120, per_prompt=1.0, timeout=30.0):
+    """
+    模拟后端在 1 秒内推送 120 帧 512px JPEG 预览 (远快于显示刷新)，经后台解码 → 33ms 合并 → 转换为 QPixmap 显示，
+    统计接收 / 解码 / 显示帧数以及 UI 线程在显示上花费的时间
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    stand_in = _ComfyWsStandIn(per_prompt, preview_frames=frames)
+    client = ComfyClient(stand_in.address)
+    coalescer = LatestValueCoalescer(33)
+    shown, ui_time, done = [], [0.0], []
+
+    def show(prompt_id, image, context):
+        start = time.perf_counter()
+        shown.append(QPixmap.fromImage(image))
+        ui_time[0] += time.perf_counter() - start
+
+    client.preview_updated.connect(lambda prompt_id, image, ctx: coalescer.submit("preview", show, prompt_id, image, ctx))
+    client.execution_done.connect(lambda prompt_id: done.append(prompt_id))
+    client.connect_server()
+    deadline = time.time() + 5
+    while not client.is_connected() and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    start = time.perf_counter()
+    client.send_prompt(copy.deepcopy(DEFAULT_T2I_WORKFLOW))
+    deadline = time.time() + timeout
+    while not done and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.002)
+    elapsed = time.perf_counter() - start
+    decoder = client.preview_decoder
+    decoder.shutdown()
+    app.processEvents()   # 投递解码线程已排队的帧，避免遗留到后续测试
+    coalescer.flush()
+    assert decoder.received == frames, f"收到 {decoder.received}/{frames} 帧预览"
+    assert shown and not shown[-1].isNull()
+    client.reconnect_timer.stop()
+    client.system_stats_timer.stop()
+    client.ws.close()
+    stand_in.stop()
+    # 对照：每帧都在 UI 线程解码并显示
+    start = time.perf_counter()
+    for _ in range(frames):
+        QPixmap.fromImage(QImage.fromData(stand_in.preview_jpeg))
+    inline = time.perf_counter() - start
+
+    print(f"[Preview] {frames} 帧 512px JPEG / {elapsed:.2f}s: 接收 {decoder.received}, 解码 {decoder.decoded_count}, "
+          f"显示 {len(shown)} (UI 线程合计 {ui_time[0]*1000:.1f}ms；逐帧在 UI 线程解码显示需 {inline*1000:.0f}ms)")
+
+
+def bench_step_eta(history_jobs=5, queue_jobs=10):
+    """
+    模拟时钟：同一模型先跑 history_jobs 个任务积累样本 (模型加载 4s, 0.5s/步, VAE 解码+保存 1.5s)，
+    换 1.5 倍像素、30 步后 "重启" (从数据库重新载入)，比较任务开始时与第 3 步时的 ETA 误差，以及整队任务的预估误差。
+    旧逻辑：每次从零学习步速 (EWMA)，第 2 步之前没有 ETA，且不计采样后的开销
+    """
+    work_dir = tempfile.mkdtemp(prefix="step_eta_")
+    db = DatabaseManager(os.path.join(work_dir, "index.db"))
+    pre, post, per_step_1mp = 4.0, 1.5, 0.5
+
+    def workflow(steps, width):
+        return {
+            "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "sdxl.safetensors"}},
+            "5": {"class_type": "EmptyLatentImage", "inputs": {"width": width, "height": 1024, "batch_size": 1}},
+            "3": {"class_type": "KSampler", "inputs": {"steps": steps, "sampler_name": "euler"}},
+        }
+
+    tracker = StepTimingTracker(db)
+    clock = 0.0
+    for i in range(history_jobs):
+        tracker.start(f"h{i}", workflow(20, 1024), now=clock)
+        tracker.node(f"h{i}", "KSampler")
+        for step in range(1, 21):
+            tracker.progress(f"h{i}", step, 20, now=clock + pre + step * per_step_1mp)
+        clock += pre + 20 * per_step_1mp + post
+        tracker.finish(f"h{i}", now=clock)
+
+    tracker = StepTimingTracker(db)
+    target = workflow(30, 1536)
+    per_step = per_step_1mp * 1.5
+    actual_total = pre + 30 * per_step + post
+    queue_estimate = tracker.estimate_seconds(target) * queue_jobs
+    tracker.start("t", target, now=0.0)
+    eta_start = tracker.remaining_seconds("t", now=0.0)
+    tracker.node("t", "KSampler")
+    for step in range(1, 4):
+        tracker.progress("t", step, 30, now=pre + step * per_step)
+    eta_step3 = tracker.remaining_seconds("t", now=pre + 3 * per_step)
+    legacy_step3 = (30 - 3) * per_step   # EWMA 在第 3 步已收敛到真实步速，但缺少采样后的开销
+    actual_step3 = actual_total - (pre + 3 * per_step)
+
+    start = time.perf_counter()
+    for step in range(4, 30):
+        tracker.progress("t", step, 30, now=pre + step * per_step)
+        tracker.running_remaining_seconds(["t"], now=pre + step * per_step)
+    per_event_us = (time.perf_counter() - start) / 26 * 1e6
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    assert abs(eta_start - actual_total) < 0.01 and abs(eta_step3 - actual_step3) < 0.01
+    print(f"[ETA] 新配置任务 (实际 {actual_total:.1f}s): 开始时预计 {eta_start:.1f}s (旧逻辑: 无)，"
+          f"第 3 步误差 {abs(eta_step3 - actual_step3):.2f}s (旧逻辑 {abs(legacy_step3 - actual_step3):.2f}s)；"
+          f"{queue_jobs} 个排队任务预计 {queue_estimate:.0f}s / 实际 {actual_total * queue_jobs:.0f}s (旧逻辑: 无)；"
+          f"每个进度事件 {per_event_us:.1f}µs")
+
+
+def bench_workflow_dedup(rows=10000, per_prompt=0.02, timeout=30.0):
+    """
+    固定种子的工作流经模拟后端生成一次：提交时计算的哈希随 context 到达出图回调并写入来源表；
+    再次提交前按哈希查到已有文件。来源表预置 rows 条其他记录，测量哈希与查找耗时
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    work_dir = tempfile.mkdtemp(prefix="workflow_dedup_")
+    db = DatabaseManager(os.path.join(work_dir, "index.db"))
+    conn = db._get_connection()
+    conn.executemany("INSERT INTO provenance (prompt_id, workflow_hash, file_path, batch_index) VALUES (?, ?, ?, 0)",
+                     [(f"p{i}", hashlib.sha256(str(i).encode()).hexdigest(), f"/out/{i}.png") for i in range(rows)])
+    conn.commit()
+    conn.close()
+    library = OutputLibrary(db, ThumbnailCache(os.path.join(work_dir, ".thumbs")), os.path.join(work_dir, "library"))
+    stand_in = _ComfyWsStandIn(per_prompt)
+    client = ComfyClient(stand_in.address)
+    stored = []
+
+    def on_fetched(prompt_id, image_info, data, context):
+        path = library.ingest(data, image_info)[0]
+        db.add_provenance(prompt_id, context["workflow_hash"], path, context.get("batch_index", 0))
+        stored.append(path)
+
+    client.output_fetched.connect(on_fetched)
+    client.connect_server()
+    deadline = time.time() + 5
+    while not client.is_connected() and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    workflow = copy.deepcopy(DEFAULT_T2I_WORKFLOW)
+    submitted_at = time.perf_counter()
+    client.send_prompt(copy.deepcopy(workflow))
+    deadline = time.time() + timeout
+    while not stored and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.002)
+    render = time.perf_counter() - submitted_at
+    assert stored, "未取回输出"
+    client.reconnect_timer.stop()
+    client.system_stats_timer.stop()
+    client.ws.close()
+    stand_in.stop()
+
+    start = time.perf_counter()
+    for _ in range(100):
+        digest = workflow_hash(workflow)
+    hash_us = (time.perf_counter() - start) / 100 * 1e6
+    start = time.perf_counter()
+    for _ in range(100):
+        found = [r["file_path"] for r in db.find_outputs_by_workflow_hash(digest) if os.path.exists(r["file_path"])]
+    lookup_ms = (time.perf_counter() - start) / 100 * 1000
+    assert found == stored
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"[Dedup] 工作流哈希 {hash_us:.0f}µs ({len(workflow)} 个节点)，来源表 {rows + 1} 条时查找 {lookup_ms:.2f}ms；"
+          f"命中后直接复用，不再经过模拟后端的 {render*1000:.0f}ms 提交→出图→取回 (真实 GPU 上为数十秒到数分钟)")
+
+
 if __name__ == "__main__":
     verify_all()